@@ -1,35 +1,86 @@
 import sys
 import os
+import argparse
 import sqlite3
 import csv
 import random
-from datetime import datetime
+import bisect
+import math
+import time
+import multiprocessing
+import atexit
+# numpy and concurrent.futures are imported inside the functions that use them:
+# they are the slowest imports and nothing on the startup path needs them
+import heapq
+import json
+import gzip
+import functools
+import itertools
+from collections import Counter
+from datetime import datetime, timedelta
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QLabel, QLineEdit,
     QVBoxLayout, QHBoxLayout, QMessageBox, QTableWidget, QTableWidgetItem,
-    QComboBox, QFileDialog, QDialog, QListWidget, QListWidgetItem, QFormLayout,
+    QComboBox, QFileDialog, QDialog, QFormLayout,
     QMenu, QSpinBox, QDialogButtonBox, QAbstractItemView, 
     QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QDialog,
     QScrollArea, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, 
-    QDialog, QToolTip, QFrame, QSpacerItem, QSizePolicy)
+    QDialog, QToolTip, QFrame, QSpacerItem, QSizePolicy, QListView,
+    QCheckBox, QInputDialog, QWidget, QPlainTextEdit)
 
-from PyQt5.QtCore import Qt, QSize, QTimer
-from PyQt5.QtGui import QIcon, QPixmap, QMovie, QFont
+from PyQt5.QtCore import (Qt, QSize, QTimer, QAbstractListModel, QModelIndex, QObject, QEvent, QPointF, QRectF,
+                          pyqtSignal, QSortFilterProxyModel, QItemSelectionModel)
+from PyQt5.QtGui import QIcon, QPixmap, QMovie, QFont, QPainter, QPen, QColor, QPolygonF
 
 
 
 # Constants
-DATABASE = 'badminton_app.db'
+DEFAULT_DATABASE = 'badminton_app.db'
+DATABASE = DEFAULT_DATABASE
+SCHEMA_VERSION = 9  # Stored in PRAGMA user_version; bump it whenever init_db changes
+DEFAULT_LEAGUE = 'Default'  # Lives in DEFAULT_DATABASE, the file older installs already have
+LEAGUES_DIR = 'leagues'  # One <league>.db file per additional league or club
+CURRENT_LEAGUE_FILE = os.path.join(LEAGUES_DIR, 'current_league.txt')
+MAX_ATTACHED = 10  # SQLite's default limit on attached databases per connection
+current_league = DEFAULT_LEAGUE
+BACKUP_DIR = 'backups'  # backups/<league>/<timestamp>-<reason>.db
+BACKUP_KEEP = 10  # Newest backups kept per league
+BACKUP_INTERVAL_MINUTES = 30
+ARCHIVE_DIR = 'archives'  # archives/<league>.db holds the closed seasons of a league
+SANDBOX_URI = 'file:matchup_sandbox?mode=memory&cache=shared'
+sandbox_source = None  # Live database file while DATABASE points at the sandbox
+sandbox_anchor = None  # Keeps the shared in-memory database alive
+
+def connect_db():
+    """Connection to the current database: the league's file, or the in-memory sandbox."""
+    if DATABASE == SANDBOX_URI:
+        conn = sqlite3.connect(DATABASE, uri=True)
+        # Shared-cache connections lock whole tables; let readers see uncommitted rows instead of failing
+        conn.execute('PRAGMA read_uncommitted = 1')
+    else:
+        conn = sqlite3.connect(DATABASE)
+    # SQLite leaves foreign keys off per connection; matches must never point at a missing player
+    conn.execute('PRAGMA foreign_keys = ON')
+    return conn
 
 # Initialize the database
 def init_db():
-    conn = sqlite3.connect(DATABASE)
+    conn = connect_db()
     cursor = conn.cursor()
+
+    # Everything below is idempotent but not free; skip it on every launch after the first
+    cursor.execute('PRAGMA user_version')
+    if cursor.fetchone()[0] == SCHEMA_VERSION:
+        conn.close()
+        return
     
     #cursor.execute('''DROP TABLE IF EXISTS matches''')
     #cursor.execute('''DROP TABLE IF EXISTS sessions''')
     #cursor.execute('''DROP TABLE IF EXISTS players''')
 
+    # Older files are rebuilt in the current storage format below, which SQLite only allows with foreign keys off
+    cursor.execute('PRAGMA foreign_keys = OFF')
+
     # Create players table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS players (
@@ -37,7 +88,7 @@ def init_db():
             name TEXT NOT NULL UNIQUE,
             elo_rating REAL DEFAULT 1500,
             matches_played INTEGER DEFAULT 0,
-            last_played DATETIME
+            last_played INTEGER
         )
     ''')
 
@@ -46,155 +97,1451 @@ def init_db():
         CREATE TABLE IF NOT EXISTS sessions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
-            match_type TEXT,
-            date TEXT
+            match_type INTEGER,
+            date INTEGER
         )
     ''')
     
     # Create matches table with session_id
+    cursor.execute(MATCHES_TABLE.format(table='matches'))
+    
+    # Columns added after the first release
+    # Existing results were rated when they were submitted
+    add_missing_columns(cursor, 'matches', [('predicted_a', 'REAL')])  # Win probability of side A at creation
+
+    if 'rated' in add_missing_columns(cursor, 'matches', [('rated', 'INTEGER DEFAULT 0')]):
+        cursor.execute('UPDATE matches SET rated = 1 WHERE winner1_id IS NOT NULL OR score_a != score_b')
+
+    add_missing_columns(cursor, 'players', [
+        ('skill_rating', 'REAL'),  # Set by fit_skill_ratings
+        ('placement_remaining', 'INTEGER DEFAULT 0'),  # Elevated-K matches left after a long break
+        ('active', 'INTEGER NOT NULL DEFAULT 1'),  # 0 once removed: the row stays for their history
+        ('archived_at', 'TEXT'),
+        ('gender', 'TEXT'),  # 'M' or 'F' for mixed doubles; NULL when not recorded
+    ])
+    # Roster queries only read current members, however many former ones pile up
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_players_active ON players(last_played) WHERE active = 1')
+    # Players removed before that were deleted outright; give their orphaned matches a removed placeholder
+    cursor.execute('''
+        INSERT OR IGNORE INTO players (id, name, active, archived_at)
+        SELECT player_id, 'Removed player ' || player_id, 0, datetime('now') FROM (
+            SELECT player_a1_id AS player_id FROM matches UNION SELECT player_a2_id FROM matches
+            UNION SELECT player_b1_id FROM matches UNION SELECT player_b2_id FROM matches
+            UNION SELECT winner1_id FROM matches UNION SELECT winner2_id FROM matches
+        ) WHERE player_id IS NOT NULL AND player_id NOT IN (SELECT id FROM players)
+    ''')
+
+    add_missing_columns(cursor, 'sessions', [
+        ('seed', 'INTEGER'),
+        ('pairing_method', 'TEXT'),
+        ('num_fields', 'INTEGER'),
+        ('roster_snapshot', 'TEXT'),  # JSON list of [name, elo_rating] used to generate the round
+        ('chain_seed', 'INTEGER'),
+        ('search_iterations', 'INTEGER'),
+        ('constraints_snapshot', 'TEXT'),  # JSON list of the pairing constraints the round was generated with
+        ('history_snapshot', 'TEXT'),  # JSON of the pairing history the optimized search saw (see history_snapshot)
+        ('tournament_id', 'INTEGER'),  # Set on the rounds of a tournament
+        ('tournament_round', 'INTEGER'),
+    ])
+
+    # Pairing rules for the optimized search; see CONSTRAINT_KINDS
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pairing_constraints (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            player_id INTEGER,
+            other_id INTEGER,
+            value TEXT,
+            hard INTEGER NOT NULL DEFAULT 1,
+            weight REAL,
+            FOREIGN KEY(player_id) REFERENCES players(id) ON DELETE CASCADE,
+            FOREIGN KEY(other_id) REFERENCES players(id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Each player's stored state before every rated match, so ratings can be replayed after a merge
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS matches (
+        CREATE TABLE IF NOT EXISTS rating_history (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
-            session_id INTEGER,
-            player_a1_id INTEGER,
-            player_a2_id INTEGER,
-            player_b1_id INTEGER,
-            player_b2_id INTEGER,
-            team_a_names TEXT,
-            team_b_names TEXT,
-            score_a INTEGER,
-            score_b INTEGER,
-            winner1_id INTEGER,
-            winner2_id INTEGER,
+            match_id INTEGER,
+            log_match_id INTEGER,
+            player_id INTEGER,
+            match_date INTEGER,
+            elo_before REAL,
+            matches_before INTEGER,
+            placement_before INTEGER,
+            last_played_before INTEGER,
+            elo_after REAL
+        )
+    ''')
+    init_sync(cursor)
+
+    # Closed seasons: their sessions and matches live in the archive file, these summaries stay here
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS seasons (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            start_date INTEGER,
+            end_date INTEGER,
+            matches INTEGER,
+            archived_at INTEGER
+        )
+    ''')
+    cursor.execute(SEASON_STATS_TABLE.format(table='season_stats'))
+
+    # Quality of every generated round. No foreign keys: like season_stats, the metrics stay here when
+    # closed seasons move their sessions to the archive, so strategies can be compared over the long run
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS session_metrics (
+            session_id INTEGER PRIMARY KEY,
+            created_at INTEGER NOT NULL,
+            pairing_method TEXT,
             match_type TEXT,
-            field_number INTEGER,
-            FOREIGN KEY(player_a1_id) REFERENCES players(id),
-            FOREIGN KEY(player_a2_id) REFERENCES players(id),
-            FOREIGN KEY(player_b1_id) REFERENCES players(id),
-            FOREIGN KEY(player_b2_id) REFERENCES players(id),
-            FOREIGN KEY(winner1_id) REFERENCES players(id),
-            FOREIGN KEY(winner2_id) REFERENCES players(id),
-            FOREIGN KEY(session_id) REFERENCES sessions(id)
+            rating_source TEXT,
+            num_fields INTEGER,
+            num_players INTEGER,
+            courts_used INTEGER,
+            bench_count INTEGER,
+            generation_ms REAL,
+            mean_gap REAL,
+            max_gap REAL,
+            mean_edge REAL,
+            balance_score REAL,
+            repeat_partners INTEGER,
+            repeat_opponents INTEGER,
+            relaxed_constraints INTEGER
         )
     ''')
-    
-    conn.commit()
-    conn.close()
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_session_metrics_created ON session_metrics(created_at)')
+    cursor.execute(COURT_METRICS_TABLE.format(table='court_metrics'))
 
-# Elo Rating System Functions
-def calculate_expected_score(rating_a1, rating_a2, rating_b1, rating_b2):
-    return 1 / (1 + 10 ** (((rating_b1 + rating_b2) - (rating_a1 + rating_a2)) / 400))
+    # Tournaments: entrants are seeded by rating; tournament_games places each match in the schedule or bracket
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tournaments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            format TEXT NOT NULL,
+            match_type INTEGER,
+            num_fields INTEGER,
+            rounds INTEGER,
+            created_at INTEGER,
+            finished_at INTEGER
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tournament_entrants (
+            tournament_id INTEGER,
+            seed INTEGER,
+            player1_id INTEGER,
+            player2_id INTEGER,
+            rating REAL,
+            PRIMARY KEY (tournament_id, seed),
+            FOREIGN KEY(tournament_id) REFERENCES tournaments(id),
+            FOREIGN KEY(player1_id) REFERENCES players(id),
+            FOREIGN KEY(player2_id) REFERENCES players(id)
+        ) WITHOUT ROWID
+    ''')
+    # bracket: 'R' round robin time slot, 'S' Swiss round, 'W'/'L'/'F' elimination winners/losers bracket and final.
+    # A game without a match is a bye (entrant_b NULL) or an empty bracket slot
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tournament_games (
+            tournament_id INTEGER,
+            bracket TEXT,
+            round INTEGER,
+            position INTEGER,
+            entrant_a INTEGER,
+            entrant_b INTEGER,
+            match_id INTEGER,
+            PRIMARY KEY (tournament_id, bracket, round, position),
+            FOREIGN KEY(tournament_id) REFERENCES tournaments(id)
+        ) WITHOUT ROWID
+    ''')
 
-def get_k_factor(matches_played):
-    if matches_played < 30:
-        return 40
-    else:
-        return 20
+    if upgrade_storage(cursor):
+        init_sync(cursor)  # Rebuilt tables lost their sync triggers and indexes
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_season_stats_player ON season_stats(player_id)')
+    # The matches of a session in court order, without visiting the table
+    cursor.execute('DROP INDEX IF EXISTS idx_matches_session')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_matches_session_field ON matches(session_id, field_number)')
+    # replay_ratings walks the real matches from a date on, in date order
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_matches_date ON matches(date) WHERE session_id IS NOT NULL')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rating_history_date ON rating_history(match_date)')
+    # Covers the rating chart: a player's rows in order come straight out of the index
+    cursor.execute('DROP INDEX IF EXISTS idx_rating_history_player')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_rating_history_chart ON rating_history(player_id, id, match_date, elo_after)
+    ''')
 
-def update_elo(player_a1_id, player_a2_id, player_b1_id, player_b2_id, winner1_id, winner2_id, session_id, match_type, field_number):
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
+    cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    conn.commit()
 
-    # Fetch current ratings and match counts for each player (handle None for singles matches)
-    if player_a1_id:
-        cursor.execute('SELECT elo_rating, matches_played FROM players WHERE id = ?', (player_a1_id,))
-        result_a1 = cursor.fetchone()
-        if not result_a1:
-            conn.close()
-            return
-        rating_a1, matches_a1 = result_a1
-    else:
-        rating_a1, matches_a1 = 0, 0
+    # The archive holds the closed seasons in the format they were written in
+    if DATABASE == league_database(current_league) and attach_archive(cursor):
+        upgrade_storage(cursor, 'archive')
+        conn.commit()
+        cursor.execute('DETACH DATABASE archive')
+    conn.close()
 
-    if player_a2_id:  # Optional for singles
-        cursor.execute('SELECT elo_rating, matches_played FROM players WHERE id = ?', (player_a2_id,))
-        result_a2 = cursor.fetchone()
-        rating_a2, matches_a2 = result_a2
-    else:
-        rating_a2, matches_a2 = rating_a1, matches_a1  # Copy values for singles
+# Storage format. Timestamps are whole seconds since 1970-01-01 of the local wall-clock time (see to_epoch)
+# and match types are their index in MATCH_TYPES, so rows stay small and dates compare as integers.
+# Two kinds of timestamps stay UTC text. The sync columns' updated_at values are compared with other
+# laptops' changesets in that form. players.archived_at is a removal mark that nothing reads back
+# Sessions can be Mixed (doubles and singles courts in one round); each match is only ever Doubles or Singles
+MATCH_TYPES = ('Doubles', 'Singles', 'Mixed')
+
+MATCHES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date INTEGER NOT NULL,
+        session_id INTEGER,
+        player_a1_id INTEGER,
+        player_a2_id INTEGER,
+        player_b1_id INTEGER,
+        player_b2_id INTEGER,
+        score_a INTEGER,
+        score_b INTEGER,
+        winner1_id INTEGER,
+        winner2_id INTEGER,
+        match_type INTEGER,
+        field_number INTEGER,
+        predicted_a REAL,
+        rated INTEGER DEFAULT 0,
+        uuid TEXT,
+        sync_version INTEGER,
+        updated_at TEXT,
+        FOREIGN KEY(player_a1_id) REFERENCES players(id),
+        FOREIGN KEY(player_a2_id) REFERENCES players(id),
+        FOREIGN KEY(player_b1_id) REFERENCES players(id),
+        FOREIGN KEY(player_b2_id) REFERENCES players(id),
+        FOREIGN KEY(winner1_id) REFERENCES players(id),
+        FOREIGN KEY(winner2_id) REFERENCES players(id),
+        FOREIGN KEY(session_id) REFERENCES sessions(id)
+    )
+'''
+
+# Keyed on a composite primary key: WITHOUT ROWID stores each row once, in the key's b-tree, instead of
+# in the table and again in the key's index
+SEASON_STATS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        season_id INTEGER,
+        player_id INTEGER,
+        name TEXT,
+        final_rating REAL,
+        matches INTEGER,
+        wins INTEGER,
+        losses INTEGER,
+        draws INTEGER,
+        PRIMARY KEY (season_id, player_id),
+        FOREIGN KEY(season_id) REFERENCES seasons(id)
+    ) WITHOUT ROWID
+'''
+
+COURT_METRICS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        session_id INTEGER,
+        field_number INTEGER,
+        match_type TEXT,
+        elo_gap REAL,
+        predicted_a REAL,
+        repeat_partners INTEGER,
+        repeat_opponents INTEGER,
+        PRIMARY KEY (session_id, field_number)
+    ) WITHOUT ROWID
+'''
+
+UNIX_EPOCH = datetime(1970, 1, 1)
+
+def to_epoch(timestamp):
+    """Stored form of a timestamp (text, datetime or already stored seconds), or None.
+
+    No time zone conversion, like SQLite's strftime('%s', ...): datetime(value, 'unixepoch')
+    gives back the same 'YYYY-MM-DD HH:MM:SS' text, and a day is always 86400 seconds.
+    """
+    if timestamp is None or isinstance(timestamp, int):
+        return timestamp
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return int((timestamp.replace(tzinfo=None) - UNIX_EPOCH).total_seconds())
+
+def format_epoch(seconds):
+    """'YYYY-MM-DD HH:MM:SS' text of a stored timestamp, or None."""
+    if seconds is None:
+        return None
+    return (UNIX_EPOCH + timedelta(seconds=seconds)).strftime('%Y-%m-%d %H:%M:%S')
+
+def match_type_code(match_type):
+    return MATCH_TYPES.index(match_type) if match_type is not None else None
+
+def match_type_name(code):
+    return MATCH_TYPES[code] if code is not None else None
+
+def rebuild_table(cursor, table, create_sql, conversions=None):
+    """Recreate main.<table> from create_sql, copying the columns it shares with the old layout.
+
+    conversions maps a column to the SQL expression that fills it from the old row. Indexes
+    and triggers go with the old table. The AUTOINCREMENT counter is kept, so ids of
+    deleted rows are never handed out again.
+    """
+    cursor.execute(f'PRAGMA table_info({table})')
+    old_columns = {row[1] for row in cursor.fetchall()}
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+    sequence = cursor.fetchone()
+    cursor.execute(f'DROP TABLE IF EXISTS {table}_rebuild')
+    cursor.execute(create_sql.format(table=f'{table}_rebuild'))
+    cursor.execute(f'PRAGMA table_info({table}_rebuild)')
+    columns = [row[1] for row in cursor.fetchall() if row[1] in old_columns]
+    conversions = conversions or {}
+    cursor.execute(f'''
+        INSERT INTO {table}_rebuild ({', '.join(columns)})
+        SELECT {', '.join(conversions.get(column, column) for column in columns)} FROM {table}
+    ''')
+    cursor.execute(f'DROP TABLE {table}')
+    cursor.execute(f'ALTER TABLE {table}_rebuild RENAME TO {table}')
+    if sequence:
+        cursor.execute('DELETE FROM sqlite_sequence WHERE name = ?', (table,))
+        cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (table, sequence[0]))
+
+def retype_column(cursor, table, column, declaration, expression, schema='main'):
+    """Give schema.table.column a new declared type, filled from `expression` over the old value.
+
+    For tables that can't simply be rebuilt (other tables point at them, or they
+    live in the archive without their original CREATE statement). Indexes on the
+    column are dropped; the caller creates them again.
+    """
+    cursor.execute(f'PRAGMA {schema}.index_list({table})')
+    for index in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'PRAGMA {schema}.index_info({index})')
+        if column in {row[2] for row in cursor.fetchall()}:
+            cursor.execute(f'DROP INDEX {schema}.{index}')
+    cursor.execute(f'ALTER TABLE {schema}.{table} ADD COLUMN {column}_retyped {declaration}')
+    cursor.execute(f'UPDATE {schema}.{table} SET {column}_retyped = {expression}')
+    cursor.execute(f'ALTER TABLE {schema}.{table} DROP COLUMN {column}')
+    cursor.execute(f'ALTER TABLE {schema}.{table} RENAME COLUMN {column}_retyped TO {column}')
+
+def upgrade_storage(cursor, schema='main'):
+    """Convert a database written before storage format 2 (schema 6): text timestamps and match types,
+    and the never used team_a_names/team_b_names columns. Season and round metric dates followed in
+    schema 9. Returns True if anything was converted.
+
+    Each step checks the declared column type, so a partly converted file is finished on the next run.
+    """
+    def column_types(table):
+        cursor.execute(f'PRAGMA {schema}.table_info({table})')
+        return {row[1]: row[2].upper() for row in cursor.fetchall()}
+
+    epoch = "CAST(strftime('%s', {0}) AS INTEGER)"
+    # Names to codes; a match's type is also told by whether it has a second player per side
+    session_type = 'CASE match_type {} END'.format(' '.join(f"WHEN '{name}' THEN {code}"
+                                                          for code, name in enumerate(MATCH_TYPES)))
+    match_type = 'CASE WHEN player_a2_id IS NULL THEN 1 ELSE 0 END'
+    upgraded = False
+
+    matches = column_types('matches')
+    if matches.get('date') == 'TEXT':
+        upgraded = True
+        if schema == 'main':
+            rebuild_table(cursor, 'matches', MATCHES_TABLE, {'date': epoch.format('date'), 'match_type': match_type})
+        else:
+            retype_column(cursor, 'matches', 'date', 'INTEGER', epoch.format('date'), schema)
+            retype_column(cursor, 'matches', 'match_type', 'INTEGER', match_type, schema)
+            for column in ('team_a_names', 'team_b_names'):
+                if column in matches:
+                    cursor.execute(f'ALTER TABLE {schema}.matches DROP COLUMN {column}')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_archive_matches_date ON matches(date)')
+
+    sessions = column_types('sessions')
+    if sessions.get('date') == 'TEXT':
+        upgraded = True
+        retype_column(cursor, 'sessions', 'date', 'INTEGER', epoch.format('date'), schema)
+    if sessions.get('match_type') == 'TEXT':
+        upgraded = True
+        retype_column(cursor, 'sessions', 'match_type', 'INTEGER', session_type, schema)
+
+    rating_history = column_types('rating_history')
+    for column in ('match_date', 'last_played_before'):
+        if rating_history.get(column) == 'TEXT':
+            upgraded = True
+            retype_column(cursor, 'rating_history', column, 'INTEGER', epoch.format(column), schema)
+
+    if schema == 'main':
+        # Season summaries and round metrics only live in the main file
+        if column_types('session_metrics').get('created_at') == 'TEXT':
+            upgraded = True
+            retype_column(cursor, 'session_metrics', 'created_at', 'INTEGER', epoch.format('created_at'))
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_session_metrics_created ON session_metrics(created_at)')
+        seasons = column_types('seasons')
+        for column in ('start_date', 'end_date', 'archived_at'):
+            if seasons.get(column) == 'TEXT':
+                upgraded = True
+                retype_column(cursor, 'seasons', column, 'INTEGER', epoch.format(column))
+        # DATETIME has numeric affinity, so the integers can be written over the text in place
+        cursor.execute(f"UPDATE players SET last_played = {epoch.format('last_played')} "
+                       f"WHERE typeof(last_played) = 'text'")
+        upgraded = upgraded or cursor.rowcount > 0
+        for table, create_sql in (('season_stats', SEASON_STATS_TABLE), ('court_metrics', COURT_METRICS_TABLE)):
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+            if 'WITHOUT ROWID' not in cursor.fetchone()[0].upper():
+                upgraded = True
+                rebuild_table(cursor, table, create_sql)
+    return upgraded
+
+def add_missing_columns(cursor, table, columns):
+    """Add (name, declaration) columns that an older database file doesn't have yet."""
+    cursor.execute(f'PRAGMA table_info({table})')
+    existing = {row[1] for row in cursor.fetchall()}
+    added = []
+    for name, declaration in columns:
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {declaration}')
+            added.append(name)
+    return added
+
+SYNC_TABLES = ('players', 'sessions', 'matches')
+
+def init_sync(cursor):
+    """Globally unique ids and a local change counter for exchanging changesets between laptops."""
+    cursor.execute('CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value)')
+    cursor.execute("INSERT OR IGNORE INTO sync_state (key, value) VALUES ('version', 0)")
+    cursor.execute("INSERT OR IGNORE INTO sync_state (key, value) VALUES ('device_id', lower(hex(randomblob(8))))")
+    cursor.execute("INSERT OR IGNORE INTO sync_state (key, value) VALUES ('last_export', 0)")
+
+    for table in SYNC_TABLES:
+        added = add_missing_columns(cursor, table, [
+            ('uuid', 'TEXT'),
+            ('sync_version', 'INTEGER'),  # Local change counter value of the last insert or score change
+            ('updated_at', 'TEXT'),  # UTC time of that change, used to resolve conflicting edits
+        ])
+        if added:
+            cursor.execute(f'''
+                UPDATE {table} SET uuid = lower(hex(randomblob(16))),
+                                   sync_version = (SELECT value FROM sync_state WHERE key = 'version'),
+                                   updated_at = datetime('now')
+                WHERE uuid IS NULL
+            ''')
+        cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_uuid ON {table}(uuid)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_sync_version ON {table}(sync_version)')
+        # Bulk inserts that stamp sync_version themselves skip the per-row trigger
+        cursor.execute(f'DROP TRIGGER IF EXISTS {table}_sync_insert')
+        cursor.execute(f'''
+            CREATE TRIGGER {table}_sync_insert AFTER INSERT ON {table}
+            WHEN NEW.sync_version IS NULL
+            BEGIN
+                UPDATE sync_state SET value = value + 1 WHERE key = 'version';
+                UPDATE {table}
+                SET uuid = COALESCE(NEW.uuid, lower(hex(randomblob(16)))),
+                    sync_version = (SELECT value FROM sync_state WHERE key = 'version'),
+                    updated_at = COALESCE(NEW.updated_at, datetime('now'))
+                WHERE id = NEW.id;
+            END
+        ''')
+
+    # Entering a score is the only edit to an existing row that other laptops need to see
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS matches_sync_update
+        AFTER UPDATE OF score_a, score_b, winner1_id, winner2_id ON matches
+        BEGIN
+            UPDATE sync_state SET value = value + 1 WHERE key = 'version';
+            UPDATE matches
+            SET sync_version = (SELECT value FROM sync_state WHERE key = 'version'),
+                updated_at = CASE WHEN NEW.updated_at IS OLD.updated_at THEN datetime('now') ELSE NEW.updated_at END
+            WHERE id = NEW.id;
+        END
+    ''')
+
+# Leagues: every league is its own database file, so its queries never scan other clubs
+def league_database(league):
+    if league == DEFAULT_LEAGUE:
+        return DEFAULT_DATABASE
+    return os.path.join(LEAGUES_DIR, f'{league}.db')
+
+def valid_league_name(league):
+    return bool(league) and league.replace('-', '').replace('_', '').replace(' ', '').isalnum()
+
+def list_leagues():
+    leagues = []
+    if os.path.isdir(LEAGUES_DIR):
+        leagues = sorted(os.path.splitext(file_name)[0] for file_name in os.listdir(LEAGUES_DIR)
+                         if file_name.endswith('.db'))
+    return [DEFAULT_LEAGUE] + [league for league in leagues if league != DEFAULT_LEAGUE]
+
+def set_league(league):
+    """Point every query at the league's database file, creating it if needed."""
+    global DATABASE, current_league
+    if sandbox_source is not None:
+        raise ValueError('Commit or discard the sandbox before switching leagues')
+    if not valid_league_name(league):
+        raise ValueError(f"Invalid league name: {league!r}")
+    DATABASE = league_database(league)
+    current_league = league
+    try:
+        os.makedirs(LEAGUES_DIR, exist_ok=True)  # Also holds every league but the default one
+        with open(CURRENT_LEAGUE_FILE, 'w') as file:
+            file.write(league)
+    except OSError as e:
+        print(f"Could not remember the current league: {e}")
+    init_db()
 
-    cursor.execute('SELECT elo_rating, matches_played FROM players WHERE id = ?', (player_b1_id,))
-    result_b1 = cursor.fetchone()
-    if not result_b1:
+def last_used_league():
+    try:
+        with open(CURRENT_LEAGUE_FILE) as file:
+            league = file.read().strip()
+    except OSError:
+        return DEFAULT_LEAGUE
+    return league if league in list_leagues() else DEFAULT_LEAGUE
+
+def find_player_across_leagues(name_query):
+    """Look a player up in every league with ATTACH, a batch of league files per connection."""
+    leagues = [league for league in list_leagues() if os.path.exists(league_database(league))]
+    results = []
+    for start in range(0, len(leagues), MAX_ATTACHED):
+        batch = leagues[start:start + MAX_ATTACHED]
+        conn = sqlite3.connect(':memory:')
+        cursor = conn.cursor()
+        selects = []
+        for index, league in enumerate(batch):
+            cursor.execute(f'ATTACH DATABASE ? AS league{index}', (league_database(league),))
+            # Leagues not opened since storage format 2 still have text timestamps
+            selects.append(f'SELECT ? AS league, name, elo_rating, matches_played, '
+                           f"CASE typeof(last_played) WHEN 'integer' THEN datetime(last_played, 'unixepoch') "
+                           f'ELSE last_played END FROM league{index}.players WHERE name LIKE ?')
+        params = []
+        for league in batch:
+            params.extend([league, f'%{name_query}%'])
+        cursor.execute(' UNION ALL '.join(selects) + ' ORDER BY name, league', params)
+        results.extend(cursor.fetchall())
         conn.close()
+    return results
+
+# Backups and the what-if sandbox, both built on the SQLite online backup API
+def live_database():
+    return sandbox_source or DATABASE
+
+def backup_database(reason='scheduled'):
+    """Copy the live database to backups/<league>/ while the app keeps running, then rotate. Returns the path."""
+    backup_dir = os.path.join(BACKUP_DIR, current_league)
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(backup_dir, f'{stamp}-{reason}.db')
+    suffix = 1
+    while os.path.exists(path):
+        suffix += 1
+        path = os.path.join(backup_dir, f'{stamp}-{reason}-{suffix}.db')
+
+    source = sqlite3.connect(live_database())
+    target = sqlite3.connect(path)
+    source.backup(target, pages=1024, sleep=0.005)  # Copy in steps so writers are not blocked for the whole copy
+    target.close()
+    source.close()
+
+    for old_backup in list_backups()[BACKUP_KEEP:]:
+        os.remove(old_backup)
+    return path
+
+def list_backups():
+    """Backups of the current league, newest first."""
+    backup_dir = os.path.join(BACKUP_DIR, current_league)
+    if not os.path.isdir(backup_dir):
+        return []
+    return sorted((os.path.join(backup_dir, file_name) for file_name in os.listdir(backup_dir)
+                   if file_name.endswith('.db')), reverse=True)
+
+def restore_backup(path):
+    """Replace the live database with a backup, keeping a backup of the state being replaced."""
+    if sandbox_source is not None:
+        raise ValueError('Commit or discard the sandbox before restoring a backup')
+    backup_database('before-restore')
+    source = sqlite3.connect(path)
+    target = sqlite3.connect(DATABASE)
+    source.backup(target)
+    target.close()
+    source.close()
+    init_db()  # The backup may predate newer columns
+
+def enter_sandbox():
+    """Point DATABASE at an in-memory copy of the live database, made in one backup call."""
+    global DATABASE, sandbox_source, sandbox_anchor
+    if sandbox_source is not None:
         return
-    rating_b1, matches_b1 = result_b1
+    sandbox_anchor = sqlite3.connect(SANDBOX_URI, uri=True)
+    live = sqlite3.connect(DATABASE)
+    live.backup(sandbox_anchor)
+    live.close()
+    sandbox_source, DATABASE = DATABASE, SANDBOX_URI
+
+def discard_sandbox():
+    global DATABASE, sandbox_source, sandbox_anchor
+    if sandbox_source is None:
+        return
+    DATABASE, sandbox_source = sandbox_source, None
+    sandbox_anchor.close()  # The in-memory database goes away with its last connection
+    sandbox_anchor = None
+
+def commit_sandbox():
+    """Write the sandbox over the live database (after backing the live one up) and leave the sandbox."""
+    if sandbox_source is None:
+        return None
+    path = backup_database('before-sandbox-commit')
+    live = sqlite3.connect(sandbox_source)
+    sandbox_anchor.backup(live)
+    live.close()
+    discard_sandbox()
+    return path
+
+# Elo Rating System Functions
+def calculate_expected_score(rating_a1, rating_a2, rating_b1, rating_b2):
+    return 1 / (1 + 10 ** (((rating_b1 + rating_b2) - (rating_a1 + rating_a2)) / 400))
 
-    if player_b2_id:  # Optional for singles
-        cursor.execute('SELECT elo_rating, matches_played FROM players WHERE id = ?', (player_b2_id,))
-        result_b2 = cursor.fetchone()
-        rating_b2, matches_b2 = result_b2
+def get_k_factor(matches_played, k_new=40, k_established=20, threshold=30):
+    if matches_played < threshold:
+        return k_new
     else:
-        rating_b2, matches_b2 = rating_b1, matches_b1  # Copy values for singles
+        return k_established
+
+def elo_match_update(rating_a1, rating_a2, rating_b1, rating_b2, matches_a1, matches_a2, matches_b1, matches_b2,
+                     score_a, match_type, k_factor=get_k_factor, provisional=(False, False, False, False)):
+    """Rating update for one match without touching the database.
 
+    score_a is 1 (team A won), 0 (team B won) or 0.5 (draw). For singles pass
+    the player's own rating and match count as the a2/b2 values, like
+    update_elo does. Players flagged in `provisional` move with at least
+    PROVISIONAL_K_FACTOR. Returns the four new ratings.
+    """
     # Calculate expected scores (handle both singles and doubles cases)
     if match_type == 'Doubles':
         expected_a = calculate_expected_score(rating_a1, rating_a2, rating_b1, rating_b2)
     else:  # Singles
         expected_a = calculate_expected_score(rating_a1, 0, rating_b1, 0)  # Only 1 player per team
     expected_b = 1 - expected_a
+    score_b = 1 - score_a
+
+    # Determine K-factors
+    k_a = k_factor(matches_a1 + matches_a2)
+    k_b = k_factor(matches_b1 + matches_b2)
+
+    k_a1, k_a2, k_b1, k_b2 = (max(k, PROVISIONAL_K_FACTOR) if is_provisional else k
+                              for k, is_provisional in zip((k_a, k_a, k_b, k_b), provisional))
+
+    return (rating_a1 + k_a1 * (score_a - expected_a),
+            rating_a2 + k_a2 * (score_a - expected_a),
+            rating_b1 + k_b1 * (score_b - expected_b),
+            rating_b2 + k_b2 * (score_b - expected_b))
+
+# Inactivity and provisional ratings.
+# Nothing is rewritten on a schedule: the decay towards the league average is
+# computed whenever a rating is read, and only stored once the player plays again.
+DECAY_GRACE_DAYS = 60  # No decay for breaks shorter than this
+DECAY_PER_MONTH = 0.05  # Share of the distance to the league average lost per month after the grace period
+MAX_DECAY = 0.5
+RETURN_AFTER_DAYS = 90  # A break this long puts a player back into placement
+PLACEMENT_MATCHES = 5  # Matches with an elevated K after returning
+PROVISIONAL_MATCHES = 10  # New players are provisional for their first matches
+PROVISIONAL_K_FACTOR = 60
+
+def days_inactive(last_played, now=None):
+    if last_played is None:
+        return 0
+    return max((to_epoch(now or datetime.now()) - to_epoch(last_played)) / 86400, 0)
+
+def decayed_rating(elo_rating, idle_days, league_mean):
+    """Rating pulled towards the league average for a break of idle_days."""
+    idle_days -= DECAY_GRACE_DAYS
+    if idle_days <= 0:
+        return elo_rating
+    decay = min(DECAY_PER_MONTH * idle_days / 30, MAX_DECAY)
+    return elo_rating + (league_mean - elo_rating) * decay
+
+def rating_state(elo_rating, matches_played, idle_days, placement_remaining, league_mean):
+    """(effective rating, provisional, placement matches left) of a player about to play after idle_days.
+
+    New players, returners in placement and players back from a long break are provisional.
+    """
+    placement_remaining = placement_remaining or 0
+    if idle_days >= RETURN_AFTER_DAYS:
+        placement_remaining = PLACEMENT_MATCHES  # Back from a long break: start a new placement phase
+    return (decayed_rating(elo_rating, idle_days, league_mean),
+            matches_played < PROVISIONAL_MATCHES or placement_remaining > 0, placement_remaining)
+
+def get_league_mean(cursor):
+    cursor.execute('SELECT AVG(elo_rating) FROM players WHERE matches_played > 0')
+    mean = cursor.fetchone()[0]
+    return mean if mean is not None else 1500
+
+def fetch_rating_state(cursor, player_id, league_mean, now=None):
+    """(effective rating, matches played, provisional, placement matches left) for a rating update."""
+    cursor.execute('''
+        SELECT elo_rating, matches_played, last_played, placement_remaining FROM players WHERE id = ?
+    ''', (player_id,))
+    result = cursor.fetchone()
+    if not result:
+        return None
+    elo_rating, matches_played, last_played, placement_remaining = result
+    rating, provisional, placement_remaining = rating_state(elo_rating, matches_played, days_inactive(last_played, now),
+                                                            placement_remaining, league_mean)
+    return rating, matches_played, provisional, placement_remaining
+
+def get_effective_ratings(names=None, cursor=None):
+    """name -> (effective rating, provisional) as used by the matchmaker and leaderboard.
+
+    Runs on `cursor` when given, otherwise on a connection of its own.
+    """
+    conn = connect_db() if cursor is None else None
+    cursor = cursor or conn.cursor()
+    league_mean = get_league_mean(cursor)
+    query = 'SELECT name, elo_rating, matches_played, last_played, placement_remaining FROM players'
+    rows = []
+    if names is None:
+        cursor.execute(f'{query} WHERE active = 1')  # Removed players keep their rows but leave the roster
+        rows = cursor.fetchall()
+    else:
+        names = list(names)
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            cursor.execute(f"{query} WHERE name IN ({', '.join('?' for _ in chunk)})", chunk)
+            rows.extend(cursor.fetchall())
+    if conn is not None:
+        conn.close()
+    now = datetime.now()
+    return {name: rating_state(elo_rating, matches_played, days_inactive(last_played, now), placement_remaining,
+                               league_mean)[:2]
+            for name, elo_rating, matches_played, last_played, placement_remaining in rows}
+
+def update_elo(player_a1_id, player_a2_id, player_b1_id, player_b2_id, winner1_id, winner2_id, session_id, match_type, field_number,
+               match_id=None):
+    conn = connect_db()
+    cursor = conn.cursor()
+    apply_match_rating(cursor, player_a1_id, player_a2_id, player_b1_id, player_b2_id, winner1_id, winner2_id,
+                       session_id, match_type, field_number, datetime.now(), match_id)
+    conn.commit()
+    conn.close()
+
+def rate_matches(match_ids):
+    """Apply the rating update to the matches among match_ids that haven't been rated yet."""
+    conn = connect_db()
+    cursor = conn.cursor()
+
+    match_ids = list(match_ids)
+    matches = []
+    for start in range(0, len(match_ids), 500):
+        chunk = match_ids[start:start + 500]
+        cursor.execute(f'''
+            SELECT id, player_a1_id, player_a2_id, player_b1_id, player_b2_id, score_a, score_b, winner1_id, winner2_id, match_type, field_number
+            FROM matches
+            WHERE id IN ({', '.join('?' for _ in chunk)}) AND rated = 0
+        ''', chunk)
+        matches.extend(cursor.fetchall())
+    # Rate in the order given, which is the order the results came in
+    order = {match_id: position for position, match_id in enumerate(match_ids)}
+    matches.sort(key=lambda match: order[match[0]])
+
+    # One transaction for the whole round instead of one per match
+    for match in matches:
+        match_id, player_a1_id, player_a2_id, player_b1_id, player_b2_id, score_a, score_b, winner1_id, winner2_id, match_type, field_number = match
+        match_type = match_type_name(match_type)
+        if match_type == 'Singles':
+            player_a2_id = player_b2_id = None
+        # Determine the winners from the scores
+        if score_a > score_b:
+            winner1_id, winner2_id = player_a1_id, player_a2_id
+        elif score_b > score_a:
+            winner1_id, winner2_id = player_b1_id, player_b2_id
+        else:
+            winner1_id, winner2_id = None, None  # Draw
+        apply_match_rating(cursor, player_a1_id, player_a2_id, player_b1_id, player_b2_id, winner1_id, winner2_id,
+                           None, match_type, field_number, datetime.now(), match_id)
+
+    # Never apply the same result twice (e.g. when scores are submitted again)
+    cursor.executemany('UPDATE matches SET rated = 1 WHERE id = ?', [(match[0],) for match in matches])
+    conn.commit()
+    conn.close()
+
+def apply_match_rating(cursor, player_a1_id, player_a2_id, player_b1_id, player_b2_id, winner1_id, winner2_id,
+                       session_id, match_type, field_number, now, match_id=None):
+    """Rate one match as of `now`, logging each player's previous state to rating_history."""
+    league_mean = get_league_mean(cursor)
+
+    # Fetch current (inactivity adjusted) ratings and match counts for each player (handle None for singles matches)
+    state_a1 = fetch_rating_state(cursor, player_a1_id, league_mean, now) if player_a1_id else (0, 0, False, 0)
+    state_b1 = fetch_rating_state(cursor, player_b1_id, league_mean, now)
+    if not state_a1 or not state_b1:
+        return
+    # Copy values for singles
+    state_a2 = fetch_rating_state(cursor, player_a2_id, league_mean, now) if player_a2_id else state_a1
+    state_b2 = fetch_rating_state(cursor, player_b2_id, league_mean, now) if player_b2_id else state_b1
+    (rating_a1, matches_a1, provisional_a1, placement_a1), (rating_a2, matches_a2, provisional_a2, placement_a2) = state_a1, state_a2
+    (rating_b1, matches_b1, provisional_b1, placement_b1), (rating_b2, matches_b2, provisional_b2, placement_b2) = state_b1, state_b2
 
     # Determine actual scores based on winners
     if winner1_id == player_a1_id and (match_type == 'Singles' or winner2_id == player_a2_id):
-        score_a, score_b = 1, 0
+        score_a = 1
     elif winner1_id == player_b1_id and (match_type == 'Singles' or winner2_id == player_b2_id):
-        score_a, score_b = 0, 1
+        score_a = 0
     else:
-        score_a, score_b = 0.5, 0.5  # Handle draw if necessary
-
-    # Determine K-factors
-    k_a = get_k_factor(matches_a1 + matches_a2)
-    k_b = get_k_factor(matches_b1 + matches_b2)
+        score_a = 0.5  # Handle draw if necessary
 
     # Update ratings
-    new_rating_a1 = rating_a1 + k_a * (score_a - expected_a)
-    new_rating_a2 = rating_a2 + k_a * (score_a - expected_a)
-    new_rating_b1 = rating_b1 + k_b * (score_b - expected_b)
-    new_rating_b2 = rating_b2 + k_b * (score_b - expected_b)
-
-    # Update players' ratings, match counts, and last_played field (handle both singles and doubles)
-    date_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    cursor.execute('''
+    new_rating_a1, new_rating_a2, new_rating_b1, new_rating_b2 = elo_match_update(
+        rating_a1, rating_a2, rating_b1, rating_b2,
+        matches_a1, matches_a2, matches_b1, matches_b2, score_a, match_type,
+        provisional=(provisional_a1, provisional_a2, provisional_b1, provisional_b2))
+
+    # Update players' ratings, match counts, placement matches left and last_played field (handle both singles and doubles)
+    played_at = to_epoch(now)
+    updates = [(new_rating_a1, matches_a1 + 1, max(placement_a1 - 1, 0), played_at, player_a1_id),
+               (new_rating_b1, matches_b1 + 1, max(placement_b1 - 1, 0), played_at, player_b1_id)]
+    if match_type == 'Doubles':  # Update player_a2 and player_b2 only in doubles
+        updates.append((new_rating_a2, matches_a2 + 1, max(placement_a2 - 1, 0), played_at, player_a2_id))
+        updates.append((new_rating_b2, matches_b2 + 1, max(placement_b2 - 1, 0), played_at, player_b2_id))
+
+    # Remember the stored state before this match so a merge can rewind to it
+    player_ids = [update[-1] for update in updates]
+    cursor.execute(f'''
+        SELECT id, elo_rating, matches_played, placement_remaining, last_played
+        FROM players WHERE id IN ({', '.join('?' for _ in player_ids)})
+    ''', player_ids)
+    previous = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    cursor.executemany('''
         UPDATE players 
-        SET elo_rating = ?, matches_played = ?, last_played = ?
+        SET elo_rating = ?, matches_played = ?, placement_remaining = ?, last_played = ?
         WHERE id = ?
-    ''', (new_rating_a1, matches_a1 + 1, date_str, player_a1_id))
-
-    if match_type == 'Doubles':  # Update player_a2 only in doubles
-        cursor.execute('''
-            UPDATE players 
-            SET elo_rating = ?, matches_played = ?, last_played = ?
-            WHERE id = ?
-        ''', (new_rating_a2, matches_a2 + 1, date_str, player_a2_id))
+    ''', updates)
 
+    # Record the match
     cursor.execute('''
-        UPDATE players 
-        SET elo_rating = ?, matches_played = ?, last_played = ?
+        INSERT INTO matches (date, session_id, player_a1_id, player_a2_id, player_b1_id, player_b2_id, score_a, score_b, winner1_id, winner2_id, match_type, field_number)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (played_at, session_id, player_a1_id, player_a2_id, player_b1_id, player_b2_id,
+          int(score_a), int(1 - score_a), winner1_id if winner1_id else None, winner2_id if winner2_id else None,
+          match_type_code(match_type), field_number))
+    log_match_id = cursor.lastrowid
+
+    match_date = played_at
+    if match_id is not None:
+        cursor.execute('SELECT date FROM matches WHERE id = ?', (match_id,))
+        match_date = cursor.fetchone()[0]
+    cursor.executemany('''
+        INSERT INTO rating_history (match_id, log_match_id, player_id, match_date, elo_before, matches_before,
+                                    placement_before, last_played_before, elo_after)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(match_id, log_match_id, player_id, match_date) + tuple(previous[player_id]) + (new_rating,)
+          for new_rating, _, _, _, player_id in updates if player_id in previous])
+
+def replay_ratings(since_date, extra_match_ids=()):
+    """Rewind ratings to just before since_date (any form to_epoch takes) and re-rate every later match in date order.
+
+    Matches rated before rating_history existed have no recorded starting
+    point and are left as they are. extra_match_ids (any container) are
+    matches without history yet, e.g. just merged or imported, to include.
+    The replay is a single pass over the matches with every player's state
+    held in memory, applying the same rules as apply_match_rating. When
+    since_date falls in a closed season, the archived matches and rating
+    history are rewound and re-rated as well.
+    Returns the number of matches re-rated.
+    """
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute(f'PRAGMA cache_size = -{BULK_CACHE_KIB}')
+    since = to_epoch(since_date)
+    schemas = ['main']
+    if replay_reaches_archive(cursor, since):
+        schemas.insert(0, 'archive')
+    cursor.execute(' UNION ALL '.join(f'''
+        SELECT id, match_id, log_match_id, player_id, elo_before, matches_before, placement_before, last_played_before
+        FROM {schema}.rating_history WHERE match_date >= ?''' for schema in schemas) + ' ORDER BY 1',
+                   (since,) * len(schemas))
+    rewound = {}
+    match_ids = set()
+    log_match_ids = set()
+    for _, match_id, log_match_id, player_id, *previous in cursor.fetchall():
+        rewound.setdefault(player_id, previous)  # The earliest entry holds the state before since_date
+        match_ids.add(match_id)
+        log_match_ids.add(log_match_id)
+
+    cursor.executemany('''
+        UPDATE players SET elo_rating = ?, matches_played = ?, placement_remaining = ?, last_played = ?
+        WHERE id = ?
+    ''', [tuple(previous) + (player_id,) for player_id, previous in rewound.items()])
+    for schema in schemas:
+        cursor.executemany(f'DELETE FROM {schema}.matches WHERE id = ?', [(match_id,) for match_id in log_match_ids])
+        cursor.execute(f'DELETE FROM {schema}.rating_history WHERE match_date >= ?', (since,))
+
+    # player id -> [stored rating, matches played, placement matches left, last played]
+    cursor.execute('SELECT id, elo_rating, matches_played, placement_remaining, last_played FROM players')
+    players = {player_id: [elo_rating, matches_played or 0, placement_remaining or 0, last_played]
+               for player_id, elo_rating, matches_played, placement_remaining, last_played in cursor.fetchall()}
+    touched = set()
+    # get_league_mean, kept up to date as ratings change
+    rating_total = sum(player[0] for player in players.values() if player[1] > 0)
+    rated_players = sum(1 for player in players.values() if player[1] > 0)
+
+    history = []
+    newly_rated = []
+    replayed = 0
+    writer = conn.cursor()
+    cursor.execute(' UNION ALL '.join(f'''
+        SELECT id, date, player_a1_id, player_a2_id, player_b1_id, player_b2_id, winner1_id, winner2_id, match_type,
+               rated
+        FROM {schema}.matches
+        WHERE session_id IS NOT NULL AND date >= ?''' for schema in schemas) + ' ORDER BY 2, 1',
+                   (since,) * len(schemas))
+    for (match_id, now, player_a1_id, player_a2_id, player_b1_id, player_b2_id, winner1_id, winner2_id, match_type,
+         rated) in cursor:
+        if match_id not in match_ids and match_id not in extra_match_ids:
+            continue
+        match_type = MATCH_TYPES[match_type]
+        if match_type == 'Singles':
+            player_a2_id = player_b2_id = None
+        team = (player_a1_id, player_a2_id or player_a1_id, player_b1_id, player_b2_id or player_b1_id)
+        try:
+            team_players = [players[player_id] for player_id in team]
+        except KeyError:
+            continue
+        league_mean = rating_total / rated_players if rated_players else 1500
+
+        # Same as fetch_rating_state, on the in-memory state
+        states = [rating_state(player[0], player[1], max(now - player[3], 0) / 86400 if player[3] is not None else 0,
+                               player[2], league_mean)
+                  for player in team_players]
+
+        if winner1_id == player_a1_id and (match_type == 'Singles' or winner2_id == player_a2_id):
+            score_a = 1
+        elif winner1_id == player_b1_id and (match_type == 'Singles' or winner2_id == player_b2_id):
+            score_a = 0
+        else:
+            score_a = 0.5
+        new_ratings = elo_match_update(*(state[0] for state in states), *(player[1] for player in team_players),
+                                       score_a, match_type, provisional=tuple(state[1] for state in states))
+
+        positions = (0, 2, 1, 3) if match_type == 'Doubles' else (0, 2)
+        for position in positions:
+            player_id = team[position]
+            player = team_players[position]
+            history.append((match_id, None, player_id, now, player[0], player[1], player[2], player[3],
+                            new_ratings[position]))
+            if player[1] > 0:
+                rating_total -= player[0]
+            else:
+                rated_players += 1
+            rating_total += new_ratings[position]
+            player[:] = [new_ratings[position], player[1] + 1, max(states[position][2] - 1, 0), now]
+            touched.add(player_id)
+
+        if not rated:
+            newly_rated.append((match_id,))
+        replayed += 1
+        if len(history) >= 100000:
+            writer.executemany(REPLAY_HISTORY_INSERT, history)
+            history = []
+
+    writer.executemany(REPLAY_HISTORY_INSERT, history)
+    if 'archive' in schemas:
+        # The new history of archived matches goes back with them
+        move_to_archive(writer, 'rating_history', 'match_id IN (SELECT id FROM archive.matches)', ())
+    writer.executemany('''
+        UPDATE players SET elo_rating = ?, matches_played = ?, placement_remaining = ?, last_played = ?
         WHERE id = ?
-    ''', (new_rating_b1, matches_b1 + 1, date_str, player_b1_id))
+    ''', [(players[player_id][0], players[player_id][1], players[player_id][2], players[player_id][3], player_id)
+          for player_id in touched])
+    writer.executemany('UPDATE matches SET rated = 1 WHERE id = ?', newly_rated)
+    conn.commit()
+    conn.close()
+    return replayed
 
-    if match_type == 'Doubles':  # Update player_b2 only in doubles
+def replay_reaches_archive(cursor, since):
+    """Attach the league's archive if a replay from `since` reaches into a closed season; True if it does."""
+    live = sandbox_source if sandbox_source is not None else DATABASE
+    if live != league_database(current_league) or not os.path.exists(archive_database()):
+        return False
+    if sandbox_source is not None:
+        cursor.execute('ATTACH DATABASE ? AS archive', (f'file:{archive_database()}?mode=ro',))  # Never written here
+    else:
+        attach_archive(cursor)
+    cursor.execute("SELECT 1 FROM archive.sqlite_master WHERE name = 'matches'")
+    reaches = cursor.fetchone() is not None
+    if reaches:
+        cursor.execute('SELECT MAX(date) FROM archive.matches')
+        last_archived = cursor.fetchone()[0]
+        reaches = last_archived is not None and last_archived >= since
+    if reaches and sandbox_source is not None:
+        raise ValueError('Leave the sandbox before changing results of a closed season')
+    if not reaches:
+        cursor.execute('DETACH DATABASE archive')
+    return reaches
+
+REPLAY_HISTORY_INSERT = '''
+    INSERT INTO rating_history (match_id, log_match_id, player_id, match_date, elo_before, matches_before,
+                                placement_before, last_played_before, elo_after)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Changesets: append-only bundles of players, sessions and matches for merging laptops
+CHANGESET_FORMAT = 1
+
+def export_changeset(file_path, since=None):
+    """Write every change after the `since` watermark (default: the last export). Returns the row counts."""
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT key, value FROM sync_state")
+    state = dict(cursor.fetchall())
+    if since is None:
+        since = int(state['last_export'])
+    version = int(state['version'])
+
+    # Only real matches: the copies update_elo records are rebuilt by replay_ratings.
+    # Bundles keep the text dates and match type names, whatever the storage format of either laptop
+    cursor.execute('''
+        SELECT m.uuid, datetime(m.date, 'unixepoch'), s.uuid, a1.uuid, a2.uuid, b1.uuid, b2.uuid, m.score_a, m.score_b, w1.uuid, w2.uuid,
+               m.match_type, m.field_number, m.predicted_a, m.rated, m.updated_at
+        FROM matches m
+        JOIN sessions s ON s.id = m.session_id
+        LEFT JOIN players a1 ON a1.id = m.player_a1_id
+        LEFT JOIN players a2 ON a2.id = m.player_a2_id
+        LEFT JOIN players b1 ON b1.id = m.player_b1_id
+        LEFT JOIN players b2 ON b2.id = m.player_b2_id
+        LEFT JOIN players w1 ON w1.id = m.winner1_id
+        LEFT JOIN players w2 ON w2.id = m.winner2_id
+        WHERE m.sync_version > ?
+        ORDER BY m.date, m.id
+    ''', (since,))
+    matches = [match[:11] + (match_type_name(match[11]),) + match[12:] for match in cursor.fetchall()]
+
+    # New rows plus everything the exported matches refer to, so a bundle applies on its own
+    changed_matches = 'SELECT {} FROM matches WHERE sync_version > ? AND session_id IS NOT NULL'
+    cursor.execute(f'''
+        SELECT p.uuid, p.name,
+               COALESCE((SELECT h.elo_before FROM rating_history h WHERE h.player_id = p.id ORDER BY h.id LIMIT 1),
+                        p.elo_rating),
+               p.updated_at
+        FROM players p
+        WHERE p.sync_version > ? OR p.id IN ({' UNION '.join(changed_matches.format(column) for column in
+                                                 ('player_a1_id', 'player_a2_id', 'player_b1_id', 'player_b2_id'))})
+    ''', (since,) * 5)
+    players = cursor.fetchall()
+    cursor.execute(f'''
+        SELECT uuid, name, match_type, datetime(date, 'unixepoch'), seed, pairing_method, num_fields, roster_snapshot,
+               chain_seed, search_iterations, updated_at
+        FROM sessions
+        WHERE sync_version > ? OR id IN ({changed_matches.format('session_id')})
+    ''', (since, since))
+    sessions = [session[:2] + (match_type_name(session[2]),) + session[3:] for session in cursor.fetchall()]
+
+    bundle = {'format': CHANGESET_FORMAT, 'origin': state['device_id'], 'league': current_league,
+              'from_version': since, 'to_version': version,
+              'players': players, 'sessions': sessions, 'matches': matches}
+    with gzip.open(file_path, 'wt', encoding='utf-8') as file:
+        json.dump(bundle, file, separators=(',', ':'))
+
+    cursor.execute("UPDATE sync_state SET value = ? WHERE key = 'last_export'", (version,))
+    conn.commit()
+    conn.close()
+    return {'players': len(players), 'sessions': len(sessions), 'matches': len(matches)}
+
+def import_changeset(file_path):
+    """Merge a bundle written by export_changeset, then replay ratings from the earliest merged match.
+
+    Rows are matched on their uuid, players also on their name. When both
+    laptops scored the same match differently, the later edit wins.
+    """
+    with gzip.open(file_path, 'rt', encoding='utf-8') as file:
+        bundle = json.load(file)
+    if bundle.get('format') != CHANGESET_FORMAT:
+        raise ValueError('Unsupported changeset format')
+
+    conn = connect_db()
+    cursor = conn.cursor()
+    summary = {'players': 0, 'sessions': 0, 'matches': 0, 'updated': 0, 'conflicts': 0, 'replayed': 0}
+
+    cursor.execute('SELECT uuid, id FROM players')
+    player_ids = dict(cursor.fetchall())
+    cursor.execute('SELECT name, id FROM players')
+    player_ids_by_name = dict(cursor.fetchall())
+    for uuid, name, elo_rating, updated_at in bundle['players']:
+        if uuid in player_ids:
+            continue
+        if name in player_ids_by_name:  # Added separately on both laptops
+            player_ids[uuid] = player_ids_by_name[name]
+            continue
+        cursor.execute('INSERT INTO players (uuid, name, elo_rating, updated_at) VALUES (?, ?, ?, ?)',
+                       (uuid, name, elo_rating, updated_at))
+        player_ids[uuid] = player_ids_by_name[name] = cursor.lastrowid
+        summary['players'] += 1
+
+    cursor.execute('SELECT uuid, id FROM sessions')
+    session_ids = dict(cursor.fetchall())
+    for session in bundle['sessions']:
+        if session[0] in session_ids:
+            continue
         cursor.execute('''
-            UPDATE players 
-            SET elo_rating = ?, matches_played = ?, last_played = ?
-            WHERE id = ?
-        ''', (new_rating_b2, matches_b2 + 1, date_str, player_b2_id))
+            INSERT INTO sessions (uuid, name, match_type, date, seed, pairing_method, num_fields, roster_snapshot,
+                                  chain_seed, search_iterations, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', session[:2] + [match_type_code(session[2]), to_epoch(session[3])] + session[4:])
+        session_ids[session[0]] = cursor.lastrowid
+        summary['sessions'] += 1
+
+    cursor.execute('SELECT uuid, id, score_a, score_b, rated, updated_at FROM matches WHERE session_id IS NOT NULL')
+    local_matches = {row[0]: row[1:] for row in cursor.fetchall()}
+    to_rate = []
+    earliest = None
+    for (uuid, date, session_uuid, a1, a2, b1, b2, score_a, score_b, winner1, winner2, match_type, field_number,
+         predicted_a, rated, updated_at) in bundle['matches']:
+        player_a1_id, player_a2_id, player_b1_id, player_b2_id, winner1_id, winner2_id = (
+            player_ids.get(uuid_) for uuid_ in (a1, a2, b1, b2, winner1, winner2))
+        local = local_matches.get(uuid)
+        if local is None:
+            cursor.execute('''
+                INSERT INTO matches (uuid, date, session_id, player_a1_id, player_a2_id, player_b1_id, player_b2_id,
+                                     score_a, score_b, winner1_id, winner2_id, match_type, field_number, predicted_a,
+                                     rated, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?)
+            ''', (uuid, to_epoch(date), session_ids[session_uuid], player_a1_id, player_a2_id, player_b1_id, player_b2_id,
+                  score_a, score_b, winner1_id, winner2_id, match_type_code(match_type), field_number, predicted_a,
+                  updated_at))
+            summary['matches'] += 1
+            match_id = cursor.lastrowid
+        else:
+            match_id, local_score_a, local_score_b, local_rated, local_updated_at = local
+            if (score_a, score_b) == (local_score_a, local_score_b) or not rated or updated_at <= local_updated_at:
+                continue  # Nothing new, or our own edit is the later one
+            if local_rated:
+                summary['conflicts'] += 1
+            cursor.execute('''
+                UPDATE matches SET score_a = ?, score_b = ?, winner1_id = ?, winner2_id = ?, updated_at = ?
+                WHERE id = ?
+            ''', (score_a, score_b, winner1_id, winner2_id, updated_at, match_id))
+            summary['updated'] += 1
+        if rated:
+            if not (local and local[3]):
+                to_rate.append(match_id)  # Already rated matches are rewound through rating_history
+            earliest = date if earliest is None else min(earliest, date)
+
+    cursor.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)',
+                   (f"imported:{bundle['origin']}", bundle['to_version']))
+    conn.commit()
+    conn.close()
 
-    # Record the match
-    cursor.execute('''
-        INSERT INTO matches (date, session_id, player_a1_id, player_a2_id, player_b1_id, player_b2_id, score_a, score_b, winner1_id, winner2_id, match_type, field_number)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), session_id, player_a1_id, player_a2_id, player_b1_id, player_b2_id,
-          int(score_a), int(score_b), winner1_id if winner1_id else None, winner2_id if winner2_id else None, match_type, field_number))
+    if earliest is not None:
+        summary['replayed'] = replay_ratings(earliest, to_rate)
+    return summary
+
+# Bulk import of historical results
+IMPORT_BATCH_SIZE = 50000  # Rows per executemany/commit
+BULK_CACHE_KIB = 256 * 1024  # Page cache for imports and replays, so index updates stay in memory
+
+def read_match_rows(file_path):
+    """Stream rows of a CSV (with a header row) or JSONL match file as dicts with normalized keys."""
+    if file_path.lower().endswith(('.jsonl', '.ndjson')):
+        with open(file_path, encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    yield {key.strip().lower().replace(' ', '_'): value for key, value in json.loads(line).items()}
+    else:
+        with open(file_path, newline='', encoding='utf-8-sig') as file:
+            reader = csv.reader(file)
+            keys = [key.strip().lower().replace(' ', '_') for key in next(reader, [])]
+            for row in reader:
+                if row:
+                    yield dict(zip(keys, row))
+
+def parse_match_row(row):
+    """(date as stored seconds, team_a, team_b, score_a, score_b) from an import row.
+
+    Players come from player_a1/player_a2/player_b1/player_b2 columns, or
+    from team_a/team_b written as "Name & Name" like the match history export.
+    Raises ValueError for rows that can't be used.
+    """
+    if 'team_a' in row:
+        team_a = [name.strip() for name in str(row['team_a']).split('&')]
+        team_b = [name.strip() for name in str(row['team_b']).split('&')]
+    else:
+        team_a = [str(row.get(key) or '').strip() for key in ('player_a1', 'player_a2')]
+        team_b = [str(row.get(key) or '').strip() for key in ('player_b1', 'player_b2')]
+    team_a = [name for name in team_a if name]
+    team_b = [name for name in team_b if name]
+    if not team_a or len(team_a) != len(team_b) or len(team_a) > 2:
+        raise ValueError('expected one or two players per side')
+    date = to_epoch(str(row['date']).strip())
+    return date, team_a, team_b, int(row['score_a']), int(row['score_b'])
+
+def import_match_history(file_path, batch_size=IMPORT_BATCH_SIZE):
+    """Import dated results in large batches, then rate them with one chronological replay.
+
+    Names are resolved through an in-memory dict; unknown names become new
+    players at the default rating. Matches are grouped into one session per
+    day. Returns a summary dict with the counts and the first few bad rows.
+    """
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute(f'PRAGMA cache_size = -{BULK_CACHE_KIB}')
+    cursor.execute('SELECT name, id FROM players')
+    player_ids = dict(cursor.fetchall())
+    session_ids = {}  # start of the day -> session id
+    summary = {'matches': 0, 'players': 0, 'sessions': 0, 'skipped': 0, 'errors': [], 'replayed': 0}
+    imported_ids = []  # One id range per batch: each batch is a single transaction, so its ids are contiguous
+    earliest = None
+
+    def player_id(name):
+        if name not in player_ids:
+            cursor.execute('INSERT INTO players (name) VALUES (?)', (name,))
+            player_ids[name] = cursor.lastrowid
+            summary['players'] += 1
+        return player_ids[name]
+
+    def insert_batch(batch):
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'matches'")
+        last_id = (cursor.fetchone() or (0,))[0]
+        # One change counter bump for the whole batch instead of the per-row sync trigger
+        cursor.execute("UPDATE sync_state SET value = value + 1 WHERE key = 'version'")
+        cursor.execute("SELECT value FROM sync_state WHERE key = 'version'")
+        sync_version = int(cursor.fetchone()[0])
+        # Random per batch, sequential within it: appends to the uuid index instead of scattering over it
+        uuid_prefix = os.urandom(8).hex()
+        cursor.executemany(f'''
+            INSERT INTO matches (date, session_id, player_a1_id, player_a2_id, player_b1_id, player_b2_id,
+                                 score_a, score_b, winner1_id, winner2_id, match_type, field_number, rated,
+                                 uuid, sync_version, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, 0, ?, {sync_version}, datetime('now'))
+        ''', (row + (f'{uuid_prefix}{index:016x}',) for index, row in enumerate(batch)))
+        conn.commit()
+        imported_ids.append(range(last_id + 1, last_id + 1 + len(batch)))
 
+    batch = []
+    for row_number, row in enumerate(read_match_rows(file_path), start=1):
+        try:
+            date, team_a, team_b, score_a, score_b = parse_match_row(row)
+        except (KeyError, TypeError, ValueError) as e:
+            summary['skipped'] += 1
+            if len(summary['errors']) < 10:
+                summary['errors'].append(f'row {row_number}: {e}')
+            continue
+
+        day = date - date % 86400
+        if day not in session_ids:
+            match_type = 'Doubles' if len(team_a) == 2 else 'Singles'
+            cursor.execute('INSERT INTO sessions (name, match_type, date) VALUES (?, ?, ?)',
+                           (f'Imported {format_epoch(day)[:10]}', match_type_code(match_type), day))
+            session_ids[day] = cursor.lastrowid
+            summary['sessions'] += 1
+
+        ids_a = [player_id(name) for name in team_a]
+        ids_b = [player_id(name) for name in team_b]
+        match_type = 'Doubles' if len(team_a) == 2 else 'Singles'
+        if match_type == 'Singles':
+            ids_a, ids_b = ids_a + [None], ids_b + [None]
+        if score_a > score_b:
+            winners = ids_a
+        elif score_b > score_a:
+            winners = ids_b
+        else:
+            winners = [None, None]
+        batch.append((date, session_ids[day], ids_a[0], ids_a[1], ids_b[0], ids_b[1], score_a, score_b,
+                      winners[0], winners[1], match_type_code(match_type)))
+        earliest = date if earliest is None else min(earliest, date)
+        if len(batch) >= batch_size:
+            insert_batch(batch)
+            summary['matches'] += len(batch)
+            batch = []
+    if batch:
+        insert_batch(batch)
+        summary['matches'] += len(batch)
     conn.commit()
     conn.close()
 
+    if earliest is not None:
+        if len(imported_ids) == 1:
+            new_match_ids = imported_ids[0]
+        else:
+            new_match_ids = set(itertools.chain.from_iterable(imported_ids))
+        summary['replayed'] = replay_ratings(earliest, new_match_ids)
+    return summary
+
+def benchmark_match_import(num_matches=1000000, num_players=2000, seed=1):
+    """Time import_match_history on a synthetic CSV in a scratch database."""
+    import tempfile
+    global DATABASE
+    rng = random.Random(seed)
+    names = [f'Player {i}' for i in range(num_players)]
+    saved_database = DATABASE
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, 'history.csv')
+        with open(file_path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['date', 'player_a1', 'player_a2', 'player_b1', 'player_b2', 'score_a', 'score_b'])
+            start, span = datetime(2015, 1, 1), (datetime(2025, 1, 1) - datetime(2015, 1, 1)) / num_matches
+            for index in range(num_matches):
+                date = start + span * index
+                players = rng.sample(names, 4)
+                if rng.random() < 0.2:
+                    players[1] = players[3] = ''  # Singles
+                score_a = rng.randrange(10, 22)
+                writer.writerow([date.strftime('%Y-%m-%d %H:%M:%S')] + players +
+                                [score_a, 21 if score_a < 21 else rng.randrange(10, 20)])
+        try:
+            DATABASE = os.path.join(temp_dir, 'benchmark.db')
+            init_db()
+            started = time.perf_counter()
+            summary = import_match_history(file_path)
+            elapsed = time.perf_counter() - started
+        finally:
+            DATABASE = saved_database
+    print(f"Imported {summary['matches']} matches, {summary['players']} players and "
+          f"{summary['sessions']} sessions, replayed {summary['replayed']} in {elapsed:.1f}s")
+    return elapsed
+
+# The text layout of schema 5 and earlier, as benchmark_storage's starting point
+LEGACY_SCHEMA = '''
+    CREATE TABLE players (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, elo_rating REAL DEFAULT 1500,
+                          matches_played INTEGER DEFAULT 0, last_played DATETIME, skill_rating REAL,
+                          placement_remaining INTEGER DEFAULT 0, active INTEGER NOT NULL DEFAULT 1, archived_at TEXT,
+                          gender TEXT, uuid TEXT, sync_version INTEGER, updated_at TEXT);
+    CREATE TABLE sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, match_type TEXT, date TEXT,
+                           seed INTEGER, pairing_method TEXT, num_fields INTEGER, roster_snapshot TEXT,
+                           chain_seed INTEGER, search_iterations INTEGER, constraints_snapshot TEXT, uuid TEXT,
+                           sync_version INTEGER, updated_at TEXT);
+    CREATE TABLE matches (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL, session_id INTEGER,
+                          player_a1_id INTEGER, player_a2_id INTEGER, player_b1_id INTEGER, player_b2_id INTEGER,
+                          team_a_names TEXT, team_b_names TEXT, score_a INTEGER, score_b INTEGER, winner1_id INTEGER,
+                          winner2_id INTEGER, match_type TEXT, field_number INTEGER, predicted_a REAL,
+                          rated INTEGER DEFAULT 0, uuid TEXT, sync_version INTEGER, updated_at TEXT);
+    CREATE TABLE rating_history (id INTEGER PRIMARY KEY AUTOINCREMENT, match_id INTEGER, log_match_id INTEGER,
+                                 player_id INTEGER, match_date TEXT, elo_before REAL, matches_before INTEGER,
+                                 placement_before INTEGER, last_played_before TEXT, elo_after REAL);
+    CREATE INDEX idx_players_active ON players(last_played) WHERE active = 1;
+    CREATE UNIQUE INDEX idx_matches_uuid ON matches(uuid);
+    CREATE INDEX idx_matches_sync_version ON matches(sync_version);
+    CREATE INDEX idx_matches_session ON matches(session_id);
+    CREATE INDEX idx_rating_history_date ON rating_history(match_date);
+    CREATE INDEX idx_rating_history_player ON rating_history(player_id, id);
+'''
+
+def benchmark_storage(num_matches=200000, num_players=2000, runs=3, seed=1):
+    """DB size and query times of a synthetic league in the schema 5 text layout and after upgrade_storage."""
+    import tempfile
+    global DATABASE
+    rng = random.Random(seed)
+    start, span = datetime(2015, 1, 1), (datetime(2025, 1, 1) - datetime(2015, 1, 1)) / num_matches
+    text = lambda moment: moment.strftime('%Y-%m-%d %H:%M:%S')
+    saved_database = DATABASE
+    with tempfile.TemporaryDirectory() as temp_dir:
+        legacy_path = os.path.join(temp_dir, 'legacy.db')
+        conn = sqlite3.connect(legacy_path)
+        conn.executescript(LEGACY_SCHEMA)
+        # Like a league after years of play: every scored match also has update_elo's copy and rating history
+        ratings = [[1500.0, 0, None] for _ in range(num_players)]  # rating, matches, last played
+        sessions, matches, history = [], [], []
+        for index in range(num_matches):
+            moment = start + span * index
+            day = text(moment)[:10]
+            if not sessions or sessions[-1][1] != day:
+                sessions.append((f'Session on {day}', day, 'Doubles'))
+            players = rng.sample(range(num_players), 4)
+            doubles = rng.random() >= 0.2
+            if not doubles:
+                players[1] = players[3] = None
+            score_a = rng.randrange(10, 22)
+            score_b = 21 if score_a < 21 else rng.randrange(10, 20)
+            winners = players[:2] if score_a > score_b else players[2:]
+            ids = [player + 1 if player is not None else None for player in players]
+            match_id = len(matches) + 1
+            for log_copy in (False, True):
+                matches.append((text(moment + timedelta(minutes=30 * log_copy)), None if log_copy else len(sessions),
+                                *ids, score_a, score_b, *(player + 1 if player is not None else None for player in winners),
+                                'Doubles' if doubles else 'Singles', index % 8 + 1, rng.random(), 1,
+                                os.urandom(16).hex(), index, text(moment)))
+            for position, player in enumerate(players):
+                if player is None:
+                    continue
+                state = ratings[player]
+                change = rng.gauss(0, 10)
+                history.append((match_id, match_id + 1, player + 1, text(moment), state[0], state[1], 0, state[2],
+                                state[0] + change))
+                ratings[player] = [state[0] + change, state[1] + 1, text(moment)]
+        conn.executemany("INSERT INTO sessions (name, date, match_type, uuid) VALUES (?, ? || ' 19:00:00', ?, "
+                         "lower(hex(randomblob(16))))", sessions)
+        conn.executemany('''
+            INSERT INTO matches (date, session_id, player_a1_id, player_a2_id, player_b1_id, player_b2_id, score_a,
+                                 score_b, winner1_id, winner2_id, match_type, field_number, predicted_a, rated, uuid,
+                                 sync_version, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', matches)
+        conn.executemany('''
+            INSERT INTO rating_history (match_id, log_match_id, player_id, match_date, elo_before, matches_before,
+                                        placement_before, last_played_before, elo_after)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', history)
+        conn.executemany('INSERT INTO players (name, elo_rating, matches_played, last_played, uuid) '
+                         'VALUES (?, ?, ?, ?, lower(hex(randomblob(16))))',
+                         [(f'Player {index}', *state) for index, state in enumerate(ratings)])
+        conn.commit()
+        conn.execute('VACUUM')
+        conn.close()
+
+        upgraded_path = os.path.join(temp_dir, 'upgraded.db')
+        with open(legacy_path, 'rb') as source, open(upgraded_path, 'wb') as target:
+            target.write(source.read())
+        try:
+            DATABASE = upgraded_path
+            started = time.perf_counter()
+            init_db()
+            migration = time.perf_counter() - started
+        finally:
+            DATABASE = saved_database
+        conn = sqlite3.connect(upgraded_path)
+        conn.execute('VACUUM')
+        conn.close()
+
+        # (label, query, parameters in the text layout, parameters after the upgrade)
+        recent = start + span * int(num_matches * 0.99)
+        session_ids = rng.sample(range(1, len(sessions) + 1), min(500, len(sessions)))
+        player_ids = rng.sample(range(1, num_players + 1), min(50, num_players))
+        queries = [
+            ('Match history', [MATCH_HISTORY_QUERY.format(schema='main') + ' ORDER BY 1 DESC, 9 DESC'], [()], [()]),
+            ('Replay of the last 1%', ['''
+                SELECT id, date, player_a1_id, player_a2_id, player_b1_id, player_b2_id, winner1_id, winner2_id,
+                       match_type, rated
+                FROM matches WHERE session_id IS NOT NULL AND date >= ? ORDER BY date, id
+            '''], [(text(recent),)], [(to_epoch(recent),)]),
+            ('Season totals', ['''
+                SELECT COUNT(*) FROM matches m JOIN sessions s ON s.id = m.session_id WHERE s.date < ?
+            '''], [(text(recent),)], [(to_epoch(recent),)]),
+            (f'Courts of {len(session_ids)} sessions', ['SELECT id FROM matches WHERE session_id = ? ORDER BY field_number'],
+             [(session_id,) for session_id in session_ids], [(session_id,) for session_id in session_ids]),
+            (f'Rating charts of {len(player_ids)} players',
+             ['SELECT id, match_date, elo_after FROM rating_history WHERE player_id = ? AND id >= 0 ORDER BY 1'],
+             [(player_id,) for player_id in player_ids], [(player_id,) for player_id in player_ids]),
+        ]
+
+        def time_queries(path, which):
+            conn = sqlite3.connect(path)
+            timings = []
+            for _, (query,), *parameters in queries:
+                best = None
+                for _ in range(runs):
+                    started = time.perf_counter()
+                    for values in parameters[which]:
+                        conn.execute(query, values).fetchall()
+                    elapsed = (time.perf_counter() - started) * 1000
+                    best = elapsed if best is None else min(best, elapsed)
+                timings.append(best)
+            conn.close()
+            return timings
+
+        legacy_times, upgraded_times = time_queries(legacy_path, 0), time_queries(upgraded_path, 1)
+        sizes = os.path.getsize(legacy_path), os.path.getsize(upgraded_path)
+
+    print(f'{num_matches} matches ({len(matches)} rows with update_elo\'s copies), {len(history)} rating history rows, '
+          f'{num_players} players; upgrade took {migration:.1f}s')
+    print(f'Database size: {sizes[0] / 2 ** 20:.1f} MB -> {sizes[1] / 2 ** 20:.1f} MB '
+          f'({100 * (1 - sizes[1] / sizes[0]):.0f}% smaller)')
+    for (label, *_), before, after in zip(queries, legacy_times, upgraded_times):
+        print(f'{label}: {before:.1f} ms -> {after:.1f} ms ({before / max(after, 1e-6):.1f}x)')
+    return {'sizes': sizes, 'migration': migration,
+            'queries': {label: (before, after) for (label, *_), before, after in zip(queries, legacy_times, upgraded_times)}}
+
 # Utility Functions
 def get_player_id(name):
-    conn = sqlite3.connect(DATABASE)
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute('SELECT id FROM players WHERE name = ?', (name,))
     result = cursor.fetchone()
@@ -202,7 +1549,7 @@ def get_player_id(name):
     return result[0] if result else None
 
 def get_player_elo_rating(player_name):
-    conn = sqlite3.connect(DATABASE)
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute('''
         SELECT elo_rating FROM players WHERE name = ?
@@ -212,28 +1559,29 @@ def get_player_elo_rating(player_name):
     return result[0] if result else 0  # Return 0 if no ELO found 
 
 def remove_matches_without_winner():
-    conn = sqlite3.connect(DATABASE)
+    conn = connect_db()
     cursor = conn.cursor()
     
-    # Delete rows where winner1_id is NULL
-    cursor.execute('DELETE FROM matches WHERE winner1_id IS NULL')
+    # Delete rows where winner1_id is NULL, except rated draws: those are results other laptops replay too.
+    # Tournament games stay scheduled until they are played
+    cursor.execute('''
+        DELETE FROM matches WHERE winner1_id IS NULL AND (session_id IS NULL OR rated = 0)
+        AND NOT EXISTS (SELECT 1 FROM sessions s WHERE s.id = matches.session_id AND s.tournament_id IS NOT NULL)
+    ''')
     
     conn.commit()
     conn.close()
 
-def get_match_history():
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute('''
+MATCH_HISTORY_QUERY = '''
         SELECT m.date,
                 CASE
-                    WHEN pa2.name IS NOT NULL THEN pa1.name || ' & ' || pa2.name
-                    ELSE pa1.name
+                    WHEN pa2.name IS NOT NULL THEN COALESCE(pa1.name, '?') || ' & ' || pa2.name
+                    ELSE COALESCE(pa1.name, '?')
                 END AS team_a_names, 
                    
                 CASE
-                    WHEN pb2.name IS NOT NULL THEN pb1.name || ' & ' || pb2.name
-                    ELSE pb1.name
+                    WHEN pb2.name IS NOT NULL THEN COALESCE(pb1.name, '?') || ' & ' || pb2.name
+                    ELSE COALESCE(pb1.name, '?')
                 END AS team_b_names, 
                    
                 m.score_a, m.score_b,
@@ -243,63 +1591,2828 @@ def get_match_history():
                     WHEN pw2.name IS NOT NULL THEN pw2.name
                     ELSE 'N/A'
                 END AS winner_team,
-                m.match_type, m.field_number
-        FROM matches m
-        JOIN players pa1 ON m.player_a1_id = pa1.id
-        LEFT JOIN players pa2 ON m.player_a2_id = pa2.id
-        JOIN players pb1 ON m.player_b1_id = pb1.id
-        LEFT JOIN players pb2 ON m.player_b2_id = pb2.id
-        LEFT JOIN players pw1 ON m.winner1_id = pw1.id
-        LEFT JOIN players pw2 ON m.winner2_id = pw2.id
-        JOIN sessions s ON m.session_id = s.id
-        ORDER BY m.date DESC
-    ''')
+                m.match_type, m.field_number, m.id
+        FROM {schema}.matches m
+        -- Foreign keys don't reach across into the archive file: never let a missing player hide a game
+        LEFT JOIN main.players pa1 ON m.player_a1_id = pa1.id
+        LEFT JOIN main.players pa2 ON m.player_a2_id = pa2.id
+        LEFT JOIN main.players pb1 ON m.player_b1_id = pb1.id
+        LEFT JOIN main.players pb2 ON m.player_b2_id = pb2.id
+        LEFT JOIN main.players pw1 ON m.winner1_id = pw1.id
+        LEFT JOIN main.players pw2 ON m.winner2_id = pw2.id
+        JOIN {schema}.sessions s ON m.session_id = s.id
+'''
+
+def get_match_history(include_archive=False):
+    conn = connect_db()
+    cursor = conn.cursor()
+    query = MATCH_HISTORY_QUERY.format(schema='main')
+    if include_archive and attach_archive(cursor):
+        query += ' UNION ALL ' + MATCH_HISTORY_QUERY.format(schema='archive')
+    cursor.execute(query + ' ORDER BY 1 DESC, 9 DESC')  # Date, then match id
     matches = cursor.fetchall()
     conn.close()
     return matches
 
+def get_match_history_changes(since_version):
+    """(change version, matches in the live database, history rows inserted or rescored after since_version)."""
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT value FROM sync_state WHERE key = 'version'")
+    version = int(cursor.fetchone()[0])
+    cursor.execute('SELECT COUNT(*) FROM matches WHERE session_id IS NOT NULL')
+    num_matches = cursor.fetchone()[0]
+    cursor.execute(MATCH_HISTORY_QUERY.format(schema='main') + ' WHERE m.sync_version > ? ORDER BY 1 DESC, 9 DESC',
+                   (since_version,))
+    changes = cursor.fetchall()
+    conn.close()
+    return version, num_matches, changes
 
 def get_performance_data():
-    conn = sqlite3.connect(DATABASE)
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute('''
-        SELECT name, elo_rating, matches_played FROM players
+        SELECT id, name, elo_rating, matches_played, skill_rating FROM players WHERE active = 1
             order by elo_rating desc
     ''')
     players = cursor.fetchall()
+
+    # Wins from archived seasons, which are no longer in the matches table
+    archived_wins = dict(cursor.execute('''
+        SELECT player_id, SUM(wins) FROM season_stats GROUP BY player_id
+    ''').fetchall())
+
+    # Every player's wins in one pass over the matches: a player wins when their slot is a winner slot.
+    # Count each match once: update_elo also records a copy of it without a session
+    wins = dict(cursor.execute('''
+        SELECT player_id, COUNT(*) FROM (
+            SELECT player_a1_id AS player_id FROM matches WHERE session_id IS NOT NULL AND winner1_id = player_a1_id
+            UNION ALL
+            SELECT player_a2_id FROM matches WHERE session_id IS NOT NULL AND winner2_id = player_a2_id
+            UNION ALL
+            SELECT player_b1_id FROM matches WHERE session_id IS NOT NULL AND winner1_id = player_b1_id
+            UNION ALL
+            SELECT player_b2_id FROM matches WHERE session_id IS NOT NULL AND winner2_id = player_b2_id)
+        GROUP BY player_id
+    ''').fetchall())
+
+    # Rank on the inactivity adjusted rating
+    effective = get_effective_ratings(cursor=cursor)
     conn.close()
+    players.sort(key=lambda player: effective[player[1]][0], reverse=True)
 
     # Calculate win rates
     performance_data = []
-    for name, elo, matches_played in players:
+    for player_id, name, elo, matches_played, skill in players:
         if matches_played == 0:
             win_rate = 'N/A'
         else:
-            conn = sqlite3.connect(DATABASE)
+            win_rate = f"{(wins.get(player_id, 0) + archived_wins.get(player_id, 0)) / matches_played * 100 :.2f}%"
+        skill_text = str(int(skill)) if skill is not None else 'N/A'
+        elo, provisional = effective[name]
+        status = 'Provisional' if provisional else 'Established'
+        performance_data.append((name, int(elo), matches_played, win_rate, skill_text, status))
+    return performance_data
+
+# Season archiving: closed seasons move to archives/<league>.db, summaries stay in the live database
+def archive_database():
+    return os.path.join(ARCHIVE_DIR, f'{current_league}.db')
+
+def attach_archive(cursor):
+    """ATTACH the league's archive as `archive`; False when nothing has been archived yet."""
+    if not os.path.exists(archive_database()):
+        return False
+    cursor.execute('ATTACH DATABASE ? AS archive', (archive_database(),))
+    return True
+
+def move_to_archive(cursor, table, where, params):
+    """Move main.<table> rows matching `where` to archive.<table>, adding columns the archive lacks."""
+    cursor.execute(f'PRAGMA main.table_info({table})')
+    columns = [(row[1], row[2]) for row in cursor.fetchall()]
+    cursor.execute(f'PRAGMA archive.table_info({table})')
+    existing = {row[1] for row in cursor.fetchall()}
+    if not existing:
+        cursor.execute(f'CREATE TABLE archive.{table} AS SELECT * FROM main.{table} WHERE 0')
+    for name, declaration in columns:
+        if existing and name not in existing:
+            cursor.execute(f'ALTER TABLE archive.{table} ADD COLUMN {name} {declaration}')
+    names = ', '.join(name for name, _ in columns)
+    cursor.execute(f'INSERT INTO archive.{table} ({names}) SELECT {names} FROM main.{table} WHERE {where}', params)
+    cursor.execute(f'DELETE FROM main.{table} WHERE {where}', params)
+    return cursor.rowcount
+
+def close_season(name, end_date):
+    """Archive every session before end_date ('YYYY-MM-DD') as season `name`. Returns the number of matches moved."""
+    if sandbox_source is not None:
+        raise ValueError('Commit or discard the sandbox before closing a season')
+    end_date = datetime.strptime(end_date, '%Y-%m-%d').strftime('%Y-%m-%d')
+    end = to_epoch(end_date)
+    backup_database('before-season-close')
+
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM seasons WHERE name = ?', (name,))
+    if cursor.fetchone():
+        conn.close()
+        raise ValueError(f'Season {name} already exists')
+    cursor.execute('SELECT MIN(date) FROM sessions WHERE date < ?', (end,))
+    start_date = cursor.fetchone()[0]
+    if start_date is None:
+        conn.close()
+        raise ValueError(f'No sessions before {end_date}')
+
+    # Per-player results of the season's rated matches
+    cursor.execute('''
+        WITH season AS (
+            SELECT m.* FROM matches m JOIN sessions s ON s.id = m.session_id WHERE s.date < ? AND m.rated = 1
+        ), appearances AS (
+            SELECT player_a1_id AS player_id, score_a - score_b AS margin FROM season
+            UNION ALL SELECT player_a2_id, score_a - score_b FROM season WHERE player_a2_id IS NOT NULL
+            UNION ALL SELECT player_b1_id, score_b - score_a FROM season
+            UNION ALL SELECT player_b2_id, score_b - score_a FROM season WHERE player_b2_id IS NOT NULL
+        )
+        SELECT a.player_id, p.name, p.elo_rating, COUNT(*), SUM(margin > 0), SUM(margin < 0), SUM(margin = 0)
+        FROM appearances a JOIN players p ON p.id = a.player_id
+        GROUP BY a.player_id
+    ''', (end,))
+    stats = cursor.fetchall()
+    cursor.execute('''
+        SELECT COUNT(*) FROM matches m JOIN sessions s ON s.id = m.session_id WHERE s.date < ?
+    ''', (end,))
+    num_matches = cursor.fetchone()[0]
+    cursor.execute('SELECT player_id, elo_after FROM rating_history WHERE match_date < ? ORDER BY id', (end,))
+    final_ratings = dict(cursor.fetchall())  # Last rating of the season, where the history has it
+
+    cursor.execute('''
+        INSERT INTO seasons (name, start_date, end_date, matches, archived_at) VALUES (?, ?, ?, ?, ?)
+    ''', (name, start_date, end, num_matches, to_epoch(datetime.now())))
+    season_id = cursor.lastrowid
+    cursor.executemany('''
+        INSERT INTO season_stats (season_id, player_id, name, final_rating, matches, wins, losses, draws)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(season_id, player_id, player_name, final_ratings.get(player_id, elo_rating), matches, wins, losses, draws)
+          for player_id, player_name, elo_rating, matches, wins, losses, draws in stats])
+
+    cursor.execute('ATTACH DATABASE ? AS archive', (archive_database(),))
+    upgrade_storage(cursor, 'archive')  # Normally done when the league was opened
+    # update_elo's copies have no session, so they go by their own date
+    move_to_archive(cursor, 'matches', '''
+        session_id IN (SELECT id FROM main.sessions WHERE date < ?) OR (session_id IS NULL AND date < ?)
+    ''', (end, end))
+    move_to_archive(cursor, 'sessions', 'date < ?', (end,))
+    move_to_archive(cursor, 'rating_history', 'match_date < ?', (end,))
+    cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_archive_matches_date ON matches(date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_archive_rating_history_player ON rating_history(player_id, id)')
+    conn.commit()
+    cursor.execute('DETACH DATABASE archive')
+
+    # Hand the freed pages back to the file system
+    conn.execute('VACUUM')
+    conn.close()
+    return num_matches
+
+def get_seasons():
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, name, date(start_date, 'unixepoch'), date(end_date, 'unixepoch'), matches FROM seasons
+        ORDER BY end_date DESC
+    ''')
+    seasons = cursor.fetchall()
+    conn.close()
+    return seasons
+
+def get_season_stats(season_id):
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT name, final_rating, matches, wins, losses, draws FROM season_stats
+        WHERE season_id = ? ORDER BY final_rating DESC
+    ''', (season_id,))
+    stats = cursor.fetchall()
+    conn.close()
+    return stats
+
+# Rating history charts
+
+def get_rating_history(player_id, since_id=0):
+    """[(history id, match date, rating after the match)] of a player, oldest first.
+
+    With since_id only that row and the newer ones are read, for topping up an
+    open chart; a full read also includes the archived seasons.
+    """
+    conn = connect_db()
+    cursor = conn.cursor()
+    query = 'SELECT id, match_date, elo_after FROM {schema}.rating_history WHERE player_id = ? AND id >= ?'
+    queries = [query.format(schema='main')]
+    if since_id == 0 and attach_archive(cursor):
+        cursor.execute("SELECT 1 FROM archive.sqlite_master WHERE name = 'rating_history'")
+        if cursor.fetchone():
+            queries.insert(0, query.format(schema='archive'))
+    cursor.execute(' UNION ALL '.join(queries) + ' ORDER BY 1', (player_id, since_id) * len(queries))
+    history = cursor.fetchall()
+    conn.close()
+    return history
+
+def downsample_lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets: at most `threshold` of the (x, y) points, keeping the peaks and dips.
+
+    The first and last points are kept; every bucket in between contributes
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket.
+    """
+    if threshold < 3 or len(points) <= threshold:
+        return list(points)
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_bucket = points[end:min(int((bucket + 2) * bucket_size) + 1, len(points))]
+        average_x = sum(point[0] for point in next_bucket) / len(next_bucket)
+        average_y = sum(point[1] for point in next_bucket) / len(next_bucket)
+        previous_x, previous_y = points[previous]
+        best_area = -1
+        for index in range(start, end):
+            x, y = points[index]
+            area = abs((previous_x - average_x) * (y - previous_y) - (previous_x - x) * (average_y - previous_y))
+            if area > best_area:
+                best_area, previous = area, index
+        sampled.append(points[previous])
+    sampled.append(points[-1])
+    return sampled
+
+# Individual skill estimation (Bradley-Terry / logistic team model).
+# P(team A wins) = sigmoid(sum of A skills - sum of B skills), fitted by
+# truncated Newton steps over the sparse player x match design matrix.
+ELO_PER_LOGIT = 400 / math.log(10)  # Converts skills to the ELO scale used by calculate_expected_score
+
+
+def fit_team_skills(match_rows, match_cols, signs, outcomes, num_players, l2=0.3,
+                    newton_steps=15, cg_steps=25, tolerance=1e-6):
+    """Maximum a posteriori skills (in logits) for the logistic team model.
+
+    The design matrix is given in coordinate form: entry (match_rows[k],
+    match_cols[k]) is signs[k] (+1 for team A, -1 for team B). outcomes holds
+    1, 0 or 0.5 (draw) for team A. `l2` is the Gaussian prior precision that
+    keeps players with few matches close to the average.
+    """
+    import numpy as np
+    match_rows = np.asarray(match_rows, dtype=np.int64)
+    match_cols = np.asarray(match_cols, dtype=np.int64)
+    signs = np.asarray(signs, dtype=np.float64)
+    outcomes = np.asarray(outcomes, dtype=np.float64)
+    num_matches = len(outcomes)
+    skills = np.zeros(num_players)
+    if num_matches == 0:
+        return skills
+
+    def design_dot(vector):  # X @ vector
+        return np.bincount(match_rows, weights=signs * vector[match_cols], minlength=num_matches)
+
+    def design_t_dot(vector):  # X.T @ vector
+        return np.bincount(match_cols, weights=signs * vector[match_rows], minlength=num_players)
+
+    for _ in range(newton_steps):
+        probabilities = 1 / (1 + np.exp(-design_dot(skills)))
+        gradient = design_t_dot(outcomes - probabilities) - l2 * skills
+        if np.max(np.abs(gradient)) < tolerance:
+            break
+        weights = probabilities * (1 - probabilities)
+        diagonal = np.bincount(match_cols, weights=weights[match_rows], minlength=num_players) + l2
+
+        # Solve H step = gradient with Jacobi-preconditioned conjugate gradient,
+        # H = X.T W X + l2 I applied matrix-free
+        step = np.zeros(num_players)
+        residual = gradient.copy()
+        preconditioned = residual / diagonal
+        direction = preconditioned.copy()
+        rz = residual @ preconditioned
+        for _ in range(cg_steps):
+            h_direction = design_t_dot(weights * design_dot(direction)) + l2 * direction
+            alpha = rz / (direction @ h_direction)
+            step += alpha * direction
+            residual -= alpha * h_direction
+            if np.sqrt(residual @ residual) < tolerance:
+                break
+            preconditioned = residual / diagonal
+            rz_next = residual @ preconditioned
+            direction = preconditioned + (rz_next / rz) * direction
+            rz = rz_next
+        skills += step
+    return skills
+
+
+def fit_skill_ratings(l2=0.3):
+    """Fit individual skill from the whole match history and store it in players.skill_rating.
+
+    Unlike update_elo, which gives both doubles partners the same delta, this
+    separates a strong player from a weaker partner over many matches.
+    Returns the number of matches used.
+    """
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, elo_rating FROM players')
+    players = cursor.fetchall()
+    player_ids = [player_id for player_id, _ in players]
+    # Skills are centred on the current average ELO so both columns are comparable
+    offset = sum(elo for _, elo in players) / len(players) if players else 1500
+    column_of = {player_id: i for i, player_id in enumerate(player_ids)}
+
+    # Only the session rows are real matches (update_elo also logs a copy without a session)
+    cursor.execute('''
+        SELECT player_a1_id, player_a2_id, player_b1_id, player_b2_id, score_a, score_b
+        FROM matches
+        WHERE session_id IS NOT NULL AND rated = 1
+    ''')
+    match_rows, match_cols, signs, outcomes = [], [], [], []
+    for row, (a1, a2, b1, b2, score_a, score_b) in enumerate(cursor):
+        for player_id, sign in ((a1, 1.0), (a2, 1.0), (b1, -1.0), (b2, -1.0)):
+            if player_id in column_of:
+                match_rows.append(row)
+                match_cols.append(column_of[player_id])
+                signs.append(sign)
+        outcomes.append(1.0 if score_a > score_b else 0.0 if score_b > score_a else 0.5)
+
+    skills = fit_team_skills(match_rows, match_cols, signs, outcomes, len(player_ids), l2=l2)
+    cursor.executemany('UPDATE players SET skill_rating = ? WHERE id = ?',
+                       [(offset + ELO_PER_LOGIT * float(skill), player_id)
+                        for player_id, skill in zip(player_ids, skills)])
+    conn.commit()
+    conn.close()
+    return len(outcomes)
+
+
+def get_skill_ratings(player_names):
+    """Fitted skill ratings for the given players (ELO rating if not fitted yet)."""
+    conn = connect_db()
+    cursor = conn.cursor()
+    ratings = {}
+    names = list(player_names)
+    for start in range(0, len(names), 500):
+        chunk = names[start:start + 500]
+        placeholders = ', '.join('?' for _ in chunk)
+        cursor.execute(f'SELECT name, COALESCE(skill_rating, elo_rating) FROM players WHERE name IN ({placeholders})', chunk)
+        ratings.update(cursor.fetchall())
+    conn.close()
+    return ratings
+
+
+def benchmark_skill_fit(num_players=5000, num_matches=500000, seed=1):
+    """Time fit_team_skills on a synthetic doubles league and report how well it recovers skill."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    true_skills = rng.normal(0, 1, num_players)
+    players = np.array([rng.choice(num_players, 4, replace=False) for _ in range(num_matches)])
+    margin = true_skills[players[:, 0]] + true_skills[players[:, 1]] - true_skills[players[:, 2]] - true_skills[players[:, 3]]
+    outcomes = (rng.random(num_matches) < 1 / (1 + np.exp(-margin))).astype(np.float64)
+    match_rows = np.repeat(np.arange(num_matches), 4)
+    match_cols = players.ravel()
+    signs = np.tile([1.0, 1.0, -1.0, -1.0], num_matches)
+
+    start = time.perf_counter()
+    skills = fit_team_skills(match_rows, match_cols, signs, outcomes, num_players)
+    elapsed = time.perf_counter() - start
+    correlation = np.corrcoef(skills, true_skills)[0, 1]
+    print(f"{num_players} players x {num_matches} matches fitted in {elapsed:.2f}s "
+          f"(correlation with true skill {correlation:.3f})")
+
+
+# Matchmaking
+def generate_tiered_matchups(assigned_players, player_elos, match_type, num_fields, rng=random, verbose=True):
+    """Group players into random ELO tiers and pair them up within each tier.
+
+    Returns (matches, bench_players). Doubles matches are ((a1, a2), (b1, b2)),
+    singles matches are (a, b). `rng` only needs `randint` and `shuffle`.
+    """
+    log = print if verbose else (lambda *args: None)
+    # Sort players by ELO ratings (strongest to weakest)
+    sorted_players = sorted(assigned_players, key=lambda player: player_elos[player], reverse=False)
+
+    # Determine number of tiers (2 to 4)
+    num_tiers = rng.randint(2, 4)
+    log("Number of Tiers:", num_tiers)
+
+    # Calculate the size of each tier
+    players_per_tier = len(sorted_players) // num_tiers
+    remainder = len(sorted_players) % num_tiers
+
+    # Create tiers
+    tiers = []
+    start_index = 0
+
+    for tier_index in range(num_tiers):
+        # Distribute the remainder among the first 'remainder' tiers
+        end_index = start_index + players_per_tier + (1 if tier_index < remainder else 0)
+        tier = sorted_players[start_index:end_index]
+        tiers.append(tier)
+        start_index = end_index
+
+    matches = []
+    matched_players = set()  # To track players already in a match
+    bench_players = []  # To track players left on the bench
+
+    # Generate matchups starting from the weakest tier
+    for tier_index in range(num_tiers):
+        tier = tiers[tier_index]
+        num_players = len(tier)
+        log(f"Processing Tier {tier_index + 1} with {num_players} players.")
+
+        if match_type == 'Doubles':
+            # Shuffle players within the tier to randomize team assignments
+            rng.shuffle(tier)
+            teams = []
+
+            # Pair players into teams of two
+            for i in range(0, num_players, 2):
+                if i + 1 < num_players:
+                    team = (tier[i], tier[i + 1])
+                    teams.append(team)
+                    matched_players.update(team)
+                else:
+                    # Handle odd player by leaving them for singles
+                    leftover_player = tier[i]
+                    # Try to pair with the next tier
+                    if tier_index + 1 < num_tiers:
+                        tiers[tier_index + 1].append(leftover_player)
+                    else:
+                        bench_players.append(leftover_player)
+                    log(f"Leftover Player in Tier {tier_index + 1}: {leftover_player}")
+
+            # Shuffle teams to randomize match pairings
+            rng.shuffle(teams)
+
+            # Pair teams against each other within the same tier
+            for i in range(0, len(teams), 2):
+                if i + 1 < len(teams):
+                    team_a = teams[i]
+                    team_b = teams[i + 1]
+                    matches.append((team_a, team_b))
+                else:
+                    # Handle odd number of teams by leaving the last team for singles
+                    leftover_team = teams[i]
+                    bench_players.extend(leftover_team)  # Add all team members to the bench
+                    log(f"Leftover Team in Tier {tier_index + 1}: {leftover_team}")
+
+        else:  # Singles
+            # Shuffle players within the tier to randomize match pairings
+            rng.shuffle(tier)
+
+            # Pair players directly
+            for i in range(0, num_players, 2):
+                if i + 1 < num_players:
+                    player_a = tier[i]
+                    player_b = tier[i + 1]
+                    matches.append((player_a, player_b))
+                    matched_players.update([player_a, player_b])
+                else:
+                    # Handle odd player by leaving them on the bench
+                    leftover_player = tier[i]
+                    # Try to pair with the next tier
+                    if tier_index + 1 < num_tiers:
+                        tiers[tier_index + 1].append(leftover_player)
+                    else:
+                        bench_players.append(leftover_player)
+                    log(f"Leftover Player on Bench in Tier {tier_index + 1}: {leftover_player}")
+
+    # Step 2: Try to form additional doubles using bench players
+    while len(bench_players) >= 4:
+        # Take the first four players to form two teams for a doubles match
+        team_a = (bench_players.pop(0), bench_players.pop(0))
+        team_b = (bench_players.pop(0), bench_players.pop(0))
+        matches.append((team_a, team_b))
+
+    # Step 3: Create singles matches if 3 or fewer players are left on the bench and fields are available
+    max_matches = num_fields
+
+    while len(bench_players) >= 2 and len(matches) < max_matches:
+        player_a = bench_players.pop(0)
+        player_b = bench_players.pop(0)
+        matches.append((player_a, player_b))
+
+    # Shuffle matches for random assignment to fields
+    rng.shuffle(matches)
+
+    # Respect the maximum number of fields
+    if len(matches) > max_matches:
+        # Move extra teams or players to the bench
+        extra_matches = matches[max_matches:]
+        matches = matches[:max_matches]
+
+        for match in extra_matches:
+            if isinstance(match[0], tuple) and isinstance(match[1], tuple):
+                # Double team match
+                team_a, team_b = match
+                bench_players.extend(team_a)
+                bench_players.extend(team_b)
+            elif isinstance(match[0], str) and isinstance(match[1], str):
+                # Singles match
+                bench_players.append(match[0])
+                bench_players.append(match[1])
+
+    return matches, bench_players
+
+
+# Weights of the optimized pairing objective (lower cost is better).
+# balance:         cost per rating point of difference between the two sides of a court
+# repeat_partner:  cost per time two teammates already partnered in recent sessions
+# repeat_opponent: cost per time two opponents already faced each other recently
+# bench:           cost per game a benched player is behind the busiest attendee today
+DEFAULT_PAIRING_WEIGHTS = {
+    'balance': 1.0,
+    'repeat_partner': 60.0,
+    'repeat_opponent': 15.0,
+    'bench': 80.0,
+}
+HISTORY_SESSIONS = 10  # How many recent sessions count towards repeat avoidance
+
+# Pairing constraints, stored in pairing_constraints. Pair rules name two players, court rules
+# one and 'mixed' none. A broken hard rule costs HARD_CONSTRAINT_COST, so the search only breaks
+# one when no round satisfies them all; a broken soft rule costs its weight.
+CONSTRAINT_KINDS = {
+    'partner': 'Must partner',
+    'not_partner': 'Must not partner',
+    'avoid': 'Never on the same court',
+    'courts': 'Only on courts',  # value: field numbers, e.g. "1,2"
+    'band': 'Max rating gap on court',  # value: rating points to anyone else on the court
+    'mixed': 'Mixed doubles teams',  # every doubles team pairs an 'M' with an 'F' player
+}
+PAIR_CONSTRAINTS = ('partner', 'not_partner', 'avoid')
+HARD_CONSTRAINT_COST = 1e6
+DEFAULT_CONSTRAINT_WEIGHT = 100.0
+
+
+def list_constraints():
+    """Every stored pairing constraint as an (id, kind, name, other_name, value, hard, weight) row."""
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT c.id, c.kind, p.name, o.name, c.value, c.hard, COALESCE(c.weight, ?)
+        FROM pairing_constraints c
+        LEFT JOIN players p ON p.id = c.player_id
+        LEFT JOIN players o ON o.id = c.other_id
+        ORDER BY c.id
+    ''', (DEFAULT_CONSTRAINT_WEIGHT,))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def remove_constraints(constraint_ids):
+    """Delete pairing constraints by id."""
+    conn = connect_db()
+    conn.executemany('DELETE FROM pairing_constraints WHERE id = ?', [(i,) for i in constraint_ids])
+    conn.commit()
+    conn.close()
+
+
+def load_constraints(player_names):
+    """The pairing constraints that apply to a round with these attendees.
+
+    Returns a tuple of (id, kind, name, other_name, value, hard, weight) rows,
+    hashable so rounds stay memoized. The value of a 'mixed' rule is replaced
+    by the attendees' genders, as a JSON object.
+    """
+    attendees = set(player_names)
+    rows = list_constraints()
+    genders = {}
+    if any(row[1] == 'mixed' for row in rows):
+        conn = connect_db()
+        cursor = conn.cursor()
+        cursor.execute("SELECT name, gender FROM players WHERE gender IN ('M', 'F')")
+        genders = {name: gender for name, gender in cursor.fetchall() if name in attendees}
+        conn.close()
+
+    constraints = []
+    for constraint_id, kind, name, other, value, hard, weight in rows:
+        if kind == 'mixed':
+            value = json.dumps(genders, sort_keys=True)
+        elif name not in attendees or (kind in PAIR_CONSTRAINTS and other not in attendees):
+            continue  # Not everyone it concerns is here today
+        constraints.append((constraint_id, kind, name, other, value, bool(hard), float(weight)))
+    return tuple(constraints)
+
+
+def add_constraint(kind, player_name=None, other_name=None, value=None, hard=True, weight=None):
+    """Store a pairing constraint and return its id; ValueError if it doesn't make sense."""
+    if kind not in CONSTRAINT_KINDS:
+        raise ValueError(f"Unknown constraint kind: {kind}")
+    if kind == 'courts':
+        fields = [field.strip() for field in (value or '').split(',') if field.strip()]
+        if not fields or not all(field.isdigit() and int(field) > 0 for field in fields):
+            raise ValueError("List the allowed field numbers, e.g. 1,2")
+        value = ','.join(fields)
+    elif kind == 'band':
+        try:
+            value = str(float(value))
+        except (TypeError, ValueError):
+            raise ValueError("The rating gap must be a number.")
+    else:
+        value = None
+    if kind in PAIR_CONSTRAINTS and (not other_name or other_name == player_name):
+        raise ValueError("Pick two different players.")
+
+    conn = connect_db()
+    cursor = conn.cursor()
+    player_ids = []
+    for name in ((player_name, other_name) if kind in PAIR_CONSTRAINTS else
+                 (player_name,) if kind != 'mixed' else ()):
+        cursor.execute('SELECT id FROM players WHERE name = ?', (name,))
+        result = cursor.fetchone()
+        if not result:
+            conn.close()
+            raise ValueError(f"No player named {name}")
+        player_ids.append(result[0])
+    player_ids += [None] * (2 - len(player_ids))
+    cursor.execute('''
+        INSERT INTO pairing_constraints (kind, player_id, other_id, value, hard, weight) VALUES (?, ?, ?, ?, ?, ?)
+    ''', (kind, player_ids[0], player_ids[1], value, int(hard), weight))
+    constraint_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    return constraint_id
+
+
+def describe_constraint(constraint):
+    """One line description of a (id, kind, name, other_name, value, hard, weight) constraint row."""
+    _, kind, name, other, value, hard, weight = constraint
+    who = f"{name} & {other}" if kind in PAIR_CONSTRAINTS else name or 'Everyone'
+    text = f"{who}: {CONSTRAINT_KINDS.get(kind, kind)}"
+    if kind in ('courts', 'band'):
+        text += f" {value}"
+    return text + (' (hard)' if hard else f" (soft, weight {weight:g})")
+
+
+def load_pairing_history(player_names, sessions=HISTORY_SESSIONS, before_session=None):
+    """Recent partner/opponent counts and today's game counts for the attendees.
+
+    Returns (partners, opponents, games_today) where partners and opponents map
+    a frozenset of two names to the number of recent matches they shared.
+    With `before_session`, only sessions older than that one are considered and
+    "today" is the day of that session (used to replay a historical round).
+    """
+    conn = connect_db()
+    cursor = conn.cursor()
+    today = to_epoch(datetime.now())
+    last_session = 2 ** 62
+    if before_session is not None:
+        cursor.execute('SELECT date FROM sessions WHERE id = ?', (before_session,))
+        result = cursor.fetchone()
+        if result and result[0]:
+            today = result[0]
+        last_session = before_session
+    today -= today % 86400  # Stored timestamps have no time zone offset, so days start at multiples of 86400
+    cursor.execute('''
+        SELECT pa1.name, pa2.name, pb1.name, pb2.name, m.date
+        FROM matches m
+        JOIN players pa1 ON m.player_a1_id = pa1.id
+        LEFT JOIN players pa2 ON m.player_a2_id = pa2.id
+        JOIN players pb1 ON m.player_b1_id = pb1.id
+        LEFT JOIN players pb2 ON m.player_b2_id = pb2.id
+        WHERE m.winner1_id IS NOT NULL
+          AND m.session_id IN (SELECT id FROM sessions WHERE id < ? ORDER BY id DESC LIMIT ?)
+    ''', (last_session, sessions))
+    rows = cursor.fetchall()
+    conn.close()
+
+    attendees = set(player_names)
+    partners = Counter()
+    opponents = Counter()
+    games_today = Counter()
+    for a1, a2, b1, b2, date in rows:
+        team_a = [name for name in (a1, a2) if name in attendees]
+        team_b = [name for name in (b1, b2) if name in attendees]
+        if len(team_a) == 2:
+            partners[frozenset(team_a)] += 1
+        if len(team_b) == 2:
+            partners[frozenset(team_b)] += 1
+        for name_a in team_a:
+            for name_b in team_b:
+                opponents[frozenset((name_a, name_b))] += 1
+        if date is not None and today <= date < today + 86400:
+            games_today.update(team_a + team_b)
+    return partners, opponents, games_today
+
+
+def history_snapshot(history):
+    """load_pairing_history's result as sorted tuples: hashable for the round cache and storable as JSON."""
+    partners, opponents, games_today = history
+    def pairs(counter):
+        return tuple(sorted((*sorted(pair), count) for pair, count in counter.items()))
+    return pairs(partners), pairs(opponents), tuple(sorted(games_today.items()))
+
+
+def history_from_snapshot(snapshot):
+    """The (partners, opponents, games_today) counters of a history_snapshot, or of its JSON."""
+    partners, opponents, games_today = snapshot
+    return (Counter({frozenset((a, b)): count for a, b, count in partners}),
+            Counter({frozenset((a, b)): count for a, b, count in opponents}),
+            Counter(dict(games_today)))
+
+
+def _court_layout(num_players, num_fields, match_type='Doubles'):
+    """Court sizes for a round: as many 2v2 courts as fit, then one singles court."""
+    if match_type == 'Singles':
+        return [2] * min(num_fields, num_players // 2)
+    doubles = min(num_fields, num_players // 4)
+    layout = [4] * doubles
+    if doubles < num_fields and num_players - 4 * doubles >= 2:
+        layout.append(2)
+    return layout
+
+
+def _court_violations(problem, players, court):
+    """Indices of the constraints broken on one court; a rule appears once per court or team breaking it."""
+    constraints = problem['constraints']
+    ratings = problem['ratings']
+    half = len(players) // 2
+    violations = []
+    for position, p in enumerate(players):
+        for c in problem['player_constraints'][p]:
+            kind, a, b, value, _ = constraints[c]
+            if kind == 'courts':
+                if court not in value:
+                    violations.append(c)
+            elif kind == 'band':
+                if any(abs(ratings[q] - ratings[p]) > value for q in players):
+                    violations.append(c)
+            else:
+                other = b if p == a else a
+                if other not in players:
+                    if kind == 'partner':
+                        violations.append(c)
+                elif p == a:  # Both players are here: check it once, from the first one
+                    same_team = half == 2 and (position < half) == (players.index(other) < half)
+                    if kind == 'avoid' or (kind == 'partner') != same_team:
+                        violations.append(c)
+    if problem['mixed'] is not None and half == 2:
+        genders = problem['genders']
+        for first, second in ((players[0], players[1]), (players[2], players[3])):
+            if genders[first] and genders[first] == genders[second]:
+                violations.append(problem['mixed'])
+    return violations
+
+
+def court_layouts(num_players, num_fields, match_type='Doubles'):
+    """Candidate court layouts for a round, each seating as many players as the format allows.
+
+    'Mixed' returns every mix of doubles and singles courts that seats the
+    most players, most doubles courts first; the other formats have one layout.
+    """
+    if match_type != 'Mixed':
+        return [_court_layout(num_players, num_fields, match_type)]
+    on_court = min(num_players - num_players % 2, 4 * num_fields)
+    layouts = []
+    for doubles in range(on_court // 4, -1, -1):
+        singles = (on_court - 4 * doubles) // 2
+        if doubles + singles > num_fields:
+            break
+        layouts.append([4] * doubles + [2] * singles)
+    return layouts
+
+
+def round_utilization(num_players, num_fields, match_type='Doubles'):
+    """(players on court, fewest courts used, most courts used) for the layouts of a format."""
+    layouts = court_layouts(num_players, num_fields, match_type)
+    return sum(layouts[0]), min(map(len, layouts)), max(map(len, layouts))
+
+
+def choose_mixed_layout(players, player_elos, num_fields, seed, history=None, constraints=()):
+    """Pick the doubles/singles mix for a Mixed round: the candidate layout a short search scores best."""
+    history = history if history is not None else load_pairing_history(players)
+    best = None
+    for layout in court_layouts(len(players), num_fields, 'Mixed'):
+        problem = build_search_problem(players, player_elos, num_fields, history=history, layout=layout,
+                                       constraints=constraints)
+        cost, _ = _run_search_chain(problem, seed, 50 * max(len(players), 4))
+        if best is None or cost < best[0]:
+            best = (cost, layout)
+    return best[1]
+
+
+def _court_cost(problem, players, court):
+    """Cost of one court given the player indices on it (A side first) and its index in the layout."""
+    ratings = problem['ratings']
+    partners = problem['partners']
+    opponents = problem['opponents']
+    weights = problem['weights']
+    half = len(players) // 2
+    team_a, team_b = players[:half], players[half:]
+    cost = weights['balance'] * abs(sum(ratings[p] for p in team_a) - sum(ratings[p] for p in team_b))
+    if half == 2:
+        cost += weights['repeat_partner'] * (partners.get((min(team_a), max(team_a)), 0) +
+                                             partners.get((min(team_b), max(team_b)), 0))
+    for a in team_a:
+        for b in team_b:
+            cost += weights['repeat_opponent'] * opponents.get((min(a, b), max(a, b)), 0)
+    if problem['constraints']:
+        constraints = problem['constraints']
+        cost += sum(constraints[c][4] for c in _court_violations(problem, players, court))
+    return cost
+
+
+def _run_search_chain(problem, chain_seed, iterations):
+    """One randomized restart followed by a swap-move local search.
+
+    Deterministic for a given (problem, chain_seed, iterations). Returns
+    (cost, slots) where slots is a permutation of player indices: the first
+    positions fill the courts of problem['layout'] in order, the rest sit out.
+    """
+    rng = random.Random(chain_seed)
+    layout = problem['layout']
+    bench_costs = problem['bench_costs']
+    num_players = len(problem['ratings'])
+    slots = list(range(num_players))
+    rng.shuffle(slots)
+
+    # Map every slot to its court (None for the bench)
+    starts = []
+    court_of = []
+    position = 0
+    for court, size in enumerate(layout):
+        starts.append(position)
+        court_of.extend([court] * size)
+        position += size
+    on_court = position
+    court_of.extend([None] * (num_players - on_court))
+
+    def court_players(court):
+        start = starts[court]
+        return slots[start:start + layout[court]]
+
+    court_costs = [_court_cost(problem, court_players(court), court) for court in range(len(layout))]
+    cost = sum(court_costs) + sum(bench_costs[p] for p in slots[on_court:])
+    best_cost, best_slots = cost, list(slots)
+    if num_players < 2 or not layout:
+        return best_cost, best_slots
+
+    # Simulated annealing temperature, decreasing linearly to zero
+    temperature = problem['temperature']
+    for step in range(iterations):
+        i = rng.randrange(on_court)
+        j = rng.randrange(num_players)
+        court_i, court_j = court_of[i], court_of[j]
+        if i == j:
+            continue
+        slots[i], slots[j] = slots[j], slots[i]
+        delta = 0.0
+        new_i = _court_cost(problem, court_players(court_i), court_i)
+        delta += new_i - court_costs[court_i]
+        if court_j is None:
+            delta += bench_costs[slots[j]] - bench_costs[slots[i]]
+        elif court_j != court_i:
+            new_j = _court_cost(problem, court_players(court_j), court_j)
+            delta += new_j - court_costs[court_j]
+        t = temperature * (1 - step / iterations)
+        if delta <= 0 or (t > 0 and rng.random() < math.exp(-delta / t)):
+            cost += delta
+            court_costs[court_i] = new_i
+            if court_j is not None and court_j != court_i:
+                court_costs[court_j] = new_j
+            if cost < best_cost - 1e-9:
+                best_cost, best_slots = cost, list(slots)
+        else:
+            slots[i], slots[j] = slots[j], slots[i]
+    return best_cost, best_slots
+
+
+def _search_worker(problem, chain_seeds, iterations, deadline):
+    """Run chains from `chain_seeds` until the deadline; return the best one found."""
+    best = None
+    chains = 0
+    longest = 0.0
+    for chain_seed in chain_seeds:
+        # Don't start a chain that could run past the deadline
+        if chains and time.time() + longest >= deadline:
+            break
+        started = time.time()
+        cost, slots = _run_search_chain(problem, chain_seed, iterations)
+        longest = max(longest, time.time() - started)
+        chains += 1
+        if best is None or cost < best[0]:
+            best = (cost, slots, chain_seed)
+    return best, chains
+
+
+def build_search_problem(players, player_elos, num_fields, weights=None, history=None, layout=None,
+                         match_type='Doubles', constraints=()):
+    """Encode attendees, ratings, history and constraints with integer indices for the search workers."""
+    weights = dict(DEFAULT_PAIRING_WEIGHTS, **(weights or {}))
+    partners, opponents, games_today = history if history is not None else load_pairing_history(players)
+    index = {name: i for i, name in enumerate(players)}
+
+    def pair_counts(counter):
+        counts = {}
+        for pair, count in counter.items():
+            a, b = sorted(index[name] for name in pair)
+            counts[(a, b)] = count
+        return counts
+
+    # Constraint i is constraints[i], encoded as (kind, index, other index, parsed value, cost)
+    encoded = []
+    player_constraints = [[] for _ in players]
+    mixed = None
+    genders = [None] * len(players)
+    for _, kind, name, other, value, hard, weight in constraints:
+        cost = HARD_CONSTRAINT_COST if hard else weight
+        a, b = index.get(name), index.get(other)
+        if kind == 'mixed':
+            mixed = len(encoded)
+            genders = [json.loads(value).get(player) for player in players]
+        elif kind == 'courts':
+            value = frozenset(int(field) - 1 for field in value.split(','))
+        elif kind == 'band':
+            value = float(value)
+        encoded.append((kind, a, b, value, cost))
+        for p in {a, b} - {None}:
+            player_constraints[p].append(len(encoded) - 1)
+
+    busiest = max((games_today.get(name, 0) for name in players), default=0)
+    return {
+        'names': list(players),
+        'ratings': [player_elos[name] for name in players],
+        'layout': layout if layout is not None else _court_layout(len(players), num_fields, match_type),
+        'partners': pair_counts(partners),
+        'opponents': pair_counts(opponents),
+        'bench_costs': [weights['bench'] * (busiest - games_today.get(name, 0)) for name in players],
+        'weights': weights,
+        'temperature': 50.0 * weights['balance'],
+        'constraints': encoded,
+        'player_constraints': player_constraints,
+        'mixed': mixed,
+        'genders': genders,
+    }
+
+
+def relaxed_constraints(constraints, matches, bench, player_elos):
+    """The constraints a round breaks, as [(constraint row, times broken)] with hard ones first."""
+    players = [name for match in matches for name in match_players(match)] + list(bench)
+    layout = [len(match_players(match)) for match in matches]
+    problem = build_search_problem(players, player_elos, len(matches), history=(Counter(), Counter(), Counter()),
+                                   layout=layout, constraints=constraints)
+    counts = Counter()
+    position = 0
+    for court, size in enumerate(layout):
+        counts.update(_court_violations(problem, list(range(position, position + size)), court))
+        position += size
+    relaxed = [(constraints[c], count) for c, count in sorted(counts.items())]
+    relaxed.sort(key=lambda item: not item[0][5])
+    return relaxed
+
+
+def schedule_from_slots(problem, slots):
+    """Turn a slot permutation back into (matches, bench_players) with player names."""
+    names = problem['names']
+    matches = []
+    position = 0
+    for size in problem['layout']:
+        court = [names[p] for p in slots[position:position + size]]
+        if size == 4:
+            matches.append(((court[0], court[1]), (court[2], court[3])))
+        else:
+            matches.append((court[0], court[1]))
+        position += size
+    return matches, [names[p] for p in slots[position:]]
+
+
+# One process pool for the whole run: spawned workers import this module (and PyQt5) before their first task,
+# which would eat most of a search's time budget if every call started a pool of its own
+process_pool_instance = None
+process_pool_workers = 0
+
+def process_pool(workers):
+    """The shared spawn ProcessPoolExecutor, started on first use (or again when `workers` changes)."""
+    global process_pool_instance, process_pool_workers
+    from concurrent.futures import ProcessPoolExecutor
+    if process_pool_instance is not None and process_pool_workers != workers:
+        shutdown_process_pool()
+    if process_pool_instance is None:
+        process_pool_instance = ProcessPoolExecutor(max_workers=workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+        process_pool_workers = workers
+    return process_pool_instance
+
+def shutdown_process_pool():
+    """Stop the shared pool's workers; the next process_pool() call starts new ones."""
+    global process_pool_instance
+    if process_pool_instance is not None:
+        process_pool_instance.shutdown(wait=False, cancel_futures=True)
+        process_pool_instance = None
+
+atexit.register(shutdown_process_pool)
+
+
+def search_matchups(players, player_elos, num_fields, time_budget=2.0, workers=None, seed=None, weights=None,
+                    history=None, iterations=None, match_type='Doubles', constraints=(), layout=None):
+    """Find a low-cost round with parallel randomized-restart local search.
+
+    Chains are seeded from `seed` and spread over the shared process pool of
+    `workers` processes (CPU count by default); each worker keeps starting new chains
+    until `time_budget` seconds have elapsed. Returns a dict with the best
+    'matches', 'bench', 'cost', the winning 'chain_seed' and number of 'chains'.
+    """
+    from concurrent.futures.process import BrokenProcessPool
+    problem = build_search_problem(players, player_elos, num_fields, weights, history, layout=layout,
+                                   match_type=match_type, constraints=constraints)
+    if iterations is None:
+        iterations = 200 * max(len(players), 4)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    deadline = time.time() + time_budget
+
+    # Worker w runs chain seeds seed*1000003 + w, + w + workers, ... so chain seeds never overlap
+    max_chains = 100000
+    seed_lists = [range(seed * 1000003 + w, seed * 1000003 + max_chains, workers) for w in range(workers)]
+
+    results = []
+    if workers > 1:
+        try:
+            pool = process_pool(workers)
+            futures = [pool.submit(_search_worker, problem, seeds, iterations, deadline) for seeds in seed_lists]
+            results = [future.result() for future in futures]
+        except (OSError, BrokenProcessPool) as e:
+            print(f"Process pool unavailable, searching in-process: {e}")
+            shutdown_process_pool()
+            results = []
+    if not results:
+        results = [_search_worker(problem, range(seed * 1000003, seed * 1000003 + max_chains), iterations, deadline)]
+
+    chains = sum(count for _, count in results)
+    cost, slots, chain_seed = min((best for best, _ in results), key=lambda best: (best[0], best[2]))
+    matches, bench = schedule_from_slots(problem, slots)
+    return {'matches': matches, 'bench': bench, 'cost': cost, 'chain_seed': chain_seed,
+            'chains': chains, 'iterations': iterations}
+
+
+@functools.lru_cache(maxsize=64)
+def _generate_round_cached(roster, num_fields, match_type, method, seed, time_budget, constraints=(), history=None):
+    players = [name for name, _ in roster]
+    player_elos = dict(roster)
+    if method == 'Optimized Search':
+        history = history_from_snapshot(history)
+        layout = None
+        if match_type == 'Mixed':  # Pick the court formats first, then the best players for them
+            layout = choose_mixed_layout(players, player_elos, num_fields, seed, history, constraints)
+        result = search_matchups(players, player_elos, num_fields, time_budget=time_budget, seed=seed,
+                                 history=history, match_type=match_type, constraints=constraints, layout=layout)
+        return result['matches'], result['bench'], result['chain_seed'], result['iterations']
+    matches, bench_players = generate_tiered_matchups(players, player_elos, match_type, num_fields,
+                                                      rng=random.Random(seed))
+    return matches, bench_players, None, None
+
+
+def generate_round(player_elos, num_fields, match_type, method='Random Tiers', seed=None, time_budget=2.0,
+                   constraints=None):
+    """Generate a round reproducibly from an explicit seed.
+
+    Results are memoized on (roster, ratings snapshot, courts, match type,
+    method, seed, constraints, pairing history), so regenerating an unchanged
+    round is instant and a newly scored round is taken into account.
+    Returns a dict with 'matches', 'bench', the 'seed' used, plus 'chain_seed',
+    'iterations' and the 'history' snapshot for the optimized search (needed to
+    replay it), the 'constraints' that applied and the 'relaxed' ones the round breaks.
+    Only the optimized search takes constraints into account; 'Mixed' rounds
+    always use it.
+    """
+    if match_type == 'Mixed':
+        method = 'Optimized Search'
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    if constraints is None:
+        constraints = load_constraints(player_elos)
+    # Sorting by name makes the result independent of the panel order
+    roster = tuple(sorted(player_elos.items()))
+    history = None
+    if method == 'Optimized Search':
+        history = history_snapshot(load_pairing_history(list(player_elos)))
+    matches, bench_players, chain_seed, iterations = _generate_round_cached(
+        roster, num_fields, match_type, method, seed, time_budget,
+        constraints if method == 'Optimized Search' else (), history)
+    return {'matches': list(matches), 'bench': list(bench_players), 'seed': seed,
+            'chain_seed': chain_seed, 'iterations': iterations, 'roster': roster, 'constraints': constraints,
+            'history': history,
+            'relaxed': relaxed_constraints(constraints, matches, bench_players, player_elos)}
+
+
+def replay_session(session_id):
+    """Regenerate a historical round from its recorded seed and roster snapshot.
+
+    Returns a dict with the replayed 'matches' and 'bench', the 'stored'
+    matches as saved in the database and whether they are 'identical'.
+    """
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT match_type, seed, pairing_method, num_fields, roster_snapshot, chain_seed, search_iterations,
+               constraints_snapshot, history_snapshot
+        FROM sessions WHERE id = ?
+    ''', (session_id,))
+    session = cursor.fetchone()
+    if not session or session[1] is None or not session[4]:
+        conn.close()
+        raise ValueError(f"Session {session_id} has no recorded seed to replay.")
+    (match_type, seed, method, num_fields, roster_snapshot, chain_seed, iterations, constraints_snapshot,
+     stored_history) = session
+    match_type = match_type_name(match_type)
+
+    cursor.execute('''
+        SELECT pa1.name, pa2.name, pb1.name, pb2.name
+        FROM matches m
+        JOIN players pa1 ON m.player_a1_id = pa1.id
+        LEFT JOIN players pa2 ON m.player_a2_id = pa2.id
+        JOIN players pb1 ON m.player_b1_id = pb1.id
+        LEFT JOIN players pb2 ON m.player_b2_id = pb2.id
+        WHERE m.session_id = ?
+        ORDER BY m.field_number
+    ''', (session_id,))
+    stored = [((a1, a2), (b1, b2)) if a2 else (a1, b1) for a1, a2, b1, b2 in cursor.fetchall()]
+    conn.close()
+
+    roster = tuple((name, elo_rating) for name, elo_rating in json.loads(roster_snapshot))
+    players = [name for name, _ in roster]
+    constraints = tuple(map(tuple, json.loads(constraints_snapshot or '[]')))
+    if method == 'Optimized Search':
+        # Re-run only the winning chain against the history and constraints as they were back then.
+        # Rounds saved before the history was recorded rebuild it from the sessions preceding this one
+        if stored_history:
+            history = history_from_snapshot(json.loads(stored_history))
+        else:
+            history = load_pairing_history(players, before_session=session_id)
+        # The doubles/singles mix of a Mixed round is the one it was stored with
+        layout = [len(match_players(match)) for match in stored] if match_type == 'Mixed' else None
+        problem = build_search_problem(players, dict(roster), num_fields, history=history, layout=layout,
+                                       match_type=match_type, constraints=constraints)
+        _, slots = _run_search_chain(problem, chain_seed, iterations)
+        matches, bench_players = schedule_from_slots(problem, slots)
+    else:
+        matches, bench_players = generate_tiered_matchups(players, dict(roster), match_type, num_fields,
+                                                          rng=random.Random(seed))
+    # Matches are stored in field order, which is the order they were generated in
+    return {'matches': matches, 'bench': bench_players, 'stored': stored,
+            'identical': sorted(map(str, matches)) == sorted(map(str, stored))}
+
+
+def insert_match(cursor, session_id, date_str, match, field_number, predicted_a=None):
+    """Insert an unscored match ((a1, a2), (b1, b2)) or (a, b) and return its id."""
+    def player_id(name):
+        cursor.execute('SELECT id FROM players WHERE name = ?', (name,))
+        result = cursor.fetchone()
+        return result[0] if result else None
+
+    team_a, team_b = match
+    if isinstance(team_a, tuple):
+        # Doubles Match
+        cursor.execute('''INSERT INTO matches (date, session_id, player_a1_id, player_a2_id,
+        player_b1_id, player_b2_id, score_a, score_b, winner1_id, winner2_id, match_type, field_number, predicted_a)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
+            to_epoch(date_str), session_id, player_id(team_a[0]), player_id(team_a[1]),
+            player_id(team_b[0]), player_id(team_b[1]), 0, 0,
+            None, None, match_type_code('Doubles'), field_number, predicted_a
+        ))
+    else:
+        # Singles Match
+        cursor.execute('''INSERT INTO matches (date, session_id, player_a1_id, player_b1_id,
+        score_a, score_b, winner1_id, match_type, field_number, predicted_a)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
+            to_epoch(date_str), session_id, player_id(team_a), player_id(team_b),
+            0, 0, None, match_type_code('Singles'), field_number, predicted_a
+        ))
+    return cursor.lastrowid
+
+
+def update_match_players(cursor, match_id, match, predicted_a=None):
+    """Rewrite who plays in an unscored match, keeping its id, session and field."""
+    player_ids = []
+    for name in match_players(match):
+        cursor.execute('SELECT id FROM players WHERE name = ?', (name,))
+        player_ids.append(cursor.fetchone()[0])
+    if len(player_ids) == 4:
+        a1, a2, b1, b2 = player_ids
+        match_type = 'Doubles'
+    else:
+        (a1, b1), a2, b2 = player_ids, None, None
+        match_type = 'Singles'
+    cursor.execute('''
+        UPDATE matches SET player_a1_id = ?, player_a2_id = ?, player_b1_id = ?, player_b2_id = ?, match_type = ?,
+                           predicted_a = ?
+        WHERE id = ?
+    ''', (a1, a2, b1, b2, match_type_code(match_type), predicted_a, match_id))
+
+
+def save_match_score(cursor, match_id, score_a, score_b):
+    """Store a match's score and its winners. Returns False if the match doesn't exist."""
+    cursor.execute('''
+        SELECT player_a1_id, player_a2_id, player_b1_id, player_b2_id, match_type FROM matches WHERE id = ?
+    ''', (match_id,))
+    match = cursor.fetchone()
+    if not match:
+        return False
+    player_a1_id, player_a2_id, player_b1_id, player_b2_id, match_type = match
+    match_type = match_type_name(match_type)
+
+    # Determine winner
+    if score_a > score_b:
+        winner1_id, winner2_id = player_a1_id, player_a2_id
+    elif score_b > score_a:
+        winner1_id, winner2_id = player_b1_id, player_b2_id
+    else:
+        winner1_id, winner2_id = None, None  # Handle draw if necessary
+
+    if match_type == 'Singles':
+        winner2_id = None
+    cursor.execute('''
+        UPDATE matches
+        SET score_a = ?, score_b = ?, winner1_id = ?, winner2_id = ?
+        WHERE id = ?
+    ''', (score_a, score_b, winner1_id, winner2_id, match_id))
+    return True
+
+
+# Match outcome predictions
+DEFAULT_MARGIN_PER_EDGE = 12.0  # Expected point margin for a certain win, before there is history to fit
+
+
+def fit_margin_model():
+    """Points of margin per unit of predicted edge (2p - 1), fitted on scored history."""
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT COUNT(*),
+               SUM((2 * predicted_a - 1) * (score_a - score_b)),
+               SUM((2 * predicted_a - 1) * (2 * predicted_a - 1))
+        FROM matches
+        WHERE predicted_a IS NOT NULL AND rated = 1
+    ''')
+    count, sum_xy, sum_xx = cursor.fetchone()
+    conn.close()
+    if not count or count < 20 or not sum_xx:
+        return DEFAULT_MARGIN_PER_EDGE
+    return sum_xy / sum_xx
+
+
+def predict_round(matches, player_elos, margin_per_edge=None):
+    """Win probability of side A and expected margin for every court, in one batch.
+
+    Returns (predictions, balance_score) where predictions is a list of
+    (probability_a, expected_margin) per match and balance_score is 100 for
+    a round of perfect coin flips and 0 for a round of foregone conclusions.
+    """
+    import numpy as np
+    if not matches:
+        return [], 100.0
+    if margin_per_edge is None:
+        margin_per_edge = fit_margin_model()
+    rating_a = np.zeros(len(matches))
+    rating_b = np.zeros(len(matches))
+    for i, (team_a, team_b) in enumerate(matches):
+        team_a = team_a if isinstance(team_a, tuple) else (team_a,)
+        team_b = team_b if isinstance(team_b, tuple) else (team_b,)
+        rating_a[i] = sum(player_elos[name] for name in team_a)
+        rating_b[i] = sum(player_elos[name] for name in team_b)
+    # Same formula as calculate_expected_score, for all courts at once
+    probabilities = 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
+    edges = 2 * probabilities - 1
+    balance_score = 100 * (1 - float(np.mean(np.abs(edges))))
+    predictions = [(float(p), float(margin_per_edge * edge)) for p, edge in zip(probabilities, edges)]
+    return predictions, balance_score
+
+
+def get_prediction_calibration(buckets=10):
+    """Compare stored predictions with actual results.
+
+    Returns (rows, brier_score, count) where each row is
+    (low, high, matches, mean_predicted, actual_win_rate) for one
+    probability bucket; a well calibrated model has mean_predicted close to
+    actual_win_rate in every bucket.
+    """
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT MIN(CAST(predicted_a * ? AS INTEGER), ? - 1) AS bucket,
+               COUNT(*),
+               AVG(predicted_a),
+               AVG(CASE WHEN score_a > score_b THEN 1.0 WHEN score_a < score_b THEN 0.0 ELSE 0.5 END)
+        FROM matches
+        WHERE predicted_a IS NOT NULL AND rated = 1
+        GROUP BY bucket
+        ORDER BY bucket
+    ''', (buckets, buckets))
+    rows = [(bucket / buckets, (bucket + 1) / buckets, count, predicted, actual)
+            for bucket, count, predicted, actual in cursor.fetchall()]
+    cursor.execute('''
+        SELECT COUNT(*), AVG((predicted_a - CASE WHEN score_a > score_b THEN 1.0
+                                                 WHEN score_a < score_b THEN 0.0 ELSE 0.5 END) *
+                             (predicted_a - CASE WHEN score_a > score_b THEN 1.0
+                                                 WHEN score_a < score_b THEN 0.0 ELSE 0.5 END))
+        FROM matches
+        WHERE predicted_a IS NOT NULL AND rated = 1
+    ''')
+    count, brier_score = cursor.fetchone()
+    conn.close()
+    return rows, brier_score, count
+
+
+# Matchmaking quality metrics, recorded for every generated round
+ANALYTICS_PERIODS = {'Last 30 days': 30, 'Last 90 days': 90, 'Last 12 months': 365, 'All time': None}
+ANALYTICS_GROUPS = {  # Dashboard "compare by" choices -> session_metrics column
+    'Pairing Method': 'pairing_method',
+    'Match Type': 'match_type',
+    'Rating Source': 'rating_source',
+    'Courts': 'num_fields',
+}
+
+
+def court_quality(matches, player_elos, predictions, history):
+    """(field_number, match_type, elo_gap, predicted_a, repeat_partners, repeat_opponents) for every court.
+
+    The gap is between the average ratings of the two sides; repeats count
+    the recent sessions in which the teammates / opponents already met.
+    """
+    partners, opponents, _ = history
+    rows = []
+    for field_number, (match, (predicted_a, _)) in enumerate(zip(matches, predictions), start=1):
+        team_a, team_b = match
+        team_a = team_a if isinstance(team_a, tuple) else (team_a,)
+        team_b = team_b if isinstance(team_b, tuple) else (team_b,)
+        gap = abs(sum(player_elos[name] for name in team_a) / len(team_a) -
+                  sum(player_elos[name] for name in team_b) / len(team_b))
+        repeat_partners = sum(partners.get(frozenset(team), 0) for team in (team_a, team_b) if len(team) == 2)
+        repeat_opponents = sum(opponents.get(frozenset((a, b)), 0) for a in team_a for b in team_b)
+        rows.append((field_number, 'Doubles' if len(team_a) == 2 else 'Singles', gap, predicted_a,
+                     repeat_partners, repeat_opponents))
+    return rows
+
+
+def record_round_metrics(cursor, session_id, created_at, settings, courts, num_players, bench_count,
+                         generation_ms, balance_score, relaxed_constraints=0):
+    """Store the quality of a generated round.
+
+    `settings` holds the pairing_method, match_type, rating_source and
+    num_fields it was generated with; `courts` are court_quality rows.
+    """
+    cursor.executemany('''
+        INSERT OR REPLACE INTO court_metrics (session_id, field_number, match_type, elo_gap, predicted_a,
+                                              repeat_partners, repeat_opponents)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [(session_id,) + court for court in courts])
+    gaps = [court[2] for court in courts]
+    cursor.execute('''
+        INSERT OR REPLACE INTO session_metrics (session_id, created_at, pairing_method, match_type, rating_source,
+                                                num_fields, num_players, courts_used, bench_count, generation_ms,
+                                                mean_gap, max_gap, mean_edge, balance_score, repeat_partners,
+                                                repeat_opponents, relaxed_constraints)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (session_id, to_epoch(created_at), settings['pairing_method'], settings['match_type'],
+          settings['rating_source'], settings['num_fields'], num_players, len(courts), bench_count, generation_ms,
+          sum(gaps) / len(gaps) if gaps else None, max(gaps, default=None),
+          sum(abs(court[3] - 0.5) for court in courts) / len(courts) if courts else None, balance_score,
+          sum(court[4] for court in courts), sum(court[5] for court in courts), relaxed_constraints))
+
+
+def analytics_since(period):
+    """Stored start timestamp of a dashboard period, or 0 for all time."""
+    days = ANALYTICS_PERIODS[period]
+    if days is None:
+        return 0
+    return to_epoch(datetime.now() - timedelta(days=days))
+
+
+def get_session_metrics(since=0, limit=500):
+    """Recent rounds, newest first, with each pairing method's rolling average gap over its last 10 rounds."""
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT datetime(created_at, 'unixepoch'), pairing_method, match_type, num_players, courts_used, bench_count,
+               mean_gap, max_gap, mean_edge, repeat_partners, repeat_opponents, relaxed_constraints, generation_ms,
+               rolling_gap
+        FROM (
+            SELECT *, AVG(mean_gap) OVER (PARTITION BY pairing_method ORDER BY created_at
+                                          ROWS BETWEEN 9 PRECEDING AND CURRENT ROW) AS rolling_gap
+            FROM session_metrics
+            WHERE created_at >= ?
+        )
+        ORDER BY created_at DESC
+        LIMIT ?
+    ''', (since, limit))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def compare_strategies(group_by='Pairing Method', since=0):
+    """Monthly averages per strategy, with the change from the previous month and the month's ranking.
+
+    Rows are (group, month, rounds, mean gap, gap change, mean edge, repeats per court,
+    bench share, generation ms, rank by gap), newest month first.
+    """
+    column = ANALYTICS_GROUPS[group_by]  # Never user text: the column name is one of ours
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        WITH monthly AS (
+            SELECT {column} AS strategy, strftime('%Y-%m', created_at, 'unixepoch') AS month, COUNT(*) AS rounds,
+                   AVG(mean_gap) AS gap, AVG(mean_edge) AS edge,
+                   1.0 * SUM(repeat_partners + repeat_opponents) / MAX(SUM(courts_used), 1) AS repeats,
+                   1.0 * SUM(bench_count) / MAX(SUM(num_players), 1) AS bench_share,
+                   AVG(generation_ms) AS generation_ms
+            FROM session_metrics
+            WHERE created_at >= ?
+            GROUP BY strategy, month
+        )
+        SELECT strategy, month, rounds, gap, gap - LAG(gap) OVER (PARTITION BY strategy ORDER BY month),
+               edge, repeats, bench_share, generation_ms, RANK() OVER (PARTITION BY month ORDER BY gap)
+        FROM monthly
+        ORDER BY month DESC, 10
+    ''', (since,))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def benchmark_analytics(num_sessions=20000, seed=1):
+    """Time the dashboard queries over a synthetic history of `num_sessions` rounds in a scratch database."""
+    import tempfile
+    global DATABASE
+    rng = random.Random(seed)
+    saved_database = DATABASE
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            DATABASE = os.path.join(temp_dir, 'benchmark_analytics.db')
+            init_db()
+            conn = connect_db()
+            start = datetime.now() - timedelta(days=3 * 365)
+            settings = [{'pairing_method': method, 'match_type': match_type, 'rating_source': source,
+                         'num_fields': fields}
+                        for method in ('Random Tiers', 'Optimized Search') for match_type in ('Doubles', 'Mixed')
+                        for source in ('Elo', 'Skill Fit') for fields in (4, 6)]
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT COUNT(*) FROM matches 
-                WHERE (player_a1_id = (SELECT id FROM players WHERE name = ?) AND winner1_id = player_a1_id)
-                   OR (player_a2_id = (SELECT id FROM players WHERE name = ?) AND winner2_id = player_a2_id)
-                   OR (player_b1_id = (SELECT id FROM players WHERE name = ?) AND winner1_id = player_b1_id)
-                   OR (player_b2_id = (SELECT id FROM players WHERE name = ?) AND winner2_id = player_b2_id)
-            ''', (name, name, name, name))
-            wins = cursor.fetchone()[0]
+            for session_id in range(1, num_sessions + 1):
+                created_at = (start + timedelta(minutes=session_id * 3 * 365 * 24 * 60 // num_sessions))
+                courts = [(field, 'Doubles', abs(rng.gauss(0, 80)), rng.random(), rng.randrange(2), rng.randrange(3))
+                          for field in range(1, 5)]
+                record_round_metrics(cursor, session_id, created_at, rng.choice(settings),
+                                     courts, 18, 2, rng.uniform(5, 2000), rng.uniform(60, 100))
+            conn.commit()
             conn.close()
-            win_rate = f"{(wins / matches_played * 100) / 2 :.2f}%"
-        performance_data.append((name, int(elo), matches_played, win_rate))
-    return performance_data
 
-# Custom QListWidget for Assigned Players with Drag-and-Drop and Removal
-class AssignedPlayersList(QListWidget):
-    def __init__(self, available_list, parent=None):
+            print(f"{num_sessions} rounds over three years")
+            for period in ANALYTICS_PERIODS:
+                since = analytics_since(period)
+                started = time.perf_counter()
+                get_session_metrics(since)
+                sessions_ms = (time.perf_counter() - started) * 1000
+                for group_by in ANALYTICS_GROUPS:
+                    started = time.perf_counter()
+                    compare_strategies(group_by, since)
+                    print(f"{period:>15}, by {group_by:<15}: sessions {sessions_ms:6.1f} ms, "
+                          f"comparison {(time.perf_counter() - started) * 1000:6.1f} ms")
+        finally:
+            DATABASE = saved_database
+
+
+def matchup_cost(match, player_elos, partners, opponents, weights=DEFAULT_PAIRING_WEIGHTS):
+    """Pairing objective of a single court, using names (see DEFAULT_PAIRING_WEIGHTS)."""
+    team_a, team_b = match
+    team_a = team_a if isinstance(team_a, tuple) else (team_a,)
+    team_b = team_b if isinstance(team_b, tuple) else (team_b,)
+    cost = weights['balance'] * abs(sum(player_elos[p] for p in team_a) - sum(player_elos[p] for p in team_b))
+    if len(team_a) == 2:
+        cost += weights['repeat_partner'] * (partners.get(frozenset(team_a), 0) + partners.get(frozenset(team_b), 0))
+    for a in team_a:
+        for b in team_b:
+            cost += weights['repeat_opponent'] * opponents.get(frozenset((a, b)), 0)
+    return cost
+
+
+def team_splits(players):
+    """Every way to split 2 or 4 players into two sides, as matches."""
+    if len(players) == 2:
+        return [(players[0], players[1])]
+    a, b, c, d = players
+    return [((a, b), (c, d)), ((a, c), (b, d)), ((a, d), (b, c))]
+
+
+class CourtQueueScheduler:
+    """Refill each court from a queue of waiting players as soon as it frees up.
+
+    Waiting players sit in a heap ordered by (games played tonight, time they
+    started resting), so the order never has to be recomputed as time passes.
+    Removed players are dropped lazily when they reach the top of the heap.
+    """
+
+    def __init__(self, player_elos, match_type, history=None, weights=None, candidates=8, skip_weight=20.0):
+        self.ratings = dict(player_elos)
+        self.match_type = match_type
+        self.weights = dict(DEFAULT_PAIRING_WEIGHTS, **(weights or {}))
+        self.candidates = candidates  # How deep into the queue the next court may pick
+        self.skip_weight = skip_weight  # Cost per queue position a chosen player jumps ahead
+        partners, opponents, games_today = history if history is not None else load_pairing_history(player_elos)
+        self.partners = Counter(partners)
+        self.opponents = Counter(opponents)
+        self.games = Counter(games_today)
+        self.courts = {}  # field_number -> match currently played there
+        self.heap = []
+        self.queued = {}  # name -> key of the player's live heap entry
+        self.sequence = itertools.count()
+
+    def enqueue(self, name, now=None):
+        """Put a player in the waiting queue (after a match, or on arrival)."""
+        key = (self.games[name], now if now is not None else time.time(), next(self.sequence))
+        self.queued[name] = key
+        heapq.heappush(self.heap, key + (name,))
+
+    def remove_player(self, name):
+        """Take a waiting player out of the queue (their heap entry becomes stale)."""
+        self.queued.pop(name, None)
+
+    def waiting_players(self):
+        return sorted(self.queued, key=self.queued.get)
+
+    def start_court(self, field_number, match):
+        self.courts[field_number] = match
+        for name in match_players(match):
+            self.queued.pop(name, None)
+
+    def _pop_candidates(self):
+        popped = []
+        while self.heap and len(popped) < self.candidates:
+            entry = heapq.heappop(self.heap)
+            if self.queued.get(entry[-1]) == entry[:-1]:
+                popped.append(entry)
+        return popped
+
+    def next_match(self, field_number):
+        """Pick and start the best match for a free court from the front of the queue."""
+        popped = self._pop_candidates()
+        size = 4 if self.match_type != 'Singles' and len(popped) >= 4 else 2
+        if len(popped) < size:
+            for entry in popped:
+                heapq.heappush(self.heap, entry)
+            return None
+
+        names = [entry[-1] for entry in popped]
+        fewest_games = min(self.games[name] for name in names)
+        best = None
+        # The player who has waited longest always plays; choose the rest among the candidates
+        for others in itertools.combinations(range(1, len(names)), size - 1):
+            group = (0,) + others
+            fairness = (self.skip_weight * (sum(group) - sum(range(size))) +
+                        self.weights['bench'] * sum(self.games[names[i]] - fewest_games for i in group))
+            for match in team_splits([names[i] for i in group]):
+                cost = fairness + matchup_cost(match, self.ratings, self.partners, self.opponents, self.weights)
+                if best is None or cost < best[0]:
+                    best = (cost, match)
+
+        match = best[1]
+        chosen = set(match_players(match))
+        for entry in popped:
+            if entry[-1] not in chosen:
+                heapq.heappush(self.heap, entry)
+        self.start_court(field_number, match)
+        return match
+
+    def court_finished(self, field_number, now=None):
+        """Record a finished court, requeue its players and return the court's next match."""
+        match = self.courts.pop(field_number, None)
+        if match:
+            team_a, team_b = match
+            team_a = team_a if isinstance(team_a, tuple) else (team_a,)
+            team_b = team_b if isinstance(team_b, tuple) else (team_b,)
+            for team in (team_a, team_b):
+                if len(team) == 2:
+                    self.partners[frozenset(team)] += 1
+            for a in team_a:
+                for b in team_b:
+                    self.opponents[frozenset((a, b))] += 1
+            now = now if now is not None else time.time()
+            for name in team_a + team_b:
+                self.games[name] += 1
+                self.enqueue(name, now)
+        return self.next_match(field_number)
+
+
+def match_players(match):
+    """Flat list of the players in a match."""
+    team_a, team_b = match
+    if isinstance(team_a, tuple):
+        return list(team_a) + list(team_b)
+    return [team_a, team_b]
+
+
+def replace_player(match, leaving, joining):
+    """The match with one player swapped for another, keeping everyone else's side."""
+    team_a, team_b = match
+    if isinstance(team_a, tuple):
+        return (tuple(joining if name == leaving else name for name in team_a),
+                tuple(joining if name == leaving else name for name in team_b))
+    return (joining if team_a == leaving else team_a, joining if team_b == leaving else team_b)
+
+
+def repair_round(courts, bench, player_elos, num_fields, match_type, arrivals=(), departures=(), busy_fields=(),
+                 history=None, weights=None, candidates=8):
+    """Fit late arrivals into a round and take departed players out, rewriting as few courts as possible.
+
+    `courts` maps field number -> match for the courts that can still change;
+    `busy_fields` are fields whose match must not be touched. A departed player
+    is replaced in their own slot from the bench; with nobody to bring in, a
+    doubles court drops to singles and a singles court closes. Players left
+    waiting then go onto free fields, and finally turn singles courts into
+    doubles. Returns (changes, bench): changes maps field number -> new match,
+    or None for a court that closed.
+    """
+    weights = dict(DEFAULT_PAIRING_WEIGHTS, **(weights or {}))
+    partners, opponents, games = history if history is not None else (Counter(), Counter(), Counter())
+    departed = set(departures)
+    waiting = [name for name in bench if name not in departed]
+    waiting += [name for name in arrivals if name not in departed and name not in waiting]
+    courts = dict(courts)
+    changes = {}
+
+    def queue():  # Fewest games tonight first, then the order they started waiting
+        return sorted(waiting, key=lambda name: games.get(name, 0))[:candidates]
+
+    def cost(match):
+        return matchup_cost(match, player_elos, partners, opponents, weights)
+
+    def fairness(names):
+        fewest = min(games.get(name, 0) for name in waiting)
+        return weights['bench'] * sum(games.get(name, 0) - fewest for name in names)
+
+    def set_court(field_number, match):
+        courts[field_number] = match
+        changes[field_number] = match
+        if match is not None:
+            for name in match_players(match):
+                if name in waiting:
+                    waiting.remove(name)
+        else:
+            del courts[field_number]
+
+    for field_number, match in sorted(courts.items()):
+        for name in [name for name in match_players(match) if name in departed]:
+            match = courts.get(field_number)
+            if match is None:
+                break
+            if waiting:
+                joining = min(queue(), key=lambda other: cost(replace_player(match, name, other)) + fairness([other]))
+                set_court(field_number, replace_player(match, name, joining))
+                continue
+            staying = [other for other in match_players(match) if other not in departed]
+            if len(staying) >= 2:
+                set_court(field_number, min(itertools.combinations(staying, 2), key=cost))
+                waiting.extend(other for other in staying if other not in courts[field_number])
+            else:
+                set_court(field_number, None)
+                waiting.extend(staying)
+
+    # Players still waiting go onto free fields, a doubles court whenever the format and numbers allow
+    free_fields = [field for field in range(1, num_fields + 1) if field not in courts and field not in busy_fields]
+    for field_number in free_fields:
+        size = 4 if match_type != 'Singles' and len(waiting) >= 4 else 2
+        if len(waiting) < size:
+            break
+        names = queue()
+        best = None
+        # The player who has waited longest always plays; choose the rest among the candidates
+        for others in itertools.combinations(names[1:], size - 1):
+            group = [names[0], *others]
+            for match in team_splits(group):
+                total = cost(match) + fairness(group)
+                if best is None or total < best[0]:
+                    best = (total, match)
+        set_court(field_number, best[1])
+
+    # Two players left over: join a singles court rather than sit out
+    if match_type != 'Singles':
+        for field_number, match in sorted(courts.items()):
+            if len(waiting) < 2:
+                break
+            if isinstance(match[0], tuple):
+                continue
+            best = None
+            for pair in itertools.combinations(queue(), 2):
+                for new_match in team_splits(list(match) + list(pair)):
+                    total = cost(new_match) + fairness(pair)
+                    if best is None or total < best[0]:
+                        best = (total, new_match)
+            set_court(field_number, best[1])
+    return changes, waiting
+
+
+def benchmark_pairing_search(num_players=40, num_fields=8, budgets=(0.25, 0.5, 1.0, 2.0),
+                             worker_counts=None, repeats=3, seed=1):
+    """Print the best schedule cost reached for each (workers, time budget) pair.
+
+    Uses a synthetic field of players with a fixed random history so that
+    runs are comparable; lower cost means a better balanced round.
+    """
+    rng = random.Random(seed)
+    players = [f"Player {i}" for i in range(num_players)]
+    player_elos = {name: rng.gauss(1500, 200) for name in players}
+    partners, opponents = Counter(), Counter()
+    for _ in range(num_players * 3):
+        a, b = rng.sample(players, 2)
+        partners[frozenset((a, b))] += 1
+        a, b = rng.sample(players, 2)
+        opponents[frozenset((a, b))] += 1
+    games_today = Counter({name: rng.randint(0, 3) for name in players})
+    history = (partners, opponents, games_today)
+
+    if worker_counts is None:
+        cpus = os.cpu_count() or 1
+        worker_counts = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+
+    print(f"{num_players} players, {num_fields} courts, {repeats} runs per cell (mean best cost / mean chains)")
+    print("workers " + "".join(f"{budget:>16.2f}s" for budget in budgets))
+    for workers in worker_counts:
+        cells = []
+        for budget in budgets:
+            costs, chains = [], []
+            for run in range(repeats):
+                result = search_matchups(players, player_elos, num_fields, time_budget=budget,
+                                         workers=workers, seed=seed + run, history=history)
+                costs.append(result['cost'])
+                chains.append(result['chains'])
+            cells.append(f"{sum(costs) / repeats:>10.1f} /{sum(chains) / repeats:>5.0f}")
+        print(f"{workers:>7} " + "".join(f"{cell:>17}" for cell in cells))
+
+
+def benchmark_constraint_solver(num_players=150, num_constraints=30, num_fields=10, time_budget=0.5,
+                                repeats=5, seed=1):
+    """Time the constrained search on a synthetic session and count the rules it had to relax.
+
+    A mix of partner, avoid, court and rating band rules is drawn at random
+    (hard and soft, all satisfiable together) plus a soft mixed doubles rule.
+    """
+    rng = random.Random(seed)
+    players = [f"Player {i}" for i in range(num_players)]
+    player_elos = {name: rng.gauss(1500, 200) for name in players}
+    genders = {name: rng.choice('MF') for name in players}
+    history = (Counter(), Counter(), Counter())
+    constraints = [(0, 'mixed', None, None, json.dumps(genders, sort_keys=True), False, 20.0)]
+    paired = set()
+    while len(constraints) < num_constraints:
+        kind = rng.choice(['partner', 'not_partner', 'avoid', 'courts', 'band'])
+        name, other = rng.sample(players, 2)
+        if kind in PAIR_CONSTRAINTS and (name in paired or other in paired):
+            continue  # Keep the hard rules jointly satisfiable
+        value = None
+        if kind in PAIR_CONSTRAINTS:
+            paired.update((name, other))
+        else:
+            other = None
+            value = ','.join(map(str, rng.sample(range(1, num_fields + 1), 3))) if kind == 'courts' else '400'
+        constraints.append((len(constraints), kind, name, other, value, rng.random() < 0.7, DEFAULT_CONSTRAINT_WEIGHT))
+    constraints = tuple(constraints)
+
+    print(f"{num_players} players, {num_constraints} constraints, {num_fields} courts, {time_budget}s budget")
+    timings = []
+    for run in range(repeats):
+        start = time.perf_counter()
+        result = search_matchups(players, player_elos, num_fields, time_budget=time_budget, seed=seed + run,
+                                 history=history, constraints=constraints)
+        timings.append(time.perf_counter() - start)
+        relaxed = relaxed_constraints(constraints, result['matches'], result['bench'], player_elos)
+        hard = sum(1 for constraint, _ in relaxed if constraint[5])
+        print(f"Run {run + 1}: {timings[-1]:.3f}s, {result['chains']} chains, "
+              f"{hard} hard / {len(relaxed) - hard} soft constraint(s) relaxed")
+    print(f"Median {sorted(timings)[len(timings) // 2]:.3f}s")
+    return timings
+
+
+# Tournaments. Every round of play is a session of its own and every game an ordinary match, so results go through
+# the same scoring and rating code as ladder nights; tournament_games places the matches in the schedule or bracket
+TOURNAMENT_FORMATS = ('Round Robin', 'Swiss', 'Single Elimination', 'Double Elimination')
+SWISS_BACKTRACK_LIMIT = 20000  # Pairing attempts before a Swiss round settles for the fewest rematches it can find
+
+
+def round_robin_rounds(num_entrants):
+    """Circle method: entrant 0 stays put while the others rotate, so everyone meets everyone once.
+
+    Returns the rounds as lists of (a, b) entrant indexes. With an odd count one entrant sits out each round.
+    """
+    circle = list(range(num_entrants)) + ([None] if num_entrants % 2 else [])
+    size = len(circle)
+    rounds = []
+    for number in range(size - 1):
+        pairs = []
+        for i in range(size // 2):
+            a, b = circle[i], circle[size - 1 - i]
+            if a is None or b is None:
+                continue
+            # The fixed entrant would otherwise always be side A
+            pairs.append((b, a) if i == 0 and number % 2 else (a, b))
+        rounds.append(pairs)
+        circle = [circle[0], circle[-1]] + circle[1:-1]
+    return rounds
+
+
+def pack_court_slots(rounds, num_fields):
+    """Spread rounds of games over time slots of at most num_fields courts.
+
+    Games keep their round order, but a game moves up into a free court of an earlier slot when neither
+    side is playing or still to play before it, so fewer courts don't leave courts idle.
+    """
+    slots = []
+    free_from = {}  # Entrant -> first slot after their previous game
+    for pairs in rounds:
+        for a, b in pairs:
+            slot = max(free_from.get(a, 0), free_from.get(b, 0))
+            while slot < len(slots) and len(slots[slot]) >= num_fields:
+                slot += 1
+            if slot == len(slots):
+                slots.append([])
+            slots[slot].append((a, b))
+            free_from[a] = free_from[b] = slot + 1
+    return slots
+
+
+def swiss_pairings(ranked, points, played, had_bye, limit=SWISS_BACKTRACK_LIMIT):
+    """Pair one Swiss round. Returns (pairs, bye), bye being None for an even field.
+
+    `ranked` lists the entrants best first. Within a score group the top half meets the bottom half in order
+    (1 v 5, 2 v 6, ... in a group of eight); an odd entrant out floats down to the next group. Nobody meets the
+    same opponent twice unless no round avoids it within `limit` attempts, and the bye goes to the lowest ranked
+    entrant who hasn't had one.
+    """
+    steps = 0
+
+    def candidates(pool):
+        top = pool[0]
+        group = [entrant for entrant in pool[1:] if points[entrant] == points[top]]
+        ideal = (len(group) + 1) // 2 - 1  # First of the bottom half of the group, counting the top entrant
+        order = sorted(range(len(group)), key=lambda i: (abs(i - ideal), i < ideal))
+        return [group[i] for i in order] + pool[1 + len(group):]
+
+    def pair(pool):
+        nonlocal steps
+        if not pool:
+            return []
+        top = pool[0]
+        for other in candidates(pool):
+            steps += 1
+            if steps > limit:
+                return None
+            if frozenset((top, other)) in played:
+                continue
+            rest = pair([entrant for entrant in pool[1:] if entrant != other])
+            if rest is not None:
+                return [(top, other)] + rest
+        return None
+
+    byes = [None]
+    if len(ranked) % 2:
+        byes = [entrant for entrant in reversed(ranked) if entrant not in had_bye] or [ranked[-1]]
+    for bye in byes:
+        pool = [entrant for entrant in ranked if entrant != bye]
+        pairs = pair(pool)
+        if pairs is not None:
+            return pairs, bye
+        if steps > limit:
+            break
+
+    # No rematch-free round: pair top down, each entrant taking the first opponent they haven't met if any
+    bye = byes[0]
+    pool = [entrant for entrant in ranked if entrant != bye]
+    pairs = []
+    while pool:
+        options = candidates(pool)
+        other = next((entrant for entrant in options if frozenset((pool[0], entrant)) not in played), options[0])
+        pairs.append((pool[0], other))
+        pool = [entrant for entrant in pool[1:] if entrant != other]
+    return pairs, bye
+
+
+def elimination_bracket(num_entrants, double=False):
+    """The games of a seeded bracket, keyed (bracket, round, position), each with the two sources that fill it.
+
+    Brackets are 'W' (winners), 'L' (losers, double elimination only) and 'F' (the grand final, and its reset
+    when the losers' bracket champion wins it). A source is ('seed', n) or ('winner' | 'loser', game key);
+    seeds past num_entrants are byes, which the top seeds get.
+    """
+    size = 1
+    while size < num_entrants:
+        size *= 2
+    order = [1]  # 1 v 8, 4 v 5, 2 v 7, 3 v 6: the top two seeds can only meet in the final
+    while len(order) < size:
+        order = [seed for top in order for seed in (top, 2 * len(order) + 1 - top)]
+    num_rounds = size.bit_length() - 1
+    games = {('W', 1, position): (('seed', order[2 * position]), ('seed', order[2 * position + 1]))
+             for position in range(size // 2)}
+    for number in range(2, num_rounds + 1):
+        for position in range(size >> number):
+            games[('W', number, position)] = (('winner', ('W', number - 1, 2 * position)),
+                                              ('winner', ('W', number - 1, 2 * position + 1)))
+    if not double:
+        return games
+
+    # Losers drop into the losers' bracket: the first round pairs the losers of winners' round 1, then each
+    # round alternates between taking the losers of the next winners' round and halving the field
+    champion = ('loser', ('W', 1, 0))
+    if num_rounds > 1:
+        for position in range(size >> 2):
+            games[('L', 1, position)] = (('loser', ('W', 1, 2 * position)), ('loser', ('W', 1, 2 * position + 1)))
+        for stage in range(1, num_rounds):
+            count = size >> (stage + 1)
+            for position in range(count):
+                # Dropped losers come in reversed every other round, so they don't meet their last opponent's feeders
+                dropped = count - 1 - position if stage % 2 else position
+                games[('L', 2 * stage, position)] = (('winner', ('L', 2 * stage - 1, position)),
+                                                     ('loser', ('W', stage + 1, dropped)))
+            if stage < num_rounds - 1:
+                for position in range(count // 2):
+                    games[('L', 2 * stage + 1, position)] = (('winner', ('L', 2 * stage, 2 * position)),
+                                                             ('winner', ('L', 2 * stage, 2 * position + 1)))
+        champion = ('winner', ('L', 2 * (num_rounds - 1), 0))
+    games[('F', 1, 0)] = (('winner', ('W', num_rounds, 0)), champion)
+    games[('F', 2, 0)] = (('winner', ('F', 1, 0)), ('loser', ('F', 1, 0)))
+    return games
+
+
+def game_result(game):
+    """(winner, loser) of a decided game, (None, None) for a draw or an empty slot; None while it is to be played."""
+    entrant_a, entrant_b, match_id, score_a, score_b, rated = game
+    if match_id is None:
+        return entrant_a, entrant_b  # A bye: entrant_b is None
+    if not rated:
+        return None
+    if score_a == score_b:
+        return None, None
+    return (entrant_a, entrant_b) if score_a > score_b else (entrant_b, entrant_a)
+
+
+def balanced_teams(players, player_elos):
+    """Doubles teams for a tournament: the strongest player with the weakest, and so on inwards."""
+    ranked = sorted(players, key=lambda name: player_elos.get(name, 0), reverse=True)
+    return [(ranked[i], ranked[-1 - i]) for i in range(len(ranked) // 2)]
+
+
+def entrant_name(players):
+    return ' & '.join(players)
+
+
+def list_tournaments():
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, name, format, finished_at FROM tournaments ORDER BY id DESC')
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def create_tournament(name, tournament_format, entrants, num_fields=4, rounds=None):
+    """Seed a new tournament and schedule its first games. Returns the tournament id.
+
+    `entrants` are player names for singles, or (name, name) teams for doubles; they are seeded by their
+    current effective rating (a team by its players' average). `rounds` only applies to Swiss, which plays
+    ceil(log2(entrants)) rounds by default: enough for a single unbeaten winner.
+    """
+    name = name.strip()
+    if not name:
+        raise ValueError('The tournament needs a name')
+    if tournament_format not in TOURNAMENT_FORMATS:
+        raise ValueError(f'Unknown tournament format {tournament_format}')
+    entrants = [tuple(entrant) if isinstance(entrant, (tuple, list)) else (entrant,) for entrant in entrants]
+    if len(entrants) < 2:
+        raise ValueError('A tournament needs at least two entrants')
+    sizes = {len(entrant) for entrant in entrants}
+    if sizes not in ({1}, {2}):
+        raise ValueError('Every entrant must be a single player, or every one a team of two')
+    players = [player for entrant in entrants for player in entrant]
+    repeated = sorted({player for player in players if players.count(player) > 1})
+    if repeated:
+        raise ValueError(f"Entered more than once: {', '.join(repeated)}")
+    ratings = get_effective_ratings(players)
+    missing = [player for player in players if player not in ratings]
+    if missing:
+        raise ValueError(f"Not in the player list: {', '.join(missing)}")
+    if rounds is None:
+        rounds = max(1, math.ceil(math.log2(len(entrants))))
+    rounds = min(rounds, len(entrants) - 1 + len(entrants) % 2)
+
+    seeded = sorted(entrants, key=lambda entrant: sum(ratings[player][0] for player in entrant) / len(entrant),
+                    reverse=True)
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM tournaments WHERE name = ?', (name,))
+    if cursor.fetchone():
+        conn.close()
+        raise ValueError(f'Tournament {name} already exists')
+    cursor.execute('''
+        INSERT INTO tournaments (name, format, match_type, num_fields, rounds, created_at) VALUES (?, ?, ?, ?, ?, ?)
+    ''', (name, tournament_format, match_type_code('Doubles' if sizes == {2} else 'Singles'), num_fields,
+          rounds if tournament_format == 'Swiss' else None, to_epoch(datetime.now())))
+    tournament_id = cursor.lastrowid
+    rows = []
+    for seed, entrant in enumerate(seeded, start=1):
+        player_ids = []
+        for player in entrant:
+            cursor.execute('SELECT id FROM players WHERE name = ?', (player,))
+            player_ids.append(cursor.fetchone()[0])
+        player_ids.append(None)
+        rows.append((tournament_id, seed, player_ids[0], player_ids[1],
+                     sum(ratings[player][0] for player in entrant) / len(entrant)))
+    cursor.executemany('''
+        INSERT INTO tournament_entrants (tournament_id, seed, player1_id, player2_id, rating) VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+    advance_tournament(tournament_id)
+    return tournament_id
+
+
+def load_tournament(cursor, tournament_id):
+    """The tournament row, its entrants {seed: (players, seed rating)} and games {(bracket, round, position): game}."""
+    cursor.execute('SELECT name, format, match_type, num_fields, rounds, finished_at FROM tournaments WHERE id = ?',
+                   (tournament_id,))
+    tournament = cursor.fetchone()
+    if tournament is None:
+        raise ValueError(f'No tournament {tournament_id}')
+    cursor.execute('''
+        SELECT e.seed, p1.name, p2.name, e.rating
+        FROM tournament_entrants e
+        JOIN players p1 ON p1.id = e.player1_id
+        LEFT JOIN players p2 ON p2.id = e.player2_id
+        WHERE e.tournament_id = ?
+        ORDER BY e.seed
+    ''', (tournament_id,))
+    entrants = {seed: ((name1, name2) if name2 else (name1,), rating) for seed, name1, name2, rating in cursor.fetchall()}
+    cursor.execute('''
+        SELECT g.bracket, g.round, g.position, g.entrant_a, g.entrant_b, g.match_id, m.score_a, m.score_b, m.rated
+        FROM tournament_games g
+        LEFT JOIN matches m ON m.id = g.match_id
+        WHERE g.tournament_id = ?
+    ''', (tournament_id,))
+    games = {(bracket, number, position): game for bracket, number, position, *game in cursor.fetchall()}
+    return tournament, entrants, games
+
+
+def tournament_records(entrants, games):
+    """Per entrant: {'points', 'wins', 'draws', 'losses', 'opponents', 'byes'}. A win or bye is worth a point."""
+    records = {seed: {'points': 0.0, 'wins': 0, 'draws': 0, 'losses': 0, 'opponents': [], 'byes': 0}
+               for seed in entrants}
+    for game in games.values():
+        entrant_a, entrant_b = game[:2]
+        result = game_result(game)
+        if result is None or entrant_a is None:
+            continue
+        if entrant_b is None:
+            records[entrant_a]['points'] += 1
+            records[entrant_a]['byes'] += 1
+            continue
+        records[entrant_a]['opponents'].append(entrant_b)
+        records[entrant_b]['opponents'].append(entrant_a)
+        winner, loser = result
+        if winner is None:
+            for seed in (entrant_a, entrant_b):
+                records[seed]['points'] += 0.5
+                records[seed]['draws'] += 1
+        else:
+            records[winner]['points'] += 1
+            records[winner]['wins'] += 1
+            records[loser]['losses'] += 1
+    return records
+
+
+def add_tournament_round(cursor, tournament_id, tournament, games, entrants, player_elos, now):
+    """Insert one session holding a match for each new (key, entrant_a, entrant_b) game, top board on field 1.
+
+    More games than courts queue up on the courts in field order.
+    """
+    name, _, match_type, num_fields = tournament[:4]
+    cursor.execute('SELECT COUNT(*) FROM sessions WHERE tournament_id = ?', (tournament_id,))
+    round_number = cursor.fetchone()[0] + 1
+    date_str = now.strftime('%Y-%m-%d %H:%M:%S')
+    cursor.execute('''
+        INSERT INTO sessions (name, match_type, date, pairing_method, num_fields, tournament_id, tournament_round)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (f'{name} - Round {round_number}', match_type, to_epoch(now), tournament[1], num_fields, tournament_id,
+          round_number))
+    session_id = cursor.lastrowid
+
+    def side(seed):
+        players = entrants[seed][0]
+        return players if len(players) == 2 else players[0]
+
+    matches = [(side(entrant_a), side(entrant_b)) for _, entrant_a, entrant_b in games]
+    predictions, _ = predict_round(matches, player_elos)
+    rows = []
+    for index, ((key, entrant_a, entrant_b), match, prediction) in enumerate(zip(games, matches, predictions)):
+        match_id = insert_match(cursor, session_id, date_str, match, index % num_fields + 1, prediction[0])
+        rows.append((tournament_id,) + key + (entrant_a, entrant_b, match_id))
+    cursor.executemany('''
+        INSERT INTO tournament_games (tournament_id, bracket, round, position, entrant_a, entrant_b, match_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    return round_number
+
+
+def advance_tournament(tournament_id):
+    """Schedule every game that has become playable and record the byes that came up on the way.
+
+    A round robin is scheduled in full at the start, the next Swiss round once the last one is complete,
+    and bracket games as soon as both their entrants are known. Returns a summary of what was added.
+    """
+    conn = connect_db()
+    cursor = conn.cursor()
+    tournament, entrants, games = load_tournament(cursor, tournament_id)
+    tournament_format, rounds, finished_at = tournament[1], tournament[4], tournament[5]
+    summary = {'rounds': [], 'matches': 0, 'byes': 0, 'rematches': 0, 'pairing_ms': 0.0, 'finished': False}
+    if finished_at is not None:
+        conn.close()
+        summary['finished'] = True
+        return summary
+    player_elos = {name: rating for name, (rating, _) in
+                   get_effective_ratings([player for players, _ in entrants.values() for player in players]).items()}
+
+    start = time.perf_counter()
+    new_rounds = []  # Lists of ((bracket, round, position), entrant_a, entrant_b), one session each
+    byes = []
+    pending = any(game_result(game) is None for game in games.values())
+    if tournament_format == 'Round Robin':
+        if not games:
+            slots = pack_court_slots(round_robin_rounds(len(entrants)), tournament[3])
+            new_rounds = [[(('R', number, position), a + 1, b + 1) for position, (a, b) in enumerate(slot)]
+                          for number, slot in enumerate(slots, start=1)]
+    elif tournament_format == 'Swiss':
+        last_round = max((number for _, number, _ in games), default=0)
+        if not pending and last_round < rounds:
+            records = tournament_records(entrants, games)
+            # Score groups, then the seed rating
+            ranked = sorted(entrants, key=lambda seed: (-records[seed]['points'], -entrants[seed][1], seed))
+            played = {frozenset((game[0], game[1])) for game in games.values() if game[1] is not None}
+            pairs, bye = swiss_pairings(ranked, {seed: records[seed]['points'] for seed in entrants}, played,
+                                        {seed for seed in entrants if records[seed]['byes']})
+            summary['rematches'] = sum(frozenset(pair) in played for pair in pairs)
+            new_rounds = [[(('S', last_round + 1, position), a, b) for position, (a, b) in enumerate(pairs)]]
+            if bye is not None:
+                byes.append((('S', last_round + 1, len(pairs)), bye, None))
+    else:
+        structure = elimination_bracket(len(entrants), double=tournament_format == 'Double Elimination')
+        order = {key: index for index, key in enumerate(structure)}
+        ready = []
+        progress = True
+        while progress:  # A bye can make the game it feeds ready in turn
+            progress = False
+            for key, sources in structure.items():
+                if key in games:
+                    continue
+                sides = []
+                for kind, source in sources:
+                    if kind == 'seed':
+                        sides.append(source if source <= len(entrants) else None)
+                        continue
+                    result = game_result(games[source]) if source in games else None
+                    if result is None:
+                        break
+                    sides.append(result[0] if kind == 'winner' else result[1])
+                else:
+                    if key == ('F', 2, 0) and sides[0] == games[('F', 1, 0)][0]:
+                        continue  # The winners' bracket champion won the final: no reset
+                    entrant_a, entrant_b = sides
+                    if entrant_a is None or entrant_b is None:
+                        # A bye, or an empty slot when both feeders were byes
+                        entrant_a, entrant_b = entrant_a if entrant_a is not None else entrant_b, None
+                        games[key] = (entrant_a, None, None, None, None, None)
+                        byes.append((key, entrant_a, None))
+                    else:
+                        games[key] = (entrant_a, entrant_b, 0, None, None, 0)  # Still to be played
+                        ready.append((key, entrant_a, entrant_b))
+                    progress = True
+        if ready:
+            new_rounds = [sorted(ready, key=lambda game: order[game[0]])]
+    summary['pairing_ms'] = (time.perf_counter() - start) * 1000
+
+    now = datetime.now()
+    cursor.executemany('''
+        INSERT INTO tournament_games (tournament_id, bracket, round, position, entrant_a, entrant_b, match_id)
+        VALUES (?, ?, ?, ?, ?, ?, NULL)
+    ''', [(tournament_id,) + key + (entrant_a, entrant_b) for key, entrant_a, entrant_b in byes])
+    for new_games in new_rounds:
+        summary['rounds'].append(add_tournament_round(cursor, tournament_id, tournament, new_games, entrants,
+                                                      player_elos, now))
+        summary['matches'] += len(new_games)
+    summary['byes'] = sum(entrant_a is not None for _, entrant_a, _ in byes)
+    if not new_rounds and not pending:
+        cursor.execute('UPDATE tournaments SET finished_at = ? WHERE id = ?', (to_epoch(now), tournament_id))
+        summary['finished'] = True
+    conn.commit()
+    conn.close()
+    return summary
+
+
+def record_tournament_results(tournament_id, scores):
+    """Save {match_id: (score_a, score_b)}, rate the matches and schedule what they unlock. Returns advance_tournament's summary."""
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT format FROM tournaments WHERE id = ?', (tournament_id,))
+    tournament_format = cursor.fetchone()[0]
+    if 'Elimination' in tournament_format and any(score_a == score_b for score_a, score_b in scores.values()):
+        conn.close()
+        raise ValueError('Elimination games need a winner: enter the deciding score')
+    cursor.execute('SELECT match_id FROM tournament_games WHERE tournament_id = ? AND match_id IS NOT NULL',
+                   (tournament_id,))
+    known = {match_id for (match_id,) in cursor.fetchall()}
+    unknown = [match_id for match_id in scores if match_id not in known]
+    if unknown:
+        conn.close()
+        raise ValueError(f'Match(es) {unknown} are not part of this tournament')
+    # Results already in stay as they were rated: later rounds were paired on them
+    cursor.execute(f'''
+        SELECT id FROM matches WHERE rated = 1 AND id IN ({', '.join('?' for _ in scores)})
+    ''', list(scores))
+    rated = {match_id for (match_id,) in cursor.fetchall()}
+    scores = {match_id: score for match_id, score in scores.items() if match_id not in rated}
+    for match_id, (score_a, score_b) in scores.items():
+        save_match_score(cursor, match_id, score_a, score_b)
+    conn.commit()
+    conn.close()
+    rate_matches(list(scores))
+    return advance_tournament(tournament_id)
+
+
+def tournament_standings(tournament_id):
+    """Entrants best first as (name, seed rating, played, wins, draws, losses, points, buchholz), plus the champion.
+
+    Round robin and Swiss rank on points, then Buchholz (the points of everyone an entrant met), then seed rating;
+    brackets on fewest losses. The champion is None until the tournament has finished.
+    """
+    conn = connect_db()
+    cursor = conn.cursor()
+    tournament, entrants, games = load_tournament(cursor, tournament_id)
+    conn.close()
+    records = tournament_records(entrants, games)
+    buchholz = {seed: sum(records[opponent]['points'] for opponent in record['opponents'])
+                for seed, record in records.items()}
+    champion = None
+    if 'Elimination' in tournament[1]:
+        if tournament[5] is not None:  # The last game played decided it
+            structure = elimination_bracket(len(entrants), double=tournament[1] == 'Double Elimination')
+            champion = game_result([games[key] for key in structure if key in games][-1])[0]
+        key = lambda seed: (seed != champion, records[seed]['losses'], -records[seed]['points'], -entrants[seed][1])
+    else:
+        if tournament[5] is not None:
+            champion = min(entrants, key=lambda seed: (-records[seed]['points'], -buchholz[seed], -entrants[seed][1]))
+        key = lambda seed: (-records[seed]['points'], -buchholz[seed], -entrants[seed][1])
+    rows = [(entrant_name(entrants[seed][0]), entrants[seed][1],
+             records[seed]['wins'] + records[seed]['draws'] + records[seed]['losses'], records[seed]['wins'],
+             records[seed]['draws'], records[seed]['losses'], records[seed]['points'], buchholz[seed])
+            for seed in sorted(entrants, key=key)]
+    return rows, entrant_name(entrants[champion][0]) if champion is not None else None
+
+
+def pending_tournament_matches(tournament_id):
+    """Unrated matches of a tournament in playing order: (match_id, round, field_number, side A, side B)."""
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT m.id, s.tournament_round, m.field_number, pa1.name, pa2.name, pb1.name, pb2.name
+        FROM tournament_games g
+        JOIN matches m ON m.id = g.match_id
+        JOIN sessions s ON s.id = m.session_id
+        JOIN players pa1 ON m.player_a1_id = pa1.id
+        LEFT JOIN players pa2 ON m.player_a2_id = pa2.id
+        JOIN players pb1 ON m.player_b1_id = pb1.id
+        LEFT JOIN players pb2 ON m.player_b2_id = pb2.id
+        WHERE g.tournament_id = ? AND m.rated = 0
+        ORDER BY s.tournament_round, m.id
+    ''', (tournament_id,))
+    rows = [(match_id, round_number, field_number, entrant_name(filter(None, (a1, a2))),
+             entrant_name(filter(None, (b1, b2))))
+            for match_id, round_number, field_number, a1, a2, b1, b2 in cursor.fetchall()]
+    conn.close()
+    return rows
+
+
+def benchmark_tournament(num_entrants=256, tournament_format='Swiss', rounds=None, seed=1):
+    """Play a synthetic tournament to the end in a scratch database, timing every round's turnaround.
+
+    Returns the milliseconds spent pairing or drawing each round, and the seconds from submitting a round's
+    results to the next round being scheduled (saving and rating the results included).
+    """
+    import tempfile
+    global DATABASE
+    rng = random.Random(seed)
+    names = [f'Player {i}' for i in range(num_entrants)]
+    true_skills = {name: rng.gauss(1500, 200) for name in names}
+    saved_database = DATABASE
+    pairing_ms, turnarounds = [], []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            DATABASE = os.path.join(temp_dir, 'benchmark.db')
+            init_db()
+            conn = connect_db()
+            conn.executemany('INSERT INTO players (name, elo_rating) VALUES (?, ?)',
+                             [(name, round(skill)) for name, skill in true_skills.items()])
+            conn.commit()
+            conn.close()
+            tournament_id = create_tournament('Benchmark', tournament_format, names, num_fields=16, rounds=rounds)
+            while True:
+                scores = {}
+                for match_id, _, _, side_a, side_b in pending_tournament_matches(tournament_id):
+                    expected_a = calculate_expected_score(true_skills[side_a], true_skills[side_a],
+                                                          true_skills[side_b], true_skills[side_b])
+                    scores[match_id] = (21, rng.randrange(10, 20)) if rng.random() < expected_a else \
+                        (rng.randrange(10, 20), 21)
+                if not scores:
+                    break
+                started = time.perf_counter()
+                summary = record_tournament_results(tournament_id, scores)
+                if summary['rounds']:
+                    pairing_ms.append(summary['pairing_ms'])
+                    turnarounds.append(time.perf_counter() - started)
+            _, champion = tournament_standings(tournament_id)
+        finally:
+            DATABASE = saved_database
+    if turnarounds:
+        print(f"{tournament_format}, {num_entrants} entrants: slowest pairing {max(pairing_ms):.1f} ms, slowest "
+              f"turnaround from results to the next round {max(turnarounds):.2f}s over {len(turnarounds)} round(s)")
+    print(f"Won by {champion}")
+    return pairing_ms, turnarounds
+
+# Season simulator.
+# True skills are seeded from the players table; every simulated player starts
+# at the default rating and goes through the real pairing and rating code.
+def _simulate_seasons(true_skills, season_seeds, config):
+    """Worker: simulate one season per seed; returns per-session metric arrays."""
+    import numpy as np
+    num_players = len(true_skills)
+    names = [f"Player {i}" for i in range(num_players)]
+    true_order = np.argsort(-np.asarray(true_skills))
+    top = min(10, num_players)
+    true_top = set(true_order[:top].tolist())
+
+    def k_factor(matches_played):
+        return get_k_factor(matches_played, config['k_new'], config['k_established'], config['k_threshold'])
+
+    rmse = np.zeros((len(season_seeds), config['sessions']))
+    top_overlap = np.zeros((len(season_seeds), config['sessions']))
+    top_churn = np.zeros((len(season_seeds), config['sessions']))
+    rank_correlation = np.zeros((len(season_seeds), config['sessions']))
+    for season, season_seed in enumerate(season_seeds):
+        rng = random.Random(season_seed)
+        ratings = [config['start_rating']] * num_players
+        played = [0] * num_players
+        index = {name: i for i, name in enumerate(names)}
+        previous_top = None
+        for session in range(config['sessions']):
+            attendees = rng.sample(names, min(config['attendees'], num_players))
+            player_elos = {name: ratings[index[name]] for name in attendees}
+            for _ in range(config['rounds']):
+                matches, _ = generate_tiered_matchups(attendees, player_elos, config['match_type'],
+                                                      config['num_fields'], rng=rng, verbose=False)
+                for team_a, team_b in matches:
+                    team_a = [index[name] for name in (team_a if isinstance(team_a, tuple) else (team_a,))]
+                    team_b = [index[name] for name in (team_b if isinstance(team_b, tuple) else (team_b,))]
+                    a1, a2 = team_a[0], team_a[-1]
+                    b1, b2 = team_b[0], team_b[-1]
+                    match_type = 'Doubles' if len(team_a) == 2 else 'Singles'
+                    expected = calculate_expected_score(sum(true_skills[i] for i in team_a), 0,
+                                                        sum(true_skills[i] for i in team_b), 0)
+                    score_a = 1 if rng.random() < expected else 0
+                    updated = elo_match_update(ratings[a1], ratings[a2], ratings[b1], ratings[b2],
+                                               played[a1], played[a2], played[b1], played[b2],
+                                               score_a, match_type, k_factor=k_factor)
+                    for i, new_rating in zip((a1, a2, b1, b2), updated):
+                        ratings[i] = new_rating
+                    for i in team_a + team_b:
+                        played[i] += 1
+                        player_elos[names[i]] = ratings[i]
+
+            current = np.asarray(ratings)
+            # Compare after removing the overall offset between the two scales
+            error = (current - current.mean()) - (np.asarray(true_skills) - np.mean(true_skills))
+            rmse[season, session] = np.sqrt(np.mean(error ** 2))
+            order = np.argsort(-current)
+            current_top = set(order[:top].tolist())
+            top_overlap[season, session] = len(current_top & true_top) / top
+            top_churn[season, session] = 0 if previous_top is None else 1 - len(current_top & previous_top) / top
+            previous_top = current_top
+            ranks = np.empty(num_players)
+            ranks[order] = np.arange(num_players)
+            true_ranks = np.empty(num_players)
+            true_ranks[true_order] = np.arange(num_players)
+            rank_correlation[season, session] = np.corrcoef(ranks, true_ranks)[0, 1] if num_players > 1 else 1
+    return rmse, top_overlap, top_churn, rank_correlation
+
+
+def simulate_seasons(num_seasons=1000, sessions=30, attendees=24, rounds=4, num_fields=4, match_type='Doubles',
+                     k_new=40, k_established=20, k_threshold=30, start_rating=1500, workers=None,
+                     seed=1, converged_rmse=100.0, chunk_size=50):
+    """Run synthetic seasons on the shared process pool and aggregate rating quality metrics.
+
+    The current players' ELO ratings are used as true skills. Returns a dict of
+    NumPy arrays per session (mean rating RMSE, top-10 overlap with the true
+    top 10, top-10 churn between sessions, rank correlation) plus the
+    distribution of the first session where the RMSE drops below `converged_rmse`.
+    """
+    import numpy as np
+    from concurrent.futures.process import BrokenProcessPool
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT elo_rating FROM players WHERE active = 1')
+    true_skills = [elo for (elo,) in cursor.fetchall()]
+    conn.close()
+    if len(true_skills) < 4:
+        raise ValueError("At least 4 players are needed to simulate a season.")
+
+    config = {'sessions': sessions, 'attendees': attendees, 'rounds': rounds, 'num_fields': num_fields,
+              'match_type': match_type, 'k_new': k_new, 'k_established': k_established,
+              'k_threshold': k_threshold, 'start_rating': start_rating}
+    season_seeds = [seed * 1000003 + i for i in range(num_seasons)]
+    chunks = [season_seeds[i:i + chunk_size] for i in range(0, num_seasons, chunk_size)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    results = []
+    if workers > 1 and len(chunks) > 1:
+        try:
+            results = list(process_pool(workers).map(_simulate_seasons, itertools.repeat(true_skills), chunks,
+                                                     itertools.repeat(config)))
+        except (OSError, BrokenProcessPool) as e:
+            print(f"Process pool unavailable, simulating in-process: {e}")
+            shutdown_process_pool()
+            results = []
+    if not results:
+        results = [_simulate_seasons(true_skills, chunk, config) for chunk in chunks]
+
+    rmse, top_overlap, top_churn, rank_correlation = (np.concatenate(arrays) for arrays in zip(*results))
+    below = rmse < converged_rmse
+    # Sessions until convergence; seasons that never converge count as sessions + 1
+    convergence = np.where(below.any(axis=1), below.argmax(axis=1) + 1, sessions + 1)
+    return {
+        'seasons': num_seasons,
+        'rmse': rmse.mean(axis=0),
+        'top_overlap': top_overlap.mean(axis=0),
+        'top_churn': top_churn.mean(axis=0),
+        'rank_correlation': rank_correlation.mean(axis=0),
+        'convergence_median': float(np.median(convergence)),
+        'convergence_p90': float(np.percentile(convergence, 90)),
+        'converged_share': float(below.any(axis=1).mean()),
+    }
+
+
+def print_simulation_report(summary):
+    sessions = len(summary['rmse'])
+    print(f"{summary['seasons']} simulated seasons of {sessions} sessions")
+    print(f"Sessions until rating RMSE converges: median {summary['convergence_median']:.0f}, "
+          f"90th percentile {summary['convergence_p90']:.0f} "
+          f"({summary['converged_share'] * 100:.0f}% of seasons converged)")
+    print("session    rmse  top10 vs true  top10 churn  rank corr")
+    for session in sorted({0, sessions // 4, sessions // 2, 3 * sessions // 4, sessions - 1}):
+        print(f"{session + 1:>7} {summary['rmse'][session]:>7.1f} {summary['top_overlap'][session]:>14.2f} "
+              f"{summary['top_churn'][session]:>12.2f} {summary['rank_correlation'][session]:>10.3f}")
+
+
+# Fuzzy player name search.
+# Names are indexed by trigram (for typo tolerant matching) and by word prefix
+# (so the first one or two keystrokes are answered with a binary search).
+class PlayerSearchIndex:
+    """Incrementally updated trigram / prefix index over player names."""
+
+    def __init__(self, names=()):
+        self.trigrams = {}  # trigram -> set of names
+        self.trigram_counts = {}  # name -> number of distinct trigrams
+        self.prefixes = []  # sorted (lowercase word, name) pairs
+        self.add_many(names)
+
+    @staticmethod
+    def name_trigrams(text):
+        padded = f"  {' '.join(text.lower().split())} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    @staticmethod
+    def name_words(name):
+        lowered = name.lower()
+        return set(lowered.split()) | {lowered}
+
+    def __contains__(self, name):
+        return name in self.trigram_counts
+
+    def __len__(self):
+        return len(self.trigram_counts)
+
+    def _index_trigrams(self, name):
+        grams = self.name_trigrams(name)
+        for gram in grams:
+            self.trigrams.setdefault(gram, set()).add(name)
+        self.trigram_counts[name] = len(grams)
+
+    def add(self, name):
+        if name in self.trigram_counts:
+            return
+        self._index_trigrams(name)
+        for word in self.name_words(name):
+            bisect.insort(self.prefixes, (word, name))
+
+    def add_many(self, names):
+        """Bulk insert; the prefix list is sorted once instead of per name."""
+        new_names = [name for name in dict.fromkeys(names) if name not in self.trigram_counts]
+        if len(new_names) < 64:
+            for name in new_names:
+                self.add(name)
+            return
+        for name in new_names:
+            self._index_trigrams(name)
+            self.prefixes.extend((word, name) for word in self.name_words(name))
+        self.prefixes.sort()
+
+    def remove(self, name):
+        if name not in self.trigram_counts:
+            return
+        for gram in self.name_trigrams(name):
+            posting = self.trigrams.get(gram)
+            if posting is not None:
+                posting.discard(name)
+                if not posting:
+                    del self.trigrams[gram]
+        del self.trigram_counts[name]
+        for word in self.name_words(name):
+            row = bisect.bisect_left(self.prefixes, (word, name))
+            if row < len(self.prefixes) and self.prefixes[row] == (word, name):
+                del self.prefixes[row]
+
+    def prefix_matches(self, prefix, limit):
+        """Names with a word starting with `prefix`, in alphabetical order."""
+        matches = {}
+        row = bisect.bisect_left(self.prefixes, (prefix,))
+        while row < len(self.prefixes) and len(matches) < limit:
+            word, name = self.prefixes[row]
+            if not word.startswith(prefix):
+                break
+            matches[name] = None
+            row += 1
+        return list(matches)
+
+    def search(self, query, limit=200, min_similarity=0.3, accept=None):
+        """Return up to `limit` names ranked by similarity to `query`.
+
+        Prefix matches rank first, then names sharing enough trigrams with the
+        query, which tolerates typos and swapped letters. Queries of one or two
+        characters are too short for trigrams; they match names containing them
+        anywhere instead, after the prefix matches. `accept` optionally filters
+        candidate names (e.g. available players only).
+        """
+        query = ' '.join(query.lower().split())
+        if not query:
+            return []
+
+        scores = {}
+        for name in self.prefix_matches(query, limit * 4):
+            if accept is None or accept(name):
+                scores[name] = 3.0
+                if len(scores) >= limit:
+                    # Prefix matches always outrank fuzzy ones, nothing left to score
+                    return sorted(scores)
+
+        if len(query) < 3:
+            for name in self.trigram_counts:
+                if name not in scores and query in name.lower() and (accept is None or accept(name)):
+                    scores[name] = 1.0
+        else:
+            grams = self.name_trigrams(query)
+            counts = Counter()
+            for gram in grams:
+                posting = self.trigrams.get(gram)
+                if posting:
+                    counts.update(posting)
+            query_count = len(grams)
+            for name, shared in counts.items():
+                # Share of the query found in the name, Jaccard similarity breaks ties
+                containment = shared / query_count
+                if containment < min_similarity or name in scores:
+                    continue
+                if accept is not None and not accept(name):
+                    continue
+                similarity = containment + shared / (query_count + self.trigram_counts[name] - shared)
+                if query in name.lower():
+                    similarity += 1.0
+                scores[name] = similarity
+
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [name for name, _ in ranked]
+
+    def find_duplicates(self, name, threshold=0.6):
+        """Existing names that look like the same person as `name`."""
+        candidates = self.search(name, limit=10, min_similarity=threshold)
+        lowered = ' '.join(name.lower().split())
+        return [candidate for candidate in candidates
+                if candidate != name and (candidate.lower() == lowered or
+                                          self.similarity(candidate, name) >= threshold)]
+
+    def similarity(self, name_a, name_b):
+        grams_a = self.name_trigrams(name_a)
+        grams_b = self.name_trigrams(name_b)
+        return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+class PlayerSearchProxy(QSortFilterProxyModel):
+    """The available players, or only the ranked search results, over the same source model.
+
+    The list view keeps this one model (and its selection model) whatever is typed,
+    so players selected before a search stay selected while the results change.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.ranks = None  # name -> position in the current results; None shows every available player
+
+    def set_results(self, names):
+        """Show only `names` in that order, or every available player in roster order when None."""
+        if names is None and self.ranks is None:
+            return
+        self.ranks = None if names is None else {name: rank for rank, name in enumerate(names)}
+        self.invalidate()
+        self.sort(-1 if self.ranks is None else 0)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self.ranks is None or self.sourceModel().names[source_row] in self.ranks
+
+    def lessThan(self, left, right):
+        if self.ranks is None:
+            return left.row() < right.row()  # Roster order
+        last = len(self.ranks)  # Players added since the last search sort after the results until it reruns
+        return self.ranks.get(left.data(Qt.UserRole), last) < self.ranks.get(right.data(Qt.UserRole), last)
+
+
+# Shared roster backing the Available / Assigned player panels.
+# Entries are kept in a dict (name -> (name, elo_rating, order)) so membership
+# tests and rating lookups never touch the database or scan a list widget.
+class PlayerListModel(QAbstractListModel):
+    """Sorted list model of player names drawn from a shared roster index."""
+
+    def __init__(self, roster, sort_key, show_elo=False, parent=None):
+        super().__init__(parent)
+        self.roster = roster  # name -> (name, elo_rating, order)
+        self.sort_key = sort_key
+        self.show_elo = show_elo
+        self.names = []
+        self.keys = []  # Parallel to self.names, used for bisect insertions
+        self.members = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        name = self.names[index.row()]
+        if role == Qt.DisplayRole:
+            if self.show_elo:
+                return f"{name} ({int(self.roster[name][1])})"
+            return name
+        if role == Qt.UserRole:
+            return name
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsDragEnabled
+
+    def __contains__(self, name):
+        return name in self.members
+
+    def row_of(self, name):
+        """Return the row of a player using a binary search on the sort keys."""
+        key = self.sort_key(self.roster[name])
+        row = bisect.bisect_left(self.keys, key)
+        if row < len(self.names) and self.names[row] == name:
+            return row
+        return -1
+
+    def set_players(self, names):
+        """Replace the whole content of the model (used on full reloads)."""
+        self.beginResetModel()
+        pairs = sorted((self.sort_key(self.roster[name]), name) for name in set(names))
+        self.keys = [key for key, _ in pairs]
+        self.names = [name for _, name in pairs]
+        self.members = set(self.names)
+        self.endResetModel()
+
+    def insert_players(self, names):
+        """Insert players at their sorted position, one row at a time."""
+        for name in names:
+            if name in self.members:
+                continue
+            key = self.sort_key(self.roster[name])
+            row = bisect.bisect_left(self.keys, key)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.keys.insert(row, key)
+            self.names.insert(row, name)
+            self.members.add(name)
+            self.endInsertRows()
+
+    def remove_players(self, names):
+        """Remove players, grouping adjacent rows into a single removal."""
+        rows = sorted((self.row_of(name) for name in names if name in self.members), reverse=True)
+        rows = [row for row in rows if row >= 0]
+        index = 0
+        while index < len(rows):
+            last = first = rows[index]
+            index += 1
+            while index < len(rows) and rows[index] == first - 1:
+                first = rows[index]
+                index += 1
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for name in self.names[first:last + 1]:
+                self.members.discard(name)
+            del self.names[first:last + 1]
+            del self.keys[first:last + 1]
+            self.endRemoveRows()
+
+    def resort(self):
+        """Re-sort after the ratings of the underlying roster entries changed."""
+        self.set_players(self.names)
+
+
+class PlayerRoster:
+    """Hash index of every player plus the available/assigned models built on it."""
+
+    def __init__(self):
+        self.entries = {}  # name -> (name, elo_rating, order)
+        self.search_index = PlayerSearchIndex()
+        # Available players keep the "most recently played first" order,
+        # assigned players are sorted by ELO rating (strongest first)
+        self.available_model = PlayerListModel(self.entries, lambda entry: (entry[2], entry[0]))
+        self.assigned_model = PlayerListModel(self.entries, lambda entry: (-entry[1], entry[0]), show_elo=True)
+
+    def load(self):
+        """Load the roster in a single query, keeping current assignments."""
+        conn = connect_db()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT name
+            FROM players
+            WHERE active = 1
+            ORDER BY last_played DESC
+        ''')
+        players = [name for (name,) in cursor.fetchall()]
+        conn.close()
+        ratings = get_effective_ratings()  # Inactivity adjusted, like everywhere ratings are used
+
+        self.entries.clear()
+        for order, name in enumerate(players):
+            self.entries[name] = (name, ratings[name][0], order)
+
+        # Only index the difference so reloads after adding a player stay cheap
+        for name in [name for name in self.search_index.trigram_counts if name not in self.entries]:
+            self.search_index.remove(name)
+        self.search_index.add_many(self.entries)
+
+        assigned = [name for name in self.assigned_model.names if name in self.entries]
+        assigned_set = set(assigned)
+        self.assigned_model.set_players(assigned)
+        self.available_model.set_players(name for name in self.entries if name not in assigned_set)
+
+    def update_ratings(self, ratings):
+        """Refresh cached ratings (name -> elo_rating) and re-sort the assigned panel."""
+        for name, elo_rating in ratings.items():
+            entry = self.entries.get(name)
+            if entry:
+                self.entries[name] = (name, elo_rating, entry[2])
+        self.assigned_model.resort()
+
+    def elo_rating(self, name):
+        entry = self.entries.get(name)
+        return entry[1] if entry else 0
+
+    def assign(self, names):
+        """Move players from the available panel to the assigned panel."""
+        names = [name for name in dict.fromkeys(names) if name in self.available_model]
+        self.available_model.remove_players(names)
+        self.assigned_model.insert_players(names)
+        return names
+
+    def unassign(self, names):
+        """Move players from the assigned panel back to the available panel."""
+        names = [name for name in dict.fromkeys(names) if name in self.assigned_model]
+        self.assigned_model.remove_players(names)
+        self.available_model.insert_players(names)
+        return names
+
+
+def selected_player_names(view):
+    """Names of the players selected in a roster list view."""
+    return [index.data(Qt.UserRole) for index in view.selectionModel().selectedRows()]
+
+
+# Custom QListView for Assigned Players with Drag-and-Drop and Removal
+class AssignedPlayersList(QListView):
+    def __init__(self, available_list, roster, parent=None):
         super().__init__(parent)
         self.available_list = available_list
-        self.players = []  # Initialize the list to store players with their elo_rating
+        self.roster = roster
+        self.setModel(roster.assigned_model)
+        self.setUniformItemSizes(True)
         self.setAcceptDrops(True)
         self.setDragEnabled(True)  # Enable dragging from this list
         self.setDropIndicatorShown(True)
-        self.setDragDropMode(QAbstractItemView.InternalMove)
+        self.setDragDropMode(QAbstractItemView.DragDrop)
         self.setSelectionMode(QAbstractItemView.ExtendedSelection)  # Allow multiple selection
         self.setContextMenuPolicy(Qt.CustomContextMenu)  # Enable right-click context menu
         self.customContextMenuRequested.connect(self.show_context_menu)
@@ -312,83 +4425,26 @@ class AssignedPlayersList(QListWidget):
         if action == remove_action:
             self.remove_selected_players()
 
+    def player_names(self):
+        """Names of the assigned players, strongest first."""
+        return list(self.roster.assigned_model.names)
+
     def remove_selected_players(self):
         """Remove selected players from the assigned list and move them back to the available list."""
-        selected_items = self.selectedItems()
-        for item in selected_items:
-            player_name = item.text().split(" (")[0]  # Extract the player name
-            
-            # Remove the player from the assigned list
-            self.takeItem(self.row(item))
-            
-            # Remove the player from the internal players list (used to populate the assigned list)
-            self.players = [p for p in self.players if p[0] != player_name]
-
-            # Check if the player already exists in the available list before adding
-            if not self.is_in_list(player_name, self.available_list):
-                available_item = QListWidgetItem(player_name)
-                self.available_list.addItem(available_item)
-
-    def is_in_list(self, player_name, list_widget):
-        """Check if a player is already in a list to avoid duplication."""
-        for i in range(list_widget.count()):
-            if player_name == list_widget.item(i).text():
-                return True
-        return False
+        self.roster.unassign(selected_player_names(self))
+        self.clearSelection()
 
     def dropEvent(self, event):
         """Handle the drop event to move players between lists."""
         # Handle drop back to the available players list
         if event.source() == self:
-            selected_items = self.selectedItems()
-            for item in selected_items:
-                player_name = item.text().split(" (")[0]  # Extract the player name
-                self.takeItem(self.row(item))  # Remove from assigned list
-
-                # Remove the player from the internal players list
-                self.players = [p for p in self.players if p[0] != player_name]
-
-                # Move the player back to the available list if not already present
-                if not self.is_in_list(player_name, self.available_list):
-                    available_item = QListWidgetItem(player_name)
-                    self.available_list.addItem(available_item)
+            self.remove_selected_players()
         else:
-            super().dropEvent(event)
-
-            # Collect the dropped players from the available list
-            selected_items = self.available_list.selectedItems()
-            for item in selected_items:
-                player_name = item.text()
-
-                # Get the elo_rating for the player from the database
-                elo_rating = self.get_player_elo_rating(player_name)
-
-                # Ensure the player is not already in the assigned list
-                if not self.is_in_list(player_name, self):
-                    # Add the player to the assigned list and the internal players list
-                    self.players.append((player_name, elo_rating))
-
-                    # Remove the player from the available list
-                    self.available_list.takeItem(self.available_list.row(item))
-
-            # Sort players by elo_rating in descending order
-            self.players.sort(key=lambda x: x[1], reverse=True)
-
-            # Clear the assigned list and re-populate it
-            self.clear()
-            for player_name, elo_rating in self.players:
-                self.addItem(f"{player_name} ({int(elo_rating)})")
-
-    def get_player_elo_rating(self, player_name):
-        """Fetch the ELO rating of a player from the database."""
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT elo_rating FROM players WHERE name = ?
-        ''', (player_name,))
-        elo_rating = cursor.fetchone()[0]
-        conn.close()
-        return elo_rating
+            # Move the dropped players from the available list
+            self.roster.assign(selected_player_names(self.available_list))
+            self.available_list.clearSelection()
+        event.setDropAction(Qt.CopyAction)
+        event.accept()
 
     def dragEnterEvent(self, event):
         """Allow dragging players back from the assigned list."""
@@ -401,12 +4457,32 @@ class AssignedPlayersList(QListWidget):
 
 
 
+def reactivate_player(cursor, name):
+    """Bring back a removed player with their rating and history; False if there is none by that name."""
+    cursor.execute('UPDATE players SET active = 1, archived_at = NULL WHERE name = ? AND active = 0', (name,))
+    return cursor.rowcount > 0
+
 # Assuming you have a method to add a player to the database
 def add_player_to_db(self, name, elo_rating):
-    conn = sqlite3.connect(DATABASE)
+    conn = connect_db()
     cursor = conn.cursor()
     
     try:
+        # Names are unique, so a removed player of the same name can only come back as themselves
+        cursor.execute('SELECT elo_rating, matches_played FROM players WHERE name = ? AND active = 0', (name,))
+        removed = cursor.fetchone()
+        if removed:
+            confirm = QMessageBox.question(
+                self, 'Restore Removed Player',
+                f'{name} was removed earlier (rating {int(removed[0])}, {removed[1]} matches played).\n\n'
+                'Restore them with their rating and match history? Choose No to cancel.',
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if confirm == QMessageBox.Yes:
+                reactivate_player(cursor, name)
+                conn.commit()
+                QMessageBox.information(self, 'Player Restored', f'{name} was restored with their previous rating.')
+            return
         cursor.execute('''
             INSERT INTO players (name, elo_rating)
             VALUES (?, ?)
@@ -433,27 +4509,64 @@ class ManagePlayersDialog(QDialog):
                 with open(file_name, newline='') as csvfile:
                     reader = csv.reader(csvfile)
                     headers = next(reader)  # Skip the header row
-                    conn = sqlite3.connect(DATABASE)
-                    cursor = conn.cursor()
-                    for row in reader:
-                        player_id = int(row[0])
-                        name = row[1]
-                        elo_rating = int(row[2]) if row[2] else 1500  # Default ELO rating
-                        cursor.execute('''
-                            INSERT OR IGNORE INTO players (id, name, elo_rating)
-                            VALUES (?, ?, ?)
-                        ''', (player_id, name, elo_rating))
-                    conn.commit()
-                    conn.close()
-                    QMessageBox.information(self, 'Success', 'Players imported successfully.')
-                    self.load_players()  # Refresh the UI to show the newly imported players
+                    rows = [row for row in reader if row]
+
+                conn = connect_db()
+                cursor = conn.cursor()
+                cursor.execute('SELECT name FROM players')
+                search_index = PlayerSearchIndex(name for (name,) in cursor.fetchall())
+
+                # Flag names that look like an existing player (or an earlier row)
+                duplicates = []
+                for row in rows:
+                    name = row[1]
+                    if name not in search_index:
+                        matches = search_index.find_duplicates(name)
+                        if matches:
+                            duplicates.append((name, matches))
+                    search_index.add(name)
+
+                skipped = set()
+                if duplicates:
+                    details = "\n• ".join(f"{name} ≈ {', '.join(matches)}" for name, matches in duplicates[:20])
+                    confirm = QMessageBox.question(
+                        self, 'Possible Duplicates',
+                        f'{len(duplicates)} imported name(s) look like existing players:\n• {details}\n\n'
+                        'Import them anyway? Choose No to skip these rows.',
+                        QMessageBox.Yes | QMessageBox.No
+                    )
+                    if confirm == QMessageBox.No:
+                        skipped = {name for name, _ in duplicates}
+
+                restored = []
+                for row in rows:
+                    name = row[1]
+                    if name in skipped:
+                        continue
+                    elo_rating = int(row[2]) if row[2] else 1500  # Default ELO rating
+                    if reactivate_player(cursor, name):
+                        restored.append(name)  # Back with their old rating, not the file's
+                        continue
+                    # The ID column comes from another install: keep our own ids and match on the name
+                    cursor.execute('''
+                        INSERT OR IGNORE INTO players (name, elo_rating)
+                        VALUES (?, ?)
+                    ''', (name, elo_rating))
+                conn.commit()
+                conn.close()
+                message = 'Players imported successfully.'
+                if restored:
+                    message += (f'\n\n{len(restored)} previously removed player(s) were restored with their '
+                                'rating and match history:\n• ' + '\n• '.join(restored[:20]))
+                QMessageBox.information(self, 'Success', message)
+                self.load_players()  # Refresh the UI to show the newly imported players
             except Exception as e:
                 QMessageBox.critical(self, 'Error', f'An error occurred while importing players: {str(e)}')
 
     def export_players_info(self):
-        conn = sqlite3.connect(DATABASE)
+        conn = connect_db()
         cursor = conn.cursor()
-        cursor.execute('SELECT id, name, elo_rating FROM players')
+        cursor.execute('SELECT id, name, elo_rating FROM players WHERE active = 1')
         players_data = cursor.fetchall()
         conn.close()
 
@@ -471,8 +4584,8 @@ class ManagePlayersDialog(QDialog):
 
         # Players Table
         self.table = QTableWidget()
-        self.table.setColumnCount(3)
-        self.table.setHorizontalHeaderLabels(['ID', 'Name', 'Elo Rating'])
+        self.table.setColumnCount(4)
+        self.table.setHorizontalHeaderLabels(['ID', 'Name', 'Elo Rating', 'Gender'])
         self.load_players()
         self.table.setSelectionBehavior(QTableWidget.SelectRows)
         self.table.setEditTriggers(QTableWidget.NoEditTriggers)
@@ -493,30 +4606,85 @@ class ManagePlayersDialog(QDialog):
         button_layout.addWidget(self.export_players_button)
         button_layout.addWidget(self.import_players_button)
         layout.addLayout(button_layout)
+
+        # Removed players keep their history; they can be listed and brought back
+        removed_layout = QHBoxLayout()
+        self.show_removed_checkbox = QCheckBox('Show removed players')
+        self.show_removed_checkbox.toggled.connect(self.load_players)
+        self.restore_button = QPushButton('Restore Selected Player(s)')
+        self.restore_button.clicked.connect(self.restore_players)
+        self.restore_button.setEnabled(False)
+        # Gender is only used by the mixed doubles pairing rule
+        self.gender_button = QPushButton('Set Gender')
+        self.gender_button.clicked.connect(self.set_gender)
+        removed_layout.addWidget(self.show_removed_checkbox)
+        removed_layout.addWidget(self.restore_button)
+        removed_layout.addWidget(self.gender_button)
+        layout.addLayout(removed_layout)
+
+        # Changesets carry players, sessions and scored matches between laptops
+        sync_layout = QHBoxLayout()
+        self.export_changes_button = QPushButton('Export Changes')
+        self.export_changes_button.clicked.connect(self.export_changes)
+        self.import_changes_button = QPushButton('Import Changes')
+        self.import_changes_button.clicked.connect(self.import_changes)
+        sync_layout.addWidget(self.export_changes_button)
+        sync_layout.addWidget(self.import_changes_button)
+        layout.addLayout(sync_layout)
         self.setLayout(layout)
         self.table.resizeColumnsToContents()
     
+    def export_changes(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, 'Export Changes', '', 'Changesets (*.mgsync)')
+        if not file_path:
+            return
+        try:
+            counts = export_changeset(file_path)
+        except (OSError, sqlite3.Error) as e:
+            QMessageBox.critical(self, 'Error', f'An error occurred while exporting changes: {str(e)}')
+            return
+        QMessageBox.information(self, 'Success', f"Exported {counts['players']} player(s), {counts['sessions']} "
+                                                 f"session(s) and {counts['matches']} match(es).")
+
+    def import_changes(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, 'Import Changes', '', 'Changesets (*.mgsync)')
+        if not file_path:
+            return
+        try:
+            summary = import_changeset(file_path)
+        except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+            QMessageBox.critical(self, 'Error', f'An error occurred while importing changes: {str(e)}')
+            return
+        QMessageBox.information(self, 'Success',
+                                f"Merged {summary['players']} player(s), {summary['sessions']} session(s) and "
+                                f"{summary['matches']} new match(es); {summary['updated']} score(s) updated "
+                                f"({summary['conflicts']} conflict(s), later edit kept). "
+                                f"Re-rated {summary['replayed']} match(es).")
+        self.load_players()
+        self.refresh_available_players()
+
     def load_players(self):
-        conn = sqlite3.connect(DATABASE)
+        conn = connect_db()
         cursor = conn.cursor()
-        cursor.execute('SELECT id, name, elo_rating FROM players')
+        show_removed = hasattr(self, 'show_removed_checkbox') and self.show_removed_checkbox.isChecked()
+        cursor.execute('SELECT id, name, elo_rating, gender FROM players WHERE active = ?', (0 if show_removed else 1,))
         players = cursor.fetchall()
+        if hasattr(self, 'restore_button'):
+            self.restore_button.setEnabled(show_removed)
+            self.remove_button.setEnabled(not show_removed)
 
         self.table.setRowCount(len(players))
 
-        for row, (id, name, elo) in enumerate(players):
+        for row, (id, name, elo, gender) in enumerate(players):
             self.table.setItem(row, 0, QTableWidgetItem(str(id)))
             self.table.setItem(row, 1, QTableWidgetItem(name))
             self.table.setItem(row, 2, QTableWidgetItem(str(int(elo))))
+            self.table.setItem(row, 3, QTableWidgetItem(gender or ''))
         
         conn.close()
 
     def add_player_to_db(self, name, elo_rating):
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('INSERT INTO players (name, elo_rating) VALUES (?, ?)', (name, elo_rating))
-        conn.commit()
-        conn.close()
+        add_player_to_db(self, name, elo_rating)
 
     def add_player(self):
         dialog = AddPlayerDialog(self)
@@ -535,23 +4703,60 @@ class ManagePlayersDialog(QDialog):
             return
         confirm = QMessageBox.question(
             self, 'Confirm Removal',
-            f'Are you sure you want to remove {len(selected_rows)} player(s)?',
+            f'Are you sure you want to remove {len(selected_rows)} player(s)?\n\n'
+            'Their match history and ratings are kept; they can be restored later.',
             QMessageBox.Yes | QMessageBox.No
         )
         if confirm == QMessageBox.Yes:
-            conn = sqlite3.connect(DATABASE)
+            conn = connect_db()
             cursor = conn.cursor()
-            for row in selected_rows:
-                player_id = int(self.table.item(row, 0).text())
-                cursor.execute('DELETE FROM players WHERE id = ?', (player_id,))
+            # Archive rather than delete: their matches, rating history and season stats still point at them
+            cursor.executemany(
+                "UPDATE players SET active = 0, archived_at = datetime('now') WHERE id = ?",
+                [(int(self.table.item(row, 0).text()),) for row in selected_rows]
+            )
             conn.commit()
             conn.close()
             QMessageBox.information(self, 'Success', 'Selected player(s) removed successfully.')
             self.load_players()
             self.refresh_available_players()  # Refresh available players list after removal
 
+    def restore_players(self):
+        selected_rows = {item.row() for item in self.table.selectedItems()}
+        if not selected_rows:
+            QMessageBox.warning(self, 'Selection Error', 'Please select at least one player to restore.')
+            return
+        conn = connect_db()
+        cursor = conn.cursor()
+        cursor.executemany(
+            'UPDATE players SET active = 1, archived_at = NULL WHERE id = ?',
+            [(int(self.table.item(row, 0).text()),) for row in selected_rows]
+        )
+        conn.commit()
+        conn.close()
+        QMessageBox.information(self, 'Success', f'{len(selected_rows)} player(s) restored.')
+        self.load_players()
+        self.refresh_available_players()
+
+    def set_gender(self):
+        selected_rows = {item.row() for item in self.table.selectedItems()}
+        if not selected_rows:
+            QMessageBox.warning(self, 'Selection Error', 'Please select at least one player.')
+            return
+        gender, ok = QInputDialog.getItem(self, 'Set Gender', 'Gender for mixed doubles:', ['M', 'F', 'Not set'],
+                                          0, False)
+        if not ok:
+            return
+        conn = connect_db()
+        conn.executemany('UPDATE players SET gender = ? WHERE id = ?',
+                         [(gender if gender in ('M', 'F') else None, int(self.table.item(row, 0).text()))
+                          for row in selected_rows])
+        conn.commit()
+        conn.close()
+        self.load_players()
+
     def refresh_available_players(self):
-            conn = sqlite3.connect(DATABASE)
+            conn = connect_db()
             cursor = conn.cursor()
             cursor.execute('SELECT id, name, elo_rating FROM players')
             players = cursor.fetchall()
@@ -623,7 +4828,7 @@ class ImportPlayersDialog(QDialog):
         try:
             with open(file_path, newline='') as csvfile:
                 reader = csv.DictReader(csvfile)
-                conn = sqlite3.connect(DATABASE)
+                conn = connect_db()
                 cursor = conn.cursor()
                 for row in reader:
                     name = row['name'].strip()
@@ -643,9 +4848,16 @@ class ImportPlayersDialog(QDialog):
 class ScheduleSessionDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setWindowTitle('Generate Matchups')
+        self.setWindowTitle(f'Generate Matchups - {current_league}')
         self.setGeometry(100, 100, 700, 700)
+        # Only blocks the main window, so the leaderboard and match history stay usable during a session
+        self.setWindowModality(Qt.WindowModal)
         self.session_id = None
+        self.court_scheduler = None
+        self.round_attendees = None  # Players the current round was made for, kept up to date by update_round
+        self.round_bench = []
+        self.round_ratings = {}
+        self.round_match_type = None
         self.initUI(parent)
         self.setWindowIcon(QIcon("badminton_icon.png"))
         
@@ -660,24 +4872,66 @@ class ScheduleSessionDialog(QDialog):
         self.view_leaderboard_button = QPushButton("Leaderboard")
         self.view_match_history_button = QPushButton("Match History")
         self.tutorial_button = QPushButton('Tutorial')
+        self.calibration_button = QPushButton('Prediction Calibration')
+        self.analytics_button = QPushButton('Session Analytics')
+        self.tournaments_button = QPushButton('Tournaments')
         
         # Connect buttons to methods in the parent (MainWindow)
         self.manage_players_button.clicked.connect(parent.open_manage_players)
         self.view_leaderboard_button.clicked.connect(parent.open_leaderboard)
         self.view_match_history_button.clicked.connect(parent.open_match_history)
         self.tutorial_button.clicked.connect(parent.open_tutorial)
+        self.calibration_button.clicked.connect(lambda: CalibrationDialog(self).exec_())
+        self.analytics_button.clicked.connect(lambda: AnalyticsDialog(self).exec_())
+        self.tournaments_button.clicked.connect(self.open_tournaments)
         
         button_layout.addWidget(self.manage_players_button)
         button_layout.addWidget(self.view_leaderboard_button)
         button_layout.addWidget(self.view_match_history_button)
         button_layout.addWidget(self.tutorial_button)
+        button_layout.addWidget(self.calibration_button)
+        button_layout.addWidget(self.analytics_button)
+        button_layout.addWidget(self.tournaments_button)
         
         layout.addLayout(button_layout)
 
         form_layout = QFormLayout()
+
+        # League selection: each league has its own players, sessions and ratings
+        league_layout = QHBoxLayout()
+        self.league_combo = QComboBox()
+        self.league_combo.addItems(list_leagues())
+        self.league_combo.setCurrentText(current_league)
+        self.league_combo.currentTextChanged.connect(self.switch_league)
+        self.new_league_button = QPushButton('New League')
+        self.new_league_button.clicked.connect(self.create_league)
+        self.find_player_button = QPushButton('Find Player in All Leagues')
+        self.find_player_button.clicked.connect(self.find_player)
+        league_layout.addWidget(self.league_combo, 1)
+        league_layout.addWidget(self.new_league_button)
+        league_layout.addWidget(self.find_player_button)
+        form_layout.addRow('League:', league_layout)
+
+        # Backups of the live database, and a sandbox copy for trying things out
+        data_layout = QHBoxLayout()
+        self.backup_button = QPushButton('Back Up Now')
+        self.backup_button.clicked.connect(self.backup_now)
+        self.restore_button = QPushButton('Restore Backup')
+        self.restore_button.clicked.connect(self.restore_from_backup)
+        self.sandbox_button = QPushButton('Open Sandbox')
+        self.sandbox_button.clicked.connect(self.open_sandbox)
+        self.commit_sandbox_button = QPushButton('Keep Sandbox Changes')
+        self.commit_sandbox_button.clicked.connect(self.keep_sandbox_changes)
+        self.discard_sandbox_button = QPushButton('Discard Sandbox')
+        self.discard_sandbox_button.clicked.connect(self.close_sandbox)
+        for button in (self.backup_button, self.restore_button, self.sandbox_button,
+                       self.commit_sandbox_button, self.discard_sandbox_button):
+            data_layout.addWidget(button)
+        form_layout.addRow('Data:', data_layout)
         
         self.match_type_combo = QComboBox()
-        self.match_type_combo.addItems(['Doubles', 'Singles'])
+        # Mixed: each court gets doubles or singles, whichever mix seats the most players in the best balanced games
+        self.match_type_combo.addItems(['Doubles', 'Singles', 'Mixed'])
         form_layout.addRow('Match Type:', self.match_type_combo)
 
         # Add field number selection
@@ -692,6 +4946,35 @@ class ScheduleSessionDialog(QDialog):
 
         # Connect the signal to update num_fields directly
         self.field_number_spin.valueChanged.connect(lambda value: setattr(self, 'num_fields', value))
+
+        # Rating used for pairing: live ELO, or the individual skill fitted from all matches
+        self.rating_source_combo = QComboBox()
+        self.rating_source_combo.addItems(['Elo', 'Skill Fit'])
+        form_layout.addRow('Rating Source:', self.rating_source_combo)
+
+        # Pairing method: the original random ELO tiers, or the optimized parallel search
+        self.pairing_method_combo = QComboBox()
+        self.pairing_method_combo.addItems(['Random Tiers', 'Optimized Search'])
+        self.constraints_button = QPushButton('Pairing Rules')
+        self.constraints_button.clicked.connect(lambda: ConstraintsDialog(self).exec_())
+        pairing_layout = QHBoxLayout()
+        pairing_layout.addWidget(self.pairing_method_combo, 1)
+        pairing_layout.addWidget(self.constraints_button)
+        form_layout.addRow('Pairing Method:', pairing_layout)
+
+        self.search_time_spin = QSpinBox()
+        self.search_time_spin.setRange(1, 30)
+        self.search_time_spin.setValue(2)
+        self.search_time_spin.setSuffix(' s')
+        form_layout.addRow('Search Time:', self.search_time_spin)
+
+        self.seed_input = QLineEdit()
+        self.seed_input.setPlaceholderText('Random')
+        form_layout.addRow('Seed:', self.seed_input)
+
+        # Continuous courts: a court gets its next match as soon as its score is submitted
+        self.continuous_courts_check = QCheckBox('Refill each court as soon as its score is submitted')
+        form_layout.addRow('Continuous Courts:', self.continuous_courts_check)
         layout.addLayout(form_layout)
 
         # Drag and Drop Setup
@@ -704,29 +4987,55 @@ class ScheduleSessionDialog(QDialog):
         # Add search bar for available players
         self.search_bar = QLineEdit(self)
         self.search_bar.setPlaceholderText("Search for players...")
-        self.search_bar.textChanged.connect(self.filter_available_players)
+        # Debounce keystrokes: the search runs once typing pauses
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(120)
+        self.search_timer.timeout.connect(self.filter_available_players)
+        self.search_bar.textChanged.connect(lambda _: self.search_timer.start())
         
         # Add search bar to the available_layout
         available_layout.addWidget(available_label)
         available_layout.addWidget(self.search_bar)  # Add search bar here
-        self.available_list = QListWidget()
+        self.roster = PlayerRoster()
+        self.available_list = QListView()
+        self.available_proxy = PlayerSearchProxy(self)
+        self.available_proxy.setSourceModel(self.roster.available_model)
+        self.available_list.setModel(self.available_proxy)
+        self.available_list.setUniformItemSizes(True)
         self.available_list.setSelectionMode(QAbstractItemView.MultiSelection)
         self.available_list.setDragEnabled(True)
+        self.hidden_selection = set()  # Selected players the current search results leave out
+        # Keep the ranked results in sync when players move between panels
+        self.roster.available_model.rowsInserted.connect(lambda *_: self.search_timer.start())
+        self.roster.available_model.rowsRemoved.connect(lambda *_: self.search_timer.start())
+        self.roster.available_model.modelReset.connect(lambda: self.search_timer.start())
         available_layout.addWidget(self.available_list)
         drag_drop_layout.addLayout(available_layout)
 
         # Assigned Players List
         assigned_layout = QVBoxLayout()
         assigned_label = QLabel('Assigned Players:')
-        self.assigned_list = AssignedPlayersList(self.available_list)
+        self.assigned_list = AssignedPlayersList(self.available_list, self.roster)
         assigned_layout.addWidget(assigned_label)
         assigned_layout.addWidget(self.assigned_list)
         drag_drop_layout.addLayout(assigned_layout)
 
+        # Expected court utilization for the assigned players, before the round is created
+        self.utilization_label = QLabel()
+        assigned_layout.addWidget(self.utilization_label)
+        for signal in (self.roster.assigned_model.rowsInserted, self.roster.assigned_model.rowsRemoved):
+            signal.connect(lambda *_: self.update_utilization_preview())
+        self.roster.assigned_model.modelReset.connect(self.update_utilization_preview)
+        self.field_number_spin.valueChanged.connect(lambda _: self.update_utilization_preview())
+        self.match_type_combo.currentTextChanged.connect(lambda _: self.update_utilization_preview())
+        self.pairing_method_combo.currentTextChanged.connect(lambda _: self.update_utilization_preview())
+        self.update_utilization_preview()
+
         layout.addLayout(drag_drop_layout)
 
-        # Populate Available Players
-        self.populate_available_players()
+        # Populate Available Players once the dialog is on screen, so the roster query doesn't delay the first paint
+        QTimer.singleShot(0, self.populate_available_players)
 
         # Assuming you have a QTableWidget for scores
         self.scores_table = QTableWidget()
@@ -761,8 +5070,9 @@ class ScheduleSessionDialog(QDialog):
         layout.addWidget(self.matchups_label)
 
         self.matchups_table = QTableWidget()
-        self.matchups_table.setColumnCount(5)  # Field, Team A, Team B, Score A, Score B
-        self.matchups_table.setHorizontalHeaderLabels(['Field Number', 'Team A', 'Team B', 'Score A', 'Score B'])
+        self.matchups_table.setColumnCount(7)  # Field, Team A, Team B, Score A, Score B, predictions
+        self.matchups_table.setHorizontalHeaderLabels(['Field Number', 'Team A', 'Team B', 'Score A', 'Score B',
+                                                       'Win % A', 'Exp. Margin'])
         self.matchups_table.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.SelectedClicked)
         layout.addWidget(self.matchups_table)
 
@@ -770,43 +5080,179 @@ class ScheduleSessionDialog(QDialog):
         self.submit_scores_button = QPushButton('Submit Scores')
         self.submit_scores_button.clicked.connect(self.submit_scores)
         self.submit_scores_button.setEnabled(True)  # Disabled until a session is scheduled
-        layout.addWidget(self.submit_scores_button)
+        self.submit_court_button = QPushButton('Submit Selected Court')
+        self.submit_court_button.clicked.connect(self.submit_court)
+        # Late arrivals and early departures: assign or remove them, then update only the courts they affect
+        self.update_round_button = QPushButton('Update Round for Arrivals/Departures')
+        self.update_round_button.clicked.connect(self.update_round)
+        scores_buttons_layout = QHBoxLayout()
+        scores_buttons_layout.addWidget(self.submit_scores_button)
+        scores_buttons_layout.addWidget(self.submit_court_button)
+        scores_buttons_layout.addWidget(self.update_round_button)
+        layout.addLayout(scores_buttons_layout)
 
         self.setLayout(layout)
+        self.update_sandbox_controls()
 
     def filter_available_players(self):
-        search_text = self.search_bar.text().lower()
-        for i in range(self.available_list.count()):  # Use self.available_list here
-            item = self.available_list.item(i)
-            item.setHidden(search_text not in item.text().lower())
+        """Show ranked fuzzy matches for the search text, or the full list when empty."""
+        search_text = self.search_bar.text().strip()
+        available_model = self.roster.available_model
+        results = None
+        if search_text:
+            results = self.roster.search_index.search(search_text, accept=available_model.__contains__)
+        # The selection survives the search: players the new results hide are reselected when they show again
+        selected = set(selected_player_names(self.available_list)) | self.hidden_selection
+        self.available_proxy.set_results(results)
+
+        selection = self.available_list.selectionModel()
+        hidden = set()
+        for name in selected:
+            if name not in available_model:
+                continue  # Assigned in the meantime
+            index = self.available_proxy.mapFromSource(available_model.index(available_model.row_of(name)))
+            if not index.isValid():
+                hidden.add(name)
+            elif not selection.isSelected(index):
+                selection.select(index, QItemSelectionModel.Select)
+        self.hidden_selection = hidden
+
+    def switch_league(self, league):
+        if not league or league == current_league:
+            return
+        try:
+            set_league(league)
+        except (ValueError, sqlite3.Error) as e:
+            QMessageBox.warning(self, 'Error', f'Could not open league {league}: {e}')
+            self.league_combo.setCurrentText(current_league)
+            return
 
-    def populate_available_players(self):
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
+        # The running session belongs to the previous league
+        self.roster.assigned_model.set_players([])
+        self.reset_session_view()
 
-        # Modify the query to select players and order by last_participation (DESC to get most recent first)
-        cursor.execute('''
-            SELECT name, last_played
-            FROM players
-            ORDER BY last_played DESC
-        ''')
-        players = cursor.fetchall()
-        conn.close()
+    def reset_session_view(self):
+        """Forget the running session and reload players after the database was swapped."""
+        self.session_id = None
+        self.court_scheduler = None
+        self.round_attendees = None
+        self.matchups_table.setRowCount(0)
+        self.matchups_label.setText('Matchups:')
+        self.populate_available_players()
+        self.update_sandbox_controls()
+
+    def update_sandbox_controls(self):
+        in_sandbox = sandbox_source is not None
+        self.sandbox_button.setEnabled(not in_sandbox)
+        self.commit_sandbox_button.setEnabled(in_sandbox)
+        self.discard_sandbox_button.setEnabled(in_sandbox)
+        self.restore_button.setEnabled(not in_sandbox)
+        self.league_combo.setEnabled(not in_sandbox)
+        self.new_league_button.setEnabled(not in_sandbox)
+        self.setWindowTitle(f'Generate Matchups - {current_league}' + (' [SANDBOX]' if in_sandbox else ''))
+
+    def backup_now(self):
+        try:
+            path = backup_database('manual')
+        except (OSError, sqlite3.Error) as e:
+            QMessageBox.critical(self, 'Error', f'Backup failed: {e}')
+            return
+        QMessageBox.information(self, 'Success', f'Database backed up to {path}.')
+
+    def restore_from_backup(self):
+        backup_dir = os.path.join(BACKUP_DIR, current_league)
+        file_path, _ = QFileDialog.getOpenFileName(self, 'Restore Backup', backup_dir, 'Backups (*.db)')
+        if not file_path:
+            return
+        confirm = QMessageBox.question(
+            self, 'Confirm Restore',
+            'Replace the current data with this backup? The current data is backed up first.',
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if confirm != QMessageBox.Yes:
+            return
+        try:
+            restore_backup(file_path)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            QMessageBox.critical(self, 'Error', f'Restore failed: {e}')
+            return
+        self.reset_session_view()
+        QMessageBox.information(self, 'Success', 'Backup restored.')
+
+    def open_sandbox(self):
+        # The running session is copied too, so it can carry on inside the sandbox
+        enter_sandbox()
+        self.update_sandbox_controls()
+        QMessageBox.information(self, 'Sandbox',
+                                'You are now working on an in-memory copy. Nothing is saved until you keep the changes.')
 
-        # Get names of currently assigned players
-        assigned_player_names = [self.assigned_list.item(i).text().split(" (")[0] for i in range(self.assigned_list.count())]
+    def keep_sandbox_changes(self):
+        confirm = QMessageBox.question(
+            self, 'Keep Sandbox Changes',
+            'Overwrite the live data with the sandbox? The live data is backed up first.',
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if confirm != QMessageBox.Yes:
+            return
+        try:
+            commit_sandbox()
+        except (OSError, sqlite3.Error) as e:
+            QMessageBox.critical(self, 'Error', f'Could not save the sandbox: {e}')
+            return
+        self.update_sandbox_controls()
 
-        self.available_list.clear()
+    def close_sandbox(self):
+        discard_sandbox()
+        self.reset_session_view()  # Rounds created in the sandbox no longer exist
+
+    def create_league(self):
+        league, ok = QInputDialog.getText(self, 'New League', 'League name:')
+        league = league.strip()
+        if not ok or not league:
+            return
+        if not valid_league_name(league):
+            QMessageBox.warning(self, 'Error', 'League names may only contain letters, digits, spaces, - and _.')
+            return
+        if self.league_combo.findText(league) < 0:
+            self.league_combo.addItem(league)
+        # switch_league creates the file and resets the session view
+        self.league_combo.setCurrentText(league)
+        if current_league != league:
+            self.league_combo.removeItem(self.league_combo.findText(league))
+
+    def find_player(self):
+        name_query, ok = QInputDialog.getText(self, 'Find Player', 'Player name contains:')
+        if not ok or not name_query.strip():
+            return
+        results = find_player_across_leagues(name_query.strip())
+        if not results:
+            QMessageBox.information(self, 'Find Player', 'No player found in any league.')
+            return
+        lines = [f'{name} ({league}): Elo {int(elo)}, {matches} matches, last played {last_played or "never"}'
+                 for league, name, elo, matches, last_played in results]
+        QMessageBox.information(self, 'Find Player', '\n'.join(lines))
+
+    def update_utilization_preview(self):
+        num_players = len(self.roster.assigned_model.names)
+        match_type = self.match_type_combo.currentText()
+        on_court, fewest_courts, most_courts = round_utilization(num_players, self.num_fields, match_type)
+        courts = f"{fewest_courts}" if fewest_courts == most_courts else f"{fewest_courts}-{most_courts}"
+        text = (f"Expected: {on_court} of {num_players} players on court, "
+                f"{courts} of {self.num_fields} courts in use")
+        if match_type != 'Mixed' and self.pairing_method_combo.currentText() == 'Random Tiers':
+            text += " at best (random tiers may bench more)"
+        self.utilization_label.setText(text)
+
+    def open_tournaments(self):
+        # The assigned players are the suggested entrants of a new tournament
+        names = self.assigned_list.player_names()
+        TournamentDialog(self, names, {name: self.roster.elo_rating(name) for name in names}).exec_()
 
-        # Add players to the available list, but skip those who are already assigned
-        for name, last_played in players:
-            if name not in assigned_player_names:
-                item = QListWidgetItem(name)
-                self.available_list.addItem(item)
-    
+    def populate_available_players(self):
+        # Reload the roster in one query; players already assigned stay assigned
+        self.roster.load()
 
     def create_matchup(self):
-        global date_str
         date_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')  # Current date
         match_type = self.match_type_combo.currentText()
 
@@ -815,142 +5261,45 @@ class ScheduleSessionDialog(QDialog):
         assigned_players = []
         player_elos = {}  # Dictionary to store players and their ELO ratings
 
-        # Gather assigned players and their ELO ratings
-        for index in range(self.assigned_list.count()):
-            item = self.assigned_list.item(index)
-            # Extract player name before any additional info (e.g., "(ELO: XXX)")
-            player_name = item.text().split(" (")[0]  # Adjust based on your actual naming convention
-            elo = get_player_elo_rating(player_name)
+        # Gather assigned players and their ELO ratings from the cached roster
+        for player_name in self.assigned_list.player_names():
             assigned_players.append(player_name)
-            player_elos[player_name] = elo
+            player_elos[player_name] = self.roster.elo_rating(player_name)
 
         if not assigned_players:
             QMessageBox.warning(self, 'Input Error', 'No players assigned for matchups.')
             return
 
-        # Sort players by ELO ratings (strongest to weakest)
-        sorted_players = sorted(assigned_players, key=lambda player: player_elos[player], reverse=False)
-
-        # Determine number of tiers (2 to 4)
-        num_tiers = random.randint(2, 4)
-        print("Number of Tiers:", num_tiers)
-
-        # Calculate the size of each tier
-        players_per_tier = len(sorted_players) // num_tiers
-        remainder = len(sorted_players) % num_tiers
-
-        # Create tiers
-        tiers = []
-        start_index = 0
-
-        for tier_index in range(num_tiers):
-            # Distribute the remainder among the first 'remainder' tiers
-            end_index = start_index + players_per_tier + (1 if tier_index < remainder else 0)
-            tier = sorted_players[start_index:end_index]
-            tiers.append(tier)
-            start_index = end_index
-
-        matches = []
-        matched_players = set()  # To track players already in a match
-        bench_players = []  # To track players left on the bench
-
-        # Generate matchups starting from the weakest tier
-        for tier_index in range(num_tiers):
-            tier = tiers[tier_index]
-            num_players = len(tier)
-            print(f"Processing Tier {tier_index + 1} with {num_players} players.")
-
-            if match_type == 'Doubles':
-                # Shuffle players within the tier to randomize team assignments
-                random.shuffle(tier)
-                teams = []
-
-                # Pair players into teams of two
-                for i in range(0, num_players, 2):
-                    if i + 1 < num_players:
-                        team = (tier[i], tier[i + 1])
-                        teams.append(team)
-                        matched_players.update(team)
-                    else:
-                        # Handle odd player by leaving them for singles
-                        leftover_player = tier[i]
-                        # Try to pair with the next tier
-                        if tier_index + 1 < num_tiers:
-                            tiers[tier_index + 1].append(leftover_player)
-                        else:
-                            bench_players.append(leftover_player)
-                        print(f"Leftover Player in Tier {tier_index + 1}: {leftover_player}")
-
-                # Shuffle teams to randomize match pairings
-                random.shuffle(teams)
-
-                # Pair teams against each other within the same tier
-                for i in range(0, len(teams), 2):
-                    if i + 1 < len(teams):
-                        team_a = teams[i]
-                        team_b = teams[i + 1]
-                        matches.append((team_a, team_b))
-                    else:
-                        # Handle odd number of teams by leaving the last team for singles
-                        leftover_team = teams[i]
-                        bench_players.extend(leftover_team)  # Add all team members to the bench
-                        print(f"Leftover Team in Tier {tier_index + 1}: {leftover_team}")
-
-            else:  # Singles
-                # Shuffle players within the tier to randomize match pairings
-                random.shuffle(tier)
-
-                # Pair players directly
-                for i in range(0, num_players, 2):
-                    if i + 1 < num_players:
-                        player_a = tier[i]
-                        player_b = tier[i + 1]
-                        matches.append((player_a, player_b))
-                        matched_players.update([player_a, player_b])
-                    else:
-                        # Handle odd player by leaving them on the bench
-                        leftover_player = tier[i]
-                        # Try to pair with the next tier
-                        if tier_index + 1 < num_tiers:
-                            tiers[tier_index + 1].append(leftover_player)
-                        else:
-                            bench_players.append(leftover_player)
-                        print(f"Leftover Player on Bench in Tier {tier_index + 1}: {leftover_player}")
-
-        # Step 2: Try to form additional doubles using bench players
-        while len(bench_players) >= 4:
-            # Take the first four players to form two teams for a doubles match
-            team_a = (bench_players.pop(0), bench_players.pop(0))
-            team_b = (bench_players.pop(0), bench_players.pop(0))
-            matches.append((team_a, team_b))
-
-        # Step 3: Create singles matches if 3 or fewer players are left on the bench and fields are available
-        max_matches = self.num_fields
-
-        while len(bench_players) >= 2 and len(matches) < max_matches:
-            player_a = bench_players.pop(0)
-            player_b = bench_players.pop(0)
-            matches.append((player_a, player_b))
-
-        # Shuffle matches for random assignment to fields
-        random.shuffle(matches)
-
-        # Respect the maximum number of fields
-        if len(matches) > max_matches:
-            # Move extra teams or players to the bench
-            extra_matches = matches[max_matches:]
-            matches = matches[:max_matches]
-            
-            for match in extra_matches:
-                if isinstance(match[0], tuple) and isinstance(match[1], tuple):
-                    # Double team match
-                    team_a, team_b = match
-                    bench_players.extend(team_a)
-                    bench_players.extend(team_b)
-                elif isinstance(match[0], str) and isinstance(match[1], str):
-                    # Singles match
-                    bench_players.append(match[0])
-                    bench_players.append(match[1])
+        if self.rating_source_combo.currentText() == 'Skill Fit':
+            player_elos = get_skill_ratings(assigned_players)
+
+        # An explicit seed reproduces a round; leave it blank for a fresh random one
+        seed_text = self.seed_input.text().strip()
+        if seed_text and not seed_text.isdigit():
+            QMessageBox.warning(self, 'Input Error', 'The seed must be a whole number.')
+            return
+        pairing_method = self.pairing_method_combo.currentText()
+        if match_type == 'Mixed':
+            pairing_method = 'Optimized Search'  # Mixed rounds are always assigned by the search
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        generation_start = time.perf_counter()
+        try:
+            round_result = generate_round(player_elos, self.num_fields, match_type, pairing_method,
+                                          seed=int(seed_text) if seed_text else None,
+                                          time_budget=self.search_time_spin.value())
+        finally:
+            QApplication.restoreOverrideCursor()
+        generation_ms = (time.perf_counter() - generation_start) * 1000
+        matches, bench_players = round_result['matches'], round_result['bench']
+
+        # Tell the organiser which pairing rules this round could not keep
+        if round_result['relaxed']:
+            details = "\n• ".join(describe_constraint(constraint) + (f" ×{count}" if count > 1 else '')
+                                  for constraint, count in round_result['relaxed'][:20])
+            hint = '' if pairing_method == 'Optimized Search' else \
+                '\n\nOnly the Optimized Search pairing method takes the rules into account.'
+            QMessageBox.warning(self, 'Pairing Rules Relaxed',
+                                f"This round breaks {len(round_result['relaxed'])} pairing rule(s):\n• {details}{hint}")
 
         # Display which players are on the bench
         if bench_players:
@@ -959,106 +5308,109 @@ class ScheduleSessionDialog(QDialog):
             QMessageBox.information(self, 'Bench Players', bench_message)
 
         # Assign matches to fields
-        field_number = 1
         self.matchups_table.setRowCount(0)  # Clear any existing rows
 
         try:
-            with sqlite3.connect(DATABASE) as conn:
+            with connect_db() as conn:
                 cursor = conn.cursor()
 
                 # Insert new session
-                cursor.execute('''INSERT INTO sessions (name, match_type, date) VALUES (?, ?, ?)''',
-                            (f"Session on {date_str}", match_type, date_str))
+                cursor.execute('''INSERT INTO sessions (name, match_type, date, seed, pairing_method, num_fields,
+                                roster_snapshot, chain_seed, search_iterations, constraints_snapshot, history_snapshot)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                            (f"Session on {date_str}", match_type_code(match_type), to_epoch(date_str),
+                             round_result['seed'], pairing_method,
+                             self.num_fields, json.dumps(round_result['roster']), round_result['chain_seed'],
+                             round_result['iterations'], json.dumps(round_result['constraints']),
+                             json.dumps(round_result['history']) if round_result['history'] else None))
                 session_id = cursor.lastrowid
 
-                for match in matches:
-                    if match_type == 'Doubles':
-                        # Determine if this match is Doubles or Singles based on match structure
-                        if len(match) == 2 and isinstance(match[0], tuple) and isinstance(match[1], tuple):
-                            # Doubles Match
-                            team_a, team_b = match
-                            player_a1, player_a2 = team_a
-                            player_b1, player_b2 = team_b
-
-                            player_a1_id = get_player_id(player_a1)
-                            player_a2_id = get_player_id(player_a2)
-                            player_b1_id = get_player_id(player_b1)
-                            player_b2_id = get_player_id(player_b2)
-
-                            cursor.execute('''INSERT INTO matches (date, session_id, player_a1_id, player_a2_id,
-                            player_b1_id, player_b2_id, score_a, score_b, winner1_id, winner2_id, match_type, field_number)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
-                                date_str, session_id, player_a1_id, player_a2_id,
-                                player_b1_id, player_b2_id, 0, 0,
-                                None, None, 'Doubles', field_number
-                            ))
-
-                            # Update the matchups_table UI
-                            row_position = self.matchups_table.rowCount()
-                            self.matchups_table.insertRow(row_position)
-                            self.matchups_table.setItem(row_position, 0, QTableWidgetItem(str(field_number)))
-                            self.matchups_table.setItem(row_position, 1, QTableWidgetItem(f"({player_a1} & {player_a2})"))
-                            self.matchups_table.setItem(row_position, 2, QTableWidgetItem(f"({player_b1} & {player_b2})"))
-                            self.matchups_table.setItem(row_position, 3, QTableWidgetItem(""))  # Score A
-                            self.matchups_table.setItem(row_position, 4, QTableWidgetItem(""))  # Score B
-
-                        elif len(match) == 2 and isinstance(match[0], str) and isinstance(match[1], str):
-                            # Singles Match within Doubles Session
-                            player_a, player_b = match
-
-                            player_a_id = get_player_id(player_a)
-                            player_b_id = get_player_id(player_b)
-                            player_a_name = player_a if player_a_id else "N/A"
-                            player_b_name = player_b if player_b_id else "N/A"
-
-                            cursor.execute('''INSERT INTO matches (date, session_id, player_a1_id, player_b1_id,
-                            score_a, score_b, winner1_id, match_type, field_number)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
-                                date_str, session_id, player_a_id, player_b_id,
-                                0, 0, None, 'Singles', field_number
-                            ))
-
-                            # Update the matchups_table UI
-                            row_position = self.matchups_table.rowCount()
-                            self.matchups_table.insertRow(row_position)
-                            self.matchups_table.setItem(row_position, 0, QTableWidgetItem(str(field_number)))
-                            self.matchups_table.setItem(row_position, 1, QTableWidgetItem(player_a_name))
-                            self.matchups_table.setItem(row_position, 2, QTableWidgetItem(player_b_name))
-                            self.matchups_table.setItem(row_position, 3, QTableWidgetItem(""))  # Score A
-                            self.matchups_table.setItem(row_position, 4, QTableWidgetItem(""))  # Score B
-
-                    else:  # Singles match
-                        player_a, player_b = match
-
-                        player_a_id = get_player_id(player_a)
-                        player_b_id = get_player_id(player_b)
-
-                        cursor.execute('''INSERT INTO matches (date, session_id, player_a1_id, player_b1_id,
-                        score_a, score_b, winner1_id, match_type, field_number)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
-                            date_str, session_id, player_a_id, player_b_id,
-                            0, 0, None, 'Singles', field_number
-                        ))
-
-                        # Update the matchups_table UI
-                        row_position = self.matchups_table.rowCount()
-                        self.matchups_table.insertRow(row_position)
-                        self.matchups_table.setItem(row_position, 0, QTableWidgetItem(str(field_number)))
-                        self.matchups_table.setItem(row_position, 1, QTableWidgetItem(player_a))
-                        self.matchups_table.setItem(row_position, 2, QTableWidgetItem(player_b))
-                        self.matchups_table.setItem(row_position, 3, QTableWidgetItem(""))  # Score A
-                        self.matchups_table.setItem(row_position, 4, QTableWidgetItem(""))  # Score B
-
-                    field_number += 1
+                # Predict every court of the round in one batch from the cached ratings
+                predictions, balance_score = predict_round(matches, player_elos)
+                for field_number, (match, prediction) in enumerate(zip(matches, predictions), start=1):
+                    match_id = insert_match(cursor, session_id, date_str, match, field_number, prediction[0])
+                    self.add_matchup_row(field_number, match, match_id, prediction)
+
+                # Keep the round's quality for the analytics dashboard
+                courts = court_quality(matches, player_elos, predictions, load_pairing_history(assigned_players))
+                settings = {'pairing_method': pairing_method, 'match_type': match_type, 'num_fields': self.num_fields,
+                            'rating_source': self.rating_source_combo.currentText()}
+                record_round_metrics(cursor, session_id, date_str, settings, courts, len(assigned_players),
+                                     len(bench_players), generation_ms, balance_score, len(round_result['relaxed']))
 
                 conn.commit()  # Commit all changes to the database
                 self.matchups_table.resizeColumnsToContents() # Adapt size of columns to length of text
+            self.session_id = session_id
+            on_court = len(assigned_players) - len(bench_players)
+            self.matchups_label.setText(f"Matchups (seed {round_result['seed']}, balance score {balance_score:.0f}/100, "
+                                        f"{on_court} of {len(assigned_players)} players on court):")
 
         except sqlite3.Error as e:
             print(f"Database error: {e}")
             QMessageBox.critical(self, 'Database Error', f"An error occurred while saving matchups: {e}")
+            return
 
-
+        self.round_attendees = list(assigned_players)
+        self.round_bench = list(bench_players)
+        self.round_ratings = dict(player_elos)
+        self.round_match_type = match_type
+
+        # In continuous mode every court is refilled on its own as soon as its score is in
+        self.court_scheduler = None
+        if self.continuous_courts_check.isChecked():
+            self.court_scheduler = CourtQueueScheduler(player_elos, match_type)
+            for field_number, match in enumerate(matches, start=1):
+                self.court_scheduler.start_court(field_number, match)
+            for player_name in bench_players:
+                self.court_scheduler.enqueue(player_name)
+
+    def add_matchup_row(self, field_number, match, match_id, prediction=None, row_position=None):
+        """Show a match in the matchups table; the match id is kept on the field cell.
+
+        `prediction` is the (win probability of side A, expected margin) pair from predict_round.
+        """
+        if row_position is None:
+            row_position = self.matchups_table.rowCount()
+            self.matchups_table.insertRow(row_position)
+        team_a, team_b = match
+        if isinstance(team_a, tuple):
+            team_a_text, team_b_text = f"({team_a[0]} & {team_a[1]})", f"({team_b[0]} & {team_b[1]})"
+        else:
+            team_a_text, team_b_text = team_a, team_b
+        field_item = QTableWidgetItem(str(field_number))
+        field_item.setData(Qt.UserRole, match_id)
+        self.matchups_table.setItem(row_position, 0, field_item)
+        self.matchups_table.setItem(row_position, 1, QTableWidgetItem(team_a_text))
+        self.matchups_table.setItem(row_position, 2, QTableWidgetItem(team_b_text))
+        self.matchups_table.setItem(row_position, 3, QTableWidgetItem(""))  # Score A
+        self.matchups_table.setItem(row_position, 4, QTableWidgetItem(""))  # Score B
+        if prediction is not None:
+            probability_a, expected_margin = prediction
+            for column, text in ((5, f"{probability_a * 100:.0f}%"), (6, f"{expected_margin:+.1f}")):
+                item = QTableWidgetItem(text)
+                item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)  # Read-only
+                self.matchups_table.setItem(row_position, column, item)
+
+    def record_score(self, cursor, row):
+        """Save the scores typed in a matchups table row. Returns the match id, or None if invalid."""
+        field_number_item = self.matchups_table.item(row, 0)
+        score_a = self.matchups_table.item(row, 3).text().strip()
+        score_b = self.matchups_table.item(row, 4).text().strip()
+        field_number = field_number_item.text()
+
+        # Replace 'N/A' with 0
+        if score_a == 'N/A':
+            score_a = '0'
+        if score_b == 'N/A':
+            score_b = '0'
+        # Validate scores
+        if not score_a.isdigit() or not score_b.isdigit():
+            QMessageBox.warning(self, 'Input Error', f'Please enter valid scores for Field {field_number}.')
+            return None
+        score_a, score_b = int(score_a), int(score_b)
+
+        match_id = field_number_item.data(Qt.UserRole)
+        return match_id if save_match_score(cursor, match_id, score_a, score_b) else None
 
     def submit_scores(self):
         row_count = self.matchups_table.rowCount()
@@ -1066,140 +5418,849 @@ class ScheduleSessionDialog(QDialog):
             QMessageBox.warning(self, 'Error', 'No matches found to submit scores.')
             return
 
-        conn = sqlite3.connect(DATABASE)
+        conn = connect_db()
         cursor = conn.cursor()
 
+        match_ids = []
         for row in range(row_count):
-            field_number_item = self.matchups_table.item(row, 0)
-            team_a_item = self.matchups_table.item(row, 1)
-            team_b_item = self.matchups_table.item(row, 2)
-            score_a_item = self.matchups_table.item(row, 3)
-            score_b_item = self.matchups_table.item(row, 4)
-
-            field_number = int(field_number_item.text()) if field_number_item.text().isdigit() else None
-            team_a = team_a_item.text()
-            team_b = team_b_item.text()
-            score_a = score_a_item.text()
-            score_b = score_b_item.text()
-
-            # Replace 'N/A' with 0
-            if score_a == 'N/A':
-                score_a = 0
-            if score_b == 'N/A':
-                score_b = 0
-            # Validate scores
-            if not score_a.isdigit() or not score_b.isdigit():
-                QMessageBox.warning(self, 'Input Error', f'Please enter valid scores for Field {field_number}.')
+            match_id = self.record_score(cursor, row)
+            if match_id is None:
+                conn.close()
                 return
+            match_ids.append(match_id)
 
-            # Determine winner
-            if int(score_a) > int(score_b):
-                winner_team = team_a
-            elif int(score_b) > int(score_a):
-                winner_team = team_b
-            else:
-                winner_team = None  # Handle draw if necessary
-
-            # Fetch match_id from the database based on field_number
-            cursor.execute('''
-                            SELECT id, player_a1_id, player_a2_id, player_b1_id, player_b2_id, match_type FROM matches
-                            WHERE field_number = ? AND date = ? 
-                        ''', (field_number, date_str))
-            match = cursor.fetchone()
-            if match:
-                match_id, player_a1_id, player_a2_id, player_b1_id, player_b2_id, match_type = match
-
-                # Update match scores and winner_id
-                if winner_team == team_a:
-                    winner1_id, winner2_id = player_a1_id, player_a2_id
-                elif winner_team == team_b:
-                    winner1_id, winner2_id = player_b1_id, player_b2_id
-                else:
-                    winner1_id, winner2_id = None, None  # Handle draw if necessary
-
-                if match_type == 'Singles':
-                    cursor.execute('''
-                        UPDATE matches
-                        SET score_a = ?, score_b = ?, winner1_id = ?, winner2_id = NULL
-                        WHERE id = ?
-                    ''', (score_a, score_b, winner1_id, match_id))
-                else:
-                    cursor.execute('''
-                        UPDATE matches
-                        SET score_a = ?, score_b = ?, winner1_id = ?, winner2_id = ?
-                        WHERE id = ?
-                    ''', (score_a, score_b, winner1_id, winner2_id, match_id))
-            
         conn.commit()
         conn.close()
 
         # Update Elo ratings based on the submitted scores
-        self.update_elo_ratings()
+        self.update_elo_ratings(match_ids)
         
         # Refresh the assigned players list with updated rankings
         self.refresh_assigned_players()
 
         QMessageBox.information(self, 'Success', 'Scores submitted and records updated successfully.')
 
-    def update_elo_ratings(self):
-        conn = sqlite3.connect(DATABASE)
+    def submit_court(self):
+        """Submit the selected court's score and, in continuous mode, start its next match."""
+        row = self.matchups_table.currentRow()
+        if row < 0:
+            QMessageBox.warning(self, 'Selection Error', 'Please select the court to submit.')
+            return
+
+        conn = connect_db()
         cursor = conn.cursor()
+        match_id = self.record_score(cursor, row)
+        if match_id is None:
+            conn.close()
+            return
+        conn.commit()
 
-        # Fetch all matches in the latest session
-        cursor.execute('''
-            SELECT id, player_a1_id, player_a2_id, player_b1_id, player_b2_id, score_a, score_b, winner1_id, winner2_id, match_type, field_number
-            FROM matches
-            WHERE session_id = (
-                SELECT id FROM sessions ORDER BY id DESC LIMIT 1
-            )
-        ''')
-        matches = cursor.fetchall()
-
-        for match in matches:
-            match_id, player_a1_id, player_a2_id, player_b1_id, player_b2_id, score_a, score_b, winner1_id, winner2_id, match_type, field_number = match
-            # Update Elo based on the scores
-            if match_type == 'Singles':
-                if score_a > score_b:
-                    winner1_id = player_a1_id
-                    winner2_id = None
-                elif score_b > score_a:
-                    winner1_id = player_b1_id
-                    winner2_id = None
-                else:
-                    winner1_id = None
-                    winner2_id = None  # Draw
-                update_elo(player_a1_id, None, player_b1_id, None, winner1_id, winner2_id, session_id=None, match_type=match_type, field_number=field_number)
-            else:
-                # For doubles, determine winner based on team scores
-                if score_a > score_b:
-                    winner1_id = player_a1_id
-                    winner2_id = player_a2_id
-                elif score_b > score_a:
-                    winner1_id = player_b1_id
-                    winner2_id = player_b2_id
-                else:
-                    winner1_id = None
-                    winner2_id = None  # Draw
-                update_elo(player_a1_id, player_a2_id, player_b1_id, player_b2_id, winner1_id, winner2_id, session_id=None, match_type=match_type, field_number=field_number)
+        self.update_elo_ratings([match_id])
+        self.refresh_assigned_players()
+
+        field_number = int(self.matchups_table.item(row, 0).text())
+        next_match = self.court_scheduler.court_finished(field_number) if self.court_scheduler else None
+        if next_match:
+            date_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            (prediction,), _ = predict_round([next_match], self.court_scheduler.ratings)
+            next_match_id = insert_match(cursor, self.session_id, date_str, next_match, field_number, prediction[0])
+            conn.commit()
+            self.add_matchup_row(field_number, next_match, next_match_id, prediction, row_position=row)
+            self.matchups_table.resizeColumnsToContents()
+        else:
+            self.matchups_table.removeRow(row)
+        conn.close()
+
+    def update_round(self):
+        """Fit players assigned since the round was created in and take out the ones removed since.
+
+        Only the courts a change affects are rewritten; scored courts are never touched.
+        """
+        if self.session_id is None or self.round_attendees is None:
+            QMessageBox.warning(self, 'No Round', 'Create a round first.')
+            return
+        assigned = self.assigned_list.player_names()
+        attendees = set(self.round_attendees)
+        arrivals = [name for name in assigned if name not in attendees]
+        departures = sorted(attendees - set(assigned))
+        if not arrivals and not departures:
+            QMessageBox.information(self, 'No Changes', 'Assign late arrivals or remove departed players first.')
+            return
+        player_elos = dict(self.round_ratings)
+        for name in arrivals:
+            player_elos[name] = self.roster.elo_rating(name)
 
+        conn = connect_db()
+        cursor = conn.cursor()
+        courts, busy_fields, match_ids, rows = {}, set(), {}, {}
+        for row in range(self.matchups_table.rowCount()):
+            field_item = self.matchups_table.item(row, 0)
+            field_number = int(field_item.text())
+            rows[field_number] = row
+            cursor.execute('''
+                SELECT pa1.name, pa2.name, pb1.name, pb2.name
+                FROM matches m
+                JOIN players pa1 ON m.player_a1_id = pa1.id
+                LEFT JOIN players pa2 ON m.player_a2_id = pa2.id
+                JOIN players pb1 ON m.player_b1_id = pb1.id
+                LEFT JOIN players pb2 ON m.player_b2_id = pb2.id
+                WHERE m.id = ? AND m.rated = 0 AND m.winner1_id IS NULL
+            ''', (field_item.data(Qt.UserRole),))
+            result = cursor.fetchone()
+            if result is None:  # Already scored
+                busy_fields.add(field_number)
+                continue
+            a1, a2, b1, b2 = result
+            courts[field_number] = ((a1, a2), (b1, b2)) if a2 else (a1, b1)
+            match_ids[field_number] = field_item.data(Qt.UserRole)
+
+        scheduler = self.court_scheduler
+        if scheduler:
+            bench = scheduler.waiting_players()
+            history = (scheduler.partners, scheduler.opponents, scheduler.games)
+        else:
+            bench = self.round_bench
+            history = load_pairing_history(assigned)
+        changes, bench = repair_round(courts, bench, player_elos, self.num_fields, self.round_match_type, arrivals,
+                                      departures, busy_fields, history)
+
+        date_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        closed_rows = []
+        for field_number, match in sorted(changes.items()):
+            if match is None:
+                cursor.execute('DELETE FROM matches WHERE id = ?', (match_ids[field_number],))
+                closed_rows.append(rows[field_number])
+                continue
+            (prediction,), _ = predict_round([match], player_elos)
+            if field_number in match_ids:
+                update_match_players(cursor, match_ids[field_number], match, prediction[0])
+                self.add_matchup_row(field_number, match, match_ids[field_number], prediction,
+                                     row_position=rows[field_number])
+            else:
+                match_id = insert_match(cursor, self.session_id, date_str, match, field_number, prediction[0])
+                self.add_matchup_row(field_number, match, match_id, prediction)
+        conn.commit()
         conn.close()
+        for row in sorted(closed_rows, reverse=True):
+            self.matchups_table.removeRow(row)
+        self.matchups_table.resizeColumnsToContents()
+
+        if scheduler:
+            scheduler.ratings.update(player_elos)
+            for name in departures:
+                scheduler.remove_player(name)
+            for field_number, match in changes.items():
+                if match is None:
+                    scheduler.courts.pop(field_number, None)
+                else:
+                    scheduler.start_court(field_number, match)
+            for name in bench:
+                if name not in scheduler.queued:
+                    scheduler.enqueue(name)
+        self.round_attendees = list(assigned)
+        self.round_bench = bench
+        self.round_ratings = player_elos
+
+        message = f"{len(changes)} court(s) updated, the others keep playing."
+        if bench:
+            message += "\n\nPlayers on the bench:\n• " + "\n• ".join(bench)
+        QMessageBox.information(self, 'Round Updated', message)
+
+    def update_elo_ratings(self, match_ids=None):
+        """Apply the rating update for scored matches that haven't been rated yet."""
+        if match_ids is None:
+            # Fetch all matches in this dialog's session, never whatever session happens to be newest
+            conn = connect_db()
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM matches WHERE session_id = ?', (self.session_id,))
+            match_ids = [match_id for (match_id,) in cursor.fetchall()]
+            conn.close()
+        rate_matches(match_ids)
     
     def refresh_assigned_players(self):
         """Refresh the assigned players list with updated ELO rankings."""
-        players = []
-        for i in range(self.assigned_list.count()):
-            item = self.assigned_list.item(i)
-            player_name = item.text().split(" (")[0]  # Extract player name
-            elo = self.assigned_list.get_player_elo_rating(player_name)
-            players.append((player_name, elo))
+        names = self.assigned_list.player_names()
+        if not names:
+            return
+        ratings = {name: rating for name, (rating, _) in get_effective_ratings(names).items()}
+
+        # Update the cached ratings and re-sort players by ELO in descending order
+        self.roster.update_ratings(ratings)
+
+
+class CalibrationDialog(QDialog):
+    """How well the predicted win probabilities matched the actual results."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Prediction Calibration')
+        self.setGeometry(150, 150, 560, 400)
+        self.setWindowIcon(QIcon("badminton_icon.png"))
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+        rows, brier_score, count = get_prediction_calibration()
+
+        if count:
+            summary = (f"{count} predicted matches. Brier score {brier_score:.3f} "
+                       f"(0.25 = coin flip, lower is better). "
+                       f"Expected margin: {fit_margin_model():.1f} points per unit of edge.")
+        else:
+            summary = "No scored matches with a prediction yet."
+        summary_label = QLabel(summary)
+        summary_label.setWordWrap(True)
+        layout.addWidget(summary_label)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(4)
+        self.table.setHorizontalHeaderLabels(['Predicted Win %', 'Matches', 'Mean Predicted', 'Actual Win Rate'])
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setRowCount(len(rows))
+        for row_idx, (low, high, matches, predicted, actual) in enumerate(rows):
+            self.table.setItem(row_idx, 0, QTableWidgetItem(f"{low * 100:.0f}-{high * 100:.0f}%"))
+            self.table.setItem(row_idx, 1, QTableWidgetItem(str(matches)))
+            self.table.setItem(row_idx, 2, QTableWidgetItem(f"{predicted * 100:.1f}%"))
+            self.table.setItem(row_idx, 3, QTableWidgetItem(f"{actual * 100:.1f}%"))
+        self.table.resizeColumnsToContents()
+        layout.addWidget(self.table)
+
+        self.setLayout(layout)
+
+
+class AnalyticsDialog(QDialog):
+    """Matchmaking quality per round and per strategy over time, from session_metrics."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Session Analytics')
+        self.setGeometry(150, 150, 900, 600)
+        self.setWindowIcon(QIcon("badminton_icon.png"))
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+        filter_layout = QHBoxLayout()
+        self.period_combo = QComboBox()
+        self.period_combo.addItems(list(ANALYTICS_PERIODS))
+        self.period_combo.setCurrentText('Last 90 days')
+        self.group_combo = QComboBox()
+        self.group_combo.addItems(list(ANALYTICS_GROUPS))
+        filter_layout.addWidget(QLabel('Period:'))
+        filter_layout.addWidget(self.period_combo)
+        filter_layout.addWidget(QLabel('Compare by:'))
+        filter_layout.addWidget(self.group_combo)
+        filter_layout.addStretch(1)
+        layout.addLayout(filter_layout)
+
+        layout.addWidget(QLabel('Strategies by month (gap: average Elo difference between the two sides of a court; '
+                                'edge: how far the predicted win chance is from 50%):'))
+        self.comparison_table = QTableWidget()
+        self.comparison_table.setColumnCount(10)
+        self.comparison_table.setHorizontalHeaderLabels(['Strategy', 'Month', 'Rounds', 'Mean Gap', 'Gap Change',
+                                                         'Mean Edge', 'Repeats / Court', 'Benched', 'Gen. ms',
+                                                         'Rank'])
+        self.comparison_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.comparison_table)
+
+        layout.addWidget(QLabel('Rounds (rolling gap: average of the pairing method\'s last 10 rounds):'))
+        self.sessions_table = QTableWidget()
+        self.sessions_table.setColumnCount(14)
+        self.sessions_table.setHorizontalHeaderLabels(['Date', 'Pairing Method', 'Match Type', 'Players', 'Courts',
+                                                       'Benched', 'Mean Gap', 'Max Gap', 'Mean Edge',
+                                                       'Repeat Partners', 'Repeat Opponents', 'Rules Relaxed',
+                                                       'Gen. ms', 'Rolling Gap'])
+        self.sessions_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.sessions_table)
+        self.setLayout(layout)
+
+        self.period_combo.currentTextChanged.connect(lambda _: self.load_metrics())
+        self.group_combo.currentTextChanged.connect(lambda _: self.load_metrics())
+        self.load_metrics()
+
+    @staticmethod
+    def cell_text(value):
+        if value is None:
+            return ''
+        if isinstance(value, float):
+            return f'{value:.2f}' if abs(value) < 1 else f'{value:.1f}'
+        return str(value)
+
+    def load_metrics(self):
+        since = analytics_since(self.period_combo.currentText())
+        for table, rows in ((self.comparison_table, compare_strategies(self.group_combo.currentText(), since)),
+                            (self.sessions_table, get_session_metrics(since))):
+            table.setRowCount(len(rows))
+            update_table_rows(table, [[self.cell_text(value) for value in row] for row in rows])
+            table.resizeColumnsToContents()
+
+
+class ConstraintsDialog(QDialog):
+    """Pairing rules the optimized search has to respect (hard) or should respect (soft)."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Pairing Rules')
+        self.setGeometry(150, 150, 640, 400)
+        self.setWindowIcon(QIcon("badminton_icon.png"))
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+        note = QLabel('Rules apply to the Optimized Search pairing method. Hard rules are only broken when no '
+                      'round satisfies them all; every rule a round breaks is reported when it is created.')
+        note.setWordWrap(True)
+        layout.addWidget(note)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(['Rule', 'Player', 'Other Player', 'Value', 'Type', 'Weight'])
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        button_layout = QHBoxLayout()
+        self.add_button = QPushButton('Add Rule')
+        self.add_button.clicked.connect(self.add_rule)
+        self.remove_button = QPushButton('Remove Selected Rule(s)')
+        self.remove_button.clicked.connect(self.remove_rules)
+        button_layout.addWidget(self.add_button)
+        button_layout.addWidget(self.remove_button)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+        self.load_rules()
+
+    def load_rules(self):
+        self.constraint_ids = []
+        rows = list_constraints()
+        self.table.setRowCount(len(rows))
+        for row, (constraint_id, kind, name, other, value, hard, weight) in enumerate(rows):
+            self.constraint_ids.append(constraint_id)
+            texts = [CONSTRAINT_KINDS.get(kind, kind), name or '', other or '', value or '',
+                     'Hard' if hard else 'Soft', '' if hard else f'{weight:g}']
+            for column, text in enumerate(texts):
+                self.table.setItem(row, column, QTableWidgetItem(text))
+        self.table.resizeColumnsToContents()
+
+    def add_rule(self):
+        dialog = AddConstraintDialog(self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        try:
+            add_constraint(*dialog.get_constraint())
+        except ValueError as e:
+            QMessageBox.warning(self, 'Input Error', str(e))
+            return
+        self.load_rules()
+
+    def remove_rules(self):
+        rows = {item.row() for item in self.table.selectedItems()}
+        if not rows:
+            QMessageBox.warning(self, 'Selection Error', 'Please select at least one rule to remove.')
+            return
+        remove_constraints([self.constraint_ids[row] for row in rows])
+        self.load_rules()
+
+
+class AddConstraintDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Add Pairing Rule')
+
+        layout = QFormLayout()
+        self.kind_combo = QComboBox()
+        for kind, label in CONSTRAINT_KINDS.items():
+            self.kind_combo.addItem(label, kind)
+        conn = connect_db()
+        cursor = conn.cursor()
+        cursor.execute('SELECT name FROM players WHERE active = 1 ORDER BY name COLLATE NOCASE')
+        names = [name for (name,) in cursor.fetchall()]
+        conn.close()
+        self.player_combo = QComboBox()
+        self.player_combo.addItems(names)
+        self.other_combo = QComboBox()
+        self.other_combo.addItems(names)
+        self.value_input = QLineEdit()
+        self.hard_check = QCheckBox('Hard rule (never broken unless impossible)')
+        self.hard_check.setChecked(True)
+        self.weight_spin = QSpinBox()
+        self.weight_spin.setRange(1, 10000)
+        self.weight_spin.setValue(int(DEFAULT_CONSTRAINT_WEIGHT))
+
+        layout.addRow('Rule:', self.kind_combo)
+        layout.addRow('Player:', self.player_combo)
+        layout.addRow('Other Player:', self.other_combo)
+        layout.addRow('Value:', self.value_input)
+        layout.addRow('', self.hard_check)
+        layout.addRow('Weight (soft rules):', self.weight_spin)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
 
-        # Sort players by ELO in descending order
-        players.sort(key=lambda x: x[1], reverse=True)
+        self.kind_combo.currentIndexChanged.connect(self.update_fields)
+        self.hard_check.toggled.connect(self.update_fields)
+        self.update_fields()
+
+    def update_fields(self):
+        kind = self.kind_combo.currentData()
+        self.player_combo.setEnabled(kind != 'mixed')
+        self.other_combo.setEnabled(kind in PAIR_CONSTRAINTS)
+        self.value_input.setEnabled(kind in ('courts', 'band'))
+        self.value_input.setPlaceholderText({'courts': 'Field numbers, e.g. 1,2',
+                                             'band': 'Rating points, e.g. 300'}.get(kind, ''))
+        self.weight_spin.setEnabled(not self.hard_check.isChecked())
+
+    def get_constraint(self):
+        kind = self.kind_combo.currentData()
+        return (kind,
+                self.player_combo.currentText() if kind != 'mixed' else None,
+                self.other_combo.currentText() if kind in PAIR_CONSTRAINTS else None,
+                self.value_input.text().strip() or None,
+                self.hard_check.isChecked(),
+                None if self.hard_check.isChecked() else float(self.weight_spin.value()))
+
+
+class TournamentDialog(QDialog):
+    """Run tournaments: standings, and the scores of the games still to play."""
+
+    def __init__(self, parent=None, players=(), player_elos=None):
+        super().__init__(parent)
+        self.setWindowTitle(f'Tournaments - {current_league}')
+        self.setGeometry(150, 150, 800, 700)
+        self.setWindowIcon(QIcon("badminton_icon.png"))
+        self.players = list(players)  # Assigned players, offered as the entrants of a new tournament
+        self.player_elos = player_elos or {}
+        self.num_fields = getattr(parent, 'num_fields', 4)
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+
+        top_layout = QHBoxLayout()
+        self.tournament_combo = QComboBox()
+        self.tournament_combo.currentIndexChanged.connect(lambda _: self.load_tournament())
+        self.new_button = QPushButton('New Tournament')
+        self.new_button.clicked.connect(self.new_tournament)
+        top_layout.addWidget(self.tournament_combo, 1)
+        top_layout.addWidget(self.new_button)
+        layout.addLayout(top_layout)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.standings_table = QTableWidget()
+        self.standings_table.setColumnCount(9)
+        self.standings_table.setHorizontalHeaderLabels(['Rank', 'Entrant', 'Seed Rating', 'Played', 'Won', 'Drawn',
+                                                        'Lost', 'Points', 'Buchholz'])
+        self.standings_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.standings_table)
+
+        layout.addWidget(QLabel('Games to play (leave a score blank if the game is still on):'))
+        self.games_table = QTableWidget()
+        self.games_table.setColumnCount(6)
+        self.games_table.setHorizontalHeaderLabels(['Round', 'Field Number', 'Side A', 'Side B', 'Score A', 'Score B'])
+        self.games_table.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.SelectedClicked)
+        layout.addWidget(self.games_table)
+
+        self.submit_button = QPushButton('Submit Scores')
+        self.submit_button.clicked.connect(self.submit_scores)
+        layout.addWidget(self.submit_button)
+        self.setLayout(layout)
+        self.load_tournaments()
+
+    def load_tournaments(self, select_id=None):
+        self.tournament_combo.blockSignals(True)
+        self.tournament_combo.clear()
+        for tournament_id, name, tournament_format, finished_at in list_tournaments():
+            self.tournament_combo.addItem(f"{name} ({tournament_format}{', finished' if finished_at else ''})",
+                                          tournament_id)
+        if select_id is not None:
+            self.tournament_combo.setCurrentIndex(self.tournament_combo.findData(select_id))
+        self.tournament_combo.blockSignals(False)
+        self.load_tournament()
+
+    def load_tournament(self):
+        tournament_id = self.tournament_combo.currentData()
+        self.standings_table.setRowCount(0)
+        self.games_table.setRowCount(0)
+        self.submit_button.setEnabled(tournament_id is not None)
+        if tournament_id is None:
+            self.status_label.setText('No tournaments yet.')
+            return
+        standings, champion = tournament_standings(tournament_id)
+        self.standings_table.setRowCount(len(standings))
+        for row, (name, rating, played, wins, draws, losses, points, buchholz) in enumerate(standings):
+            texts = [str(row + 1), name, str(int(rating)), str(played), str(wins), str(draws), str(losses),
+                     f'{points:g}', f'{buchholz:g}']
+            for column, text in enumerate(texts):
+                self.standings_table.setItem(row, column, QTableWidgetItem(text))
+        self.standings_table.resizeColumnsToContents()
+
+        games = pending_tournament_matches(tournament_id)
+        self.games_table.setRowCount(len(games))
+        for row, (match_id, round_number, field_number, side_a, side_b) in enumerate(games):
+            round_item = QTableWidgetItem(str(round_number))
+            round_item.setData(Qt.UserRole, match_id)
+            for column, item in enumerate((round_item, QTableWidgetItem(str(field_number)),
+                                           QTableWidgetItem(side_a), QTableWidgetItem(side_b))):
+                item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)  # Read-only
+                self.games_table.setItem(row, column, item)
+            self.games_table.setItem(row, 4, QTableWidgetItem(""))  # Score A
+            self.games_table.setItem(row, 5, QTableWidgetItem(""))  # Score B
+        self.games_table.resizeColumnsToContents()
+        if champion:
+            self.status_label.setText(f'Finished. Winner: {champion}')
+        else:
+            self.status_label.setText(f'{len(games)} game(s) to play.')
+
+    def new_tournament(self):
+        dialog = NewTournamentDialog(self, self.players, self.player_elos, self.num_fields)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            tournament_id = create_tournament(*dialog.get_tournament())
+        except ValueError as e:
+            QMessageBox.warning(self, 'Input Error', str(e))
+            return
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            QMessageBox.critical(self, 'Database Error', f"An error occurred while creating the tournament: {e}")
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.load_tournaments(tournament_id)
+
+    def submit_scores(self):
+        scores = {}
+        for row in range(self.games_table.rowCount()):
+            score_a = self.games_table.item(row, 4).text().strip()
+            score_b = self.games_table.item(row, 5).text().strip()
+            if not score_a and not score_b:
+                continue  # Still being played
+            if not score_a.isdigit() or not score_b.isdigit():
+                QMessageBox.warning(self, 'Input Error',
+                                    f'Please enter valid scores for {self.games_table.item(row, 2).text()} v '
+                                    f'{self.games_table.item(row, 3).text()}.')
+                return
+            scores[self.games_table.item(row, 0).data(Qt.UserRole)] = (int(score_a), int(score_b))
+        if not scores:
+            QMessageBox.warning(self, 'Input Error', 'Enter the score of at least one game.')
+            return
+        try:
+            summary = record_tournament_results(self.tournament_combo.currentData(), scores)
+        except ValueError as e:
+            QMessageBox.warning(self, 'Input Error', str(e))
+            return
+        self.load_tournaments(self.tournament_combo.currentData())
+        if summary['matches'] or summary['byes']:
+            message = f"{summary['matches']} new game(s) scheduled"
+            if summary['byes']:
+                message += f", {summary['byes']} bye(s)"
+            if summary['rematches']:
+                message += f". No pairing avoids every rematch: {summary['rematches']} game(s) are repeats"
+            QMessageBox.information(self, 'Next Round', message + '.')
+
+
+class NewTournamentDialog(QDialog):
+    def __init__(self, parent=None, players=(), player_elos=None, num_fields=4):
+        super().__init__(parent)
+        self.setWindowTitle('New Tournament')
+        self.players = list(players)
+        self.player_elos = player_elos or {}
+
+        layout = QFormLayout()
+        self.name_input = QLineEdit(f"Tournament {datetime.now().strftime('%Y-%m-%d')}")
+        self.format_combo = QComboBox()
+        self.format_combo.addItems(TOURNAMENT_FORMATS)
+        self.match_type_combo = QComboBox()
+        self.match_type_combo.addItems(['Singles', 'Doubles'])
+        self.fields_spin = QSpinBox()
+        self.fields_spin.setRange(1, 50)
+        self.fields_spin.setValue(num_fields)
+        self.rounds_spin = QSpinBox()
+        self.rounds_spin.setRange(0, 50)
+        self.rounds_spin.setSpecialValueText('Automatic')
+        # One entrant per line; doubles teams are "Player & Partner"
+        self.entrants_input = QPlainTextEdit()
+
+        layout.addRow('Name:', self.name_input)
+        layout.addRow('Format:', self.format_combo)
+        layout.addRow('Match Type:', self.match_type_combo)
+        layout.addRow('Number of Fields:', self.fields_spin)
+        layout.addRow('Swiss Rounds:', self.rounds_spin)
+        layout.addRow('Entrants (one per line, teams as "A & B"):', self.entrants_input)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+        self.format_combo.currentTextChanged.connect(lambda text: self.rounds_spin.setEnabled(text == 'Swiss'))
+        self.match_type_combo.currentTextChanged.connect(lambda _: self.fill_entrants())
+        self.rounds_spin.setEnabled(False)
+        self.fill_entrants()
+
+    def fill_entrants(self):
+        """Offer the assigned players, formed into balanced teams for doubles."""
+        if self.match_type_combo.currentText() == 'Doubles':
+            entrants = [entrant_name(team) for team in balanced_teams(self.players, self.player_elos)]
+        else:
+            entrants = self.players
+        self.entrants_input.setPlainText('\n'.join(entrants))
+
+    def get_tournament(self):
+        entrants = []
+        for line in self.entrants_input.toPlainText().splitlines():
+            names = [name.strip() for name in line.split('&') if name.strip()]
+            if names:
+                entrants.append(tuple(names) if len(names) > 1 else names[0])
+        return (self.name_input.text(), self.format_combo.currentText(), entrants, self.fields_spin.value(),
+                self.rounds_spin.value() or None)
+
+
+# Live views: windows subscribe to database_watcher() instead of reloading on a timer of their own
+WATCH_INTERVAL_MS = 250  # A committed change reaches every open view within this
+
+
+class DatabaseWatcher(QObject):
+    """Emits `changed` when any connection has committed to the current database.
+
+    Polls PRAGMA data_version on one long-lived connection, which costs next
+    to nothing. Switching league or entering/leaving the sandbox counts as a change.
+    """
+
+    changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.conn = None
+        self.source = None  # (DATABASE, sandbox_anchor) the connection was opened for
+        self.version = None
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(WATCH_INTERVAL_MS)
+
+    def poll(self):
+        source = (DATABASE, sandbox_anchor)
+        if source != self.source:
+            if self.conn is not None:
+                self.conn.close()  # Must not keep a discarded sandbox alive
+            first = self.source is None
+            self.conn, self.source, self.version = connect_db(), source, None
+            if not first:
+                self.changed.emit()
+        try:
+            version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Database watcher: {e}")
+            self.source = None
+            return
+        if self.version is not None and version != self.version:
+            self.changed.emit()
+        self.version = version
+
+
+database_watcher_instance = None
+
+def database_watcher():
+    """The application's DatabaseWatcher, started on first use."""
+    global database_watcher_instance
+    if database_watcher_instance is None:
+        database_watcher_instance = DatabaseWatcher(QApplication.instance())
+    return database_watcher_instance
+
+def update_table_rows(table, rows, start_row=0):
+    """Show rows of strings from start_row on, only touching the cells whose text changed."""
+    for row_idx, row in enumerate(rows, start=start_row):
+        for col_idx, text in enumerate(row):
+            item = table.item(row_idx, col_idx)
+            if item is None:
+                table.setItem(row_idx, col_idx, QTableWidgetItem(text))
+            elif item.text() != text:
+                item.setText(text)
+
+
+class RatingChart(QWidget):
+    """A player's rating over time, painted directly. Long series are downsampled to about one point per pixel."""
+
+    MARGIN_LEFT = 48  # Room for the rating labels
+    MARGIN_BOTTOM = 24  # Room for the date labels
+    MARGIN = 12
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumSize(400, 250)
+        self.set_history([])
+
+    def set_history(self, history):
+        self.points = []  # (stored match date in seconds, rating)
+        self.first_date = self.last_date = None
+        self.min_rating = self.max_rating = None
+        self.add_history(history)
+
+    def add_history(self, history):
+        """Append rows from get_rating_history; only the downsampled series is rebuilt."""
+        for _, match_date, rating in history:
+            self.points.append((match_date, rating))
+            self.min_rating = rating if self.min_rating is None else min(self.min_rating, rating)
+            self.max_rating = rating if self.max_rating is None else max(self.max_rating, rating)
+        if history:
+            self.first_date = history[0][1] if self.first_date is None else self.first_date
+            self.last_date = history[-1][1]
+        self.sampled = None
+        self.update()
+
+    def resizeEvent(self, event):
+        self.sampled = None
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), Qt.white)
+        plot = QRectF(self.MARGIN_LEFT, self.MARGIN, self.width() - self.MARGIN_LEFT - self.MARGIN,
+                      self.height() - self.MARGIN - self.MARGIN_BOTTOM)
+        painter.setPen(QColor(180, 180, 180))
+        painter.drawRect(plot)
+        if not self.points:
+            painter.drawText(plot, Qt.AlignCenter, 'No rated matches yet')
+            return
+
+        if self.sampled is None:
+            self.sampled = downsample_lttb(self.points, max(int(plot.width()), 3))
+        start, span_x = self.points[0][0], (self.points[-1][0] - self.points[0][0]) or 1
+        span_y = (self.max_rating - self.min_rating) or 1
+        polygon = QPolygonF([QPointF(plot.left() + (x - start) / span_x * plot.width(),
+                                     plot.bottom() - (y - self.min_rating) / span_y * plot.height())
+                             for x, y in self.sampled])
+        painter.setPen(QPen(QColor(30, 110, 200), 1.5))
+        if len(polygon) == 1:
+            painter.drawEllipse(polygon[0], 3, 3)
+        else:
+            painter.drawPolyline(polygon)
+
+        painter.setPen(Qt.black)
+        label_width = self.MARGIN_LEFT - 6
+        painter.drawText(QRectF(0, plot.top() - 8, label_width, 16), Qt.AlignRight | Qt.AlignVCenter,
+                         str(int(self.max_rating)))
+        painter.drawText(QRectF(0, plot.bottom() - 8, label_width, 16), Qt.AlignRight | Qt.AlignVCenter,
+                         str(int(self.min_rating)))
+        dates = QRectF(plot.left(), plot.bottom() + 4, plot.width(), self.MARGIN_BOTTOM - 4)
+        painter.drawText(dates, Qt.AlignLeft | Qt.AlignTop, format_epoch(self.first_date)[:10])
+        painter.drawText(dates, Qt.AlignRight | Qt.AlignTop, format_epoch(self.last_date)[:10])
+
+
+class RatingHistoryWindow(QDialog):
+    """Rating timeline of a player, topped up with new results while it is open."""
+
+    def __init__(self, player_name=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Rating History')
+        self.setGeometry(200, 200, 640, 400)
+        self.setWindowIcon(QIcon("badminton_icon.png"))
+        self.setWindowFlags(self.windowFlags() | Qt.Window)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.player_id = None
+        self.last_id = 0
+        self.initUI(player_name)
 
-        # Clear and repopulate the assigned list
-        self.assigned_list.clear()
-        for player_name, elo in players:
-            self.assigned_list.addItem(f"{player_name} ({int(elo)})")
+        # Only the last row shown and newer ones are read, through the covering (player_id, id, ...) index
+        database_watcher().changed.connect(self.load_new_results)
+
+    def initUI(self, player_name):
+        layout = QVBoxLayout()
+        player_layout = QHBoxLayout()
+        self.player_combo = QComboBox()
+        conn = connect_db()
+        cursor = conn.cursor()
+        cursor.execute('SELECT name FROM players ORDER BY name COLLATE NOCASE')
+        self.player_combo.addItems([name for name, in cursor.fetchall()])
+        conn.close()
+        if player_name:
+            self.player_combo.setCurrentText(player_name)
+        self.player_combo.currentTextChanged.connect(self.load_player)
+        player_layout.addWidget(QLabel('Player:'))
+        player_layout.addWidget(self.player_combo, 1)
+        layout.addLayout(player_layout)
+
+        self.chart = RatingChart()
+        layout.addWidget(self.chart, 1)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        self.setLayout(layout)
+        self.load_player(self.player_combo.currentText())
+
+    def load_player(self, name):
+        self.player_id = get_player_id(name) if name else None
+        history = get_rating_history(self.player_id) if self.player_id else []
+        self.last_id = history[-1][0] if history else 0
+        self.chart.set_history(history)
+        self.update_summary()
+
+    def load_new_results(self):
+        if self.player_id is None:
+            return
+        history = get_rating_history(self.player_id, self.last_id)
+        if self.last_id and (not history or history[0][0] != self.last_id):
+            self.load_player(self.player_combo.currentText())  # Re-rated from an earlier date by a merge or import
+            return
+        history = [row for row in history if row[0] != self.last_id]
+        if history:
+            self.last_id = history[-1][0]
+            self.chart.add_history(history)
+            self.update_summary()
+
+    def update_summary(self):
+        if not self.chart.points:
+            self.summary_label.setText('')
+            return
+        self.summary_label.setText(f"{len(self.chart.points)} rated matches, peak {int(self.chart.max_rating)}, "
+                                   f"current {int(self.chart.points[-1][1])}")
+
+
+def benchmark_rating_chart(num_matches=5000, runs=20, target_ms=50):
+    """Time reading, downsampling and painting the chart of a player with num_matches rated matches."""
+    import tempfile
+    global DATABASE
+    # Held on purpose: PyQt deletes a QApplication as soon as nothing references it
+    app = QApplication.instance() or QApplication(sys.argv)
+    rng = random.Random(1)
+    saved_database = DATABASE
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            DATABASE = os.path.join(temp_dir, 'benchmark.db')
+            init_db()
+            conn = connect_db()
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO players (name) VALUES ('Benchmark Player')")
+            player_id = cursor.lastrowid
+            rating, rows = 1500.0, []
+            for index in range(num_matches):
+                rating += rng.gauss(0, 12)
+                rows.append((player_id, to_epoch(datetime(2015, 1, 1) + (datetime.now() - datetime(2015, 1, 1)) * index
+                                                 / num_matches), rating))
+            cursor.executemany('INSERT INTO rating_history (player_id, match_date, elo_after) VALUES (?, ?, ?)', rows)
+            conn.commit()
+            conn.close()
+
+            chart = RatingChart()
+            chart.resize(640, 320)
+            timings = []
+            for _ in range(runs):
+                app.processEvents()  # Keep the previous run's pending events out of the timing
+                start = time.perf_counter()
+                chart.set_history(get_rating_history(player_id))
+                chart.grab()
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            DATABASE = saved_database
+    timings.sort()
+    median = timings[len(timings) // 2]
+    print(f"Rating chart of {num_matches} matches: median {median:.1f} ms, worst {timings[-1]:.1f} ms "
+          f"({len(chart.sampled)} points drawn, target {target_ms} ms)")
+    return median
 
 
 class LeaderboardWindow(QDialog):
@@ -1214,35 +6275,119 @@ class LeaderboardWindow(QDialog):
     def initUI(self):
         layout = QVBoxLayout()
 
+        # The live standings, or the final standings of an archived season
+        season_layout = QHBoxLayout()
+        self.season_combo = QComboBox()
+        self.season_combo.currentIndexChanged.connect(lambda _: self.load_leaderboard())
+        self.close_season_button = QPushButton('Close Season')
+        self.close_season_button.clicked.connect(self.close_season)
+        season_layout.addWidget(QLabel('Season:'))
+        season_layout.addWidget(self.season_combo, 1)
+        season_layout.addWidget(self.close_season_button)
+        layout.addLayout(season_layout)
+
         self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(['Name', 'Elo Rating', 'Matchs Played', 'Win Rate'])
-        self.load_leaderboard()
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.cellDoubleClicked.connect(lambda row, _: self.open_rating_history())
+        self.load_seasons()
         layout.addWidget(self.table)
+        database_watcher().changed.connect(self.refresh)
+
+        self.history_button = QPushButton('Rating History')
+        self.history_button.clicked.connect(self.open_rating_history)
+        layout.addWidget(self.history_button)
 
         # Add export button
         self.export_button = QPushButton('Export Leaderboard')
         self.export_button.clicked.connect(self.export_leaderboard)
         layout.addWidget(self.export_button)
 
+        # Refit individual skill ratings from the whole match history
+        self.refit_button = QPushButton('Refit Skill Ratings')
+        self.refit_button.clicked.connect(self.refit_skill_ratings)
+        layout.addWidget(self.refit_button)
+
         self.setLayout(layout)
         self.table.resizeColumnsToContents()
     
+    def showEvent(self, event):
+        self.load_leaderboard()  # Catch up on changes made while hidden
+        super().showEvent(event)
+
+    def refresh(self):
+        if self.isVisible() and self.season_combo.currentData() is None:
+            self.load_leaderboard()
+
+    def load_seasons(self):
+        self.season_combo.blockSignals(True)
+        self.season_combo.clear()
+        self.season_combo.addItem('Current', None)
+        for season_id, name, start_date, end_date, matches in get_seasons():
+            self.season_combo.addItem(f'{name} ({matches} matches, until {end_date})', season_id)
+        self.season_combo.blockSignals(False)
+        self.load_leaderboard()
+
     def load_leaderboard(self):
+        season_id = self.season_combo.currentData()
+        if season_id is not None:
+            self.load_season_stats(season_id)
+            return
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(['Name', 'Elo Rating', 'Matchs Played', 'Win Rate', 'Skill Fit', 'Status'])
         performance_data = get_performance_data()
         self.table.setRowCount(len(performance_data))
-        for row_idx, (name, elo, MatchesPlayed, WinRate) in enumerate(performance_data):
-            self.table.setItem(row_idx, 0, QTableWidgetItem(name))
-            self.table.setItem(row_idx, 1, QTableWidgetItem(str(int(elo))))
-            self.table.setItem(row_idx, 2, QTableWidgetItem(str(MatchesPlayed)))
-            self.table.setItem(row_idx, 3, QTableWidgetItem(WinRate))
+        # Refreshed in place: only the ranks and ratings that moved are repainted
+        update_table_rows(self.table, [(name, str(int(elo)), str(MatchesPlayed), WinRate, SkillFit, Status)
+                                       for name, elo, MatchesPlayed, WinRate, SkillFit, Status in performance_data])
+
+    def load_season_stats(self, season_id):
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(['Name', 'Final Rating', 'Matches', 'Wins', 'Losses', 'Draws'])
+        stats = get_season_stats(season_id)
+        self.table.setRowCount(len(stats))
+        update_table_rows(self.table, [(name, str(int(final_rating)), str(matches), str(wins), str(losses), str(draws))
+                                       for name, final_rating, matches, wins, losses, draws in stats])
+
+    def open_rating_history(self):
+        item = self.table.item(self.table.currentRow(), 0)
+        # Stays open next to the leaderboard and keeps itself up to date
+        RatingHistoryWindow(item.text() if item else None, self).show()
+
+    def close_season(self):
+        name, ok = QInputDialog.getText(self, 'Close Season', 'Season name:')
+        if not ok or not name.strip():
+            return
+        end_date, ok = QInputDialog.getText(self, 'Close Season', 'Archive sessions before (YYYY-MM-DD):',
+                                            text=datetime.now().strftime('%Y-%m-%d'))
+        if not ok:
+            return
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            num_matches = close_season(name.strip(), end_date.strip())
+        except (OSError, ValueError, sqlite3.Error) as e:
+            QApplication.restoreOverrideCursor()
+            QMessageBox.warning(self, 'Error', f'Could not close the season: {e}')
+            return
+        QApplication.restoreOverrideCursor()
+        self.load_seasons()
+        QMessageBox.information(self, 'Success', f'Season {name.strip()} closed: {num_matches} matches archived.')
+
+    def refit_skill_ratings(self):
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            num_matches = fit_skill_ratings()
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.load_leaderboard()
+        QMessageBox.information(self, 'Success', f'Skill ratings refitted from {num_matches} matches.')
 
     def export_leaderboard(self):
         file_path, _ = QFileDialog.getSaveFileName(self, 'Save File', '', 'CSV(*.csv)')
         if file_path:
             with open(file_path, 'w', newline='') as file:
                 writer = csv.writer(file)
-                writer.writerow(['Name', 'Elo Rating', 'Matchs Played', 'Win Rate'])
+                writer.writerow([self.table.horizontalHeaderItem(col_idx).text()
+                                 for col_idx in range(self.table.columnCount())])
                 for row_idx in range(self.table.rowCount()):
                     row_data = []
                     for col_idx in range(self.table.columnCount()):
@@ -1270,25 +6415,100 @@ class MatchHistoryWindow(QDialog):
             'Date', 'Team A', 'Team B',
             'Score A', 'Score B', 'Winner', 'Match Type', 'Field Number'
         ])
-        self.load_match_history()
         layout.addWidget(self.table)
 
+        # Archived seasons are only read when asked for
+        options_layout = QHBoxLayout()
+        self.include_archive_check = QCheckBox('Include archived seasons')
+        self.include_archive_check.toggled.connect(lambda _: self.load_match_history())
+        self.export_button = QPushButton('Export Match History')
+        self.export_button.clicked.connect(self.export_match_history)
+        self.import_button = QPushButton('Import Match History')
+        self.import_button.clicked.connect(self.import_match_history)
+        options_layout.addWidget(self.include_archive_check)
+        options_layout.addWidget(self.export_button)
+        options_layout.addWidget(self.import_button)
+        layout.addLayout(options_layout)
+        self.load_match_history()
+        database_watcher().changed.connect(self.refresh)
+
         self.setLayout(layout)
         self.table.resizeColumnsToContents()
-    
+
+    def export_match_history(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, 'Save File', '', 'CSV(*.csv)')
+        if file_path:
+            with open(file_path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['Date', 'Team A', 'Team B', 'Score A', 'Score B', 'Winner', 'Match Type',
+                                 'Field Number'])
+                writer.writerows((format_epoch(match[0]),) + match[1:6] + (match_type_name(match[6]), match[7])
+                                 for match in get_match_history(self.include_archive_check.isChecked()))
+            QMessageBox.information(self, 'Success', 'Match history exported successfully.')
+
+    def import_match_history(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, 'Import Match History', '',
+                                                   'Match files (*.csv *.jsonl *.ndjson)')
+        if not file_path:
+            return
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            summary = import_match_history(file_path)
+        except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+            QApplication.restoreOverrideCursor()
+            QMessageBox.critical(self, 'Error', f'An error occurred while importing the match history: {str(e)}')
+            return
+        QApplication.restoreOverrideCursor()
+        message = (f"Imported {summary['matches']} match(es) in {summary['sessions']} session(s), added "
+                   f"{summary['players']} player(s) and re-rated {summary['replayed']} match(es).")
+        if summary['skipped']:
+            message += f"\n\nSkipped {summary['skipped']} row(s):\n" + '\n'.join(summary['errors'])
+        QMessageBox.information(self, 'Success', message)
+        self.load_match_history()
+
+    def showEvent(self, event):
+        self.apply_changes()  # Catch up on changes made while hidden
+        super().showEvent(event)
+
+    def refresh(self):
+        if self.isVisible():
+            self.apply_changes()
+
+    @staticmethod
+    def history_texts(match):
+        date, team_a, team_b, score_a, score_b, winners, match_type, field_number = match[:8]
+        return (format_epoch(date), team_a, team_b, str(score_a), str(score_b), winners if winners else 'N/A',
+                match_type_name(match_type) or '', str(field_number) if field_number else 'N/A')
+
     def load_match_history(self):
-        matches = get_match_history()
+        # Read first, so that changes made during the reload are applied again rather than missed
+        self.version, self.num_matches, _ = get_match_history_changes(sys.maxsize)
+        self.database = DATABASE
+        matches = get_match_history(self.include_archive_check.isChecked())
+        self.match_keys = [(match[0], match[8]) for match in matches]  # (date, match id) of each row, newest first
         self.table.setRowCount(len(matches))
-        for row_idx, match in enumerate(matches):
-            date, teamA, teamB, ScoreA, ScoreB, Winners, MatchType, FieldNumber = match[:8]  # Adjust this line based on the actual number of values returned
-            self.table.setItem(row_idx, 0, QTableWidgetItem(date))
-            self.table.setItem(row_idx, 1, QTableWidgetItem(teamA))
-            self.table.setItem(row_idx, 2, QTableWidgetItem(teamB))
-            self.table.setItem(row_idx, 3, QTableWidgetItem(str(ScoreA)))
-            self.table.setItem(row_idx, 4, QTableWidgetItem(str(ScoreB)))
-            self.table.setItem(row_idx, 5, QTableWidgetItem(Winners if Winners else "N/A"))
-            self.table.setItem(row_idx, 6, QTableWidgetItem(MatchType))
-            self.table.setItem(row_idx, 7, QTableWidgetItem(str(FieldNumber) if FieldNumber else 'N/A'))
+        update_table_rows(self.table, [self.history_texts(match) for match in matches])
+
+    def apply_changes(self):
+        """Insert new matches and update rescored ones in place; reload when matches went away or the file changed."""
+        version, num_matches, changes = get_match_history_changes(self.version)
+        shown = {match_id for _, match_id in self.match_keys}
+        new_matches = [match for match in changes if match[8] not in shown]
+        if (DATABASE != self.database or version < self.version or  # Other league, sandbox or restored backup
+                num_matches != self.num_matches + len(new_matches)):  # Deleted or archived since the last load
+            self.load_match_history()
+            return
+        for match in reversed(changes):  # Oldest first, so the newest ends up on top
+            key = (match[0], match[8])
+            if match[8] in shown:
+                row_idx = self.match_keys.index(key)
+            else:
+                row_idx = next((idx for idx, shown_key in enumerate(self.match_keys) if shown_key < key),
+                               len(self.match_keys))
+                self.table.insertRow(row_idx)
+                self.match_keys.insert(row_idx, key)
+            update_table_rows(self.table, [self.history_texts(match)], row_idx)
+        self.version, self.num_matches = version, num_matches
 
 
 
@@ -1323,7 +6543,7 @@ class TutorialWindow(QDialog):
     QMainWindow {
         background-color: #F0F0F0;
     }
-    QListWidget {
+    QListView {
         background-color: #fff;
         border: 1px solid #ddd;
     }
@@ -1434,6 +6654,14 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.schedule_session_dialog = None
+        # Live views: created once, then shown again instead of being rebuilt
+        self.leaderboard_window = None
+        self.match_history_window = None
+        # Scheduled online backups; the copy runs in small steps so it doesn't stall the UI
+        self.backup_timer = QTimer(self)
+        self.backup_timer.setInterval(BACKUP_INTERVAL_MINUTES * 60 * 1000)
+        self.backup_timer.timeout.connect(self.scheduled_backup)
+        self.backup_timer.start()
         self.initUI()
         
         
@@ -1467,7 +6695,7 @@ class MainWindow(QMainWindow):
     QMainWindow {
         background-color: #F0F0F0;
     }
-    QListWidget {
+    QListView {
         background-color: #fff;
         border: 1px solid #ddd;
     }
@@ -1478,17 +6706,37 @@ class MainWindow(QMainWindow):
         
         
 
+    def scheduled_backup(self):
+        try:
+            backup_database()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Scheduled backup failed: {e}")
+
     def open_manage_players(self):
         manage_players_dialog = ManagePlayersDialog(self)
         manage_players_dialog.exec_()
 
     def open_leaderboard(self):
-        leaderboard_window = LeaderboardWindow(self)
-        leaderboard_window.exec_()
+        # Non-modal and top-level, so it can stay open on a second screen while sessions run
+        if self.leaderboard_window is None:
+            self.leaderboard_window = LeaderboardWindow()
+        self.show_live_view(self.leaderboard_window)
 
     def open_match_history(self):
-        match_history_window = MatchHistoryWindow(self)
-        match_history_window.exec_()
+        if self.match_history_window is None:
+            self.match_history_window = MatchHistoryWindow()
+        self.show_live_view(self.match_history_window)
+
+    def show_live_view(self, window):
+        window.show()
+        window.raise_()
+        window.activateWindow()
+
+    def closeEvent(self, event):
+        for window in (self.leaderboard_window, self.match_history_window):
+            if window is not None:
+                window.close()
+        super().closeEvent(event)
 
     def open_create_matchup(self):
         if not self.schedule_session_dialog:
@@ -1499,10 +6747,213 @@ class MainWindow(QMainWindow):
         self.tutorial_window = TutorialWindow()
         self.tutorial_window.exec_()
   
+class FirstPaintProbe(QObject):
+    """Records when the matchup dialog first paints, then closes it (used by --benchmark-startup)."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and isinstance(obj, ScheduleSessionDialog):
+            with open(self.path, 'w') as file:
+                file.write(repr(time.time()))
+            QApplication.instance().removeEventFilter(self)
+            QTimer.singleShot(0, obj.reject)
+        return False
+
+def benchmark_startup(runs=5, target=1.0):
+    """Launch the app `runs` times and report the time from process start to the first paint."""
+    import subprocess
+    import tempfile
+    if getattr(sys, 'frozen', False):
+        command = [sys.executable]  # The packaged build
+    else:
+        command = [sys.executable, os.path.abspath(__file__)]
+
+    timings = []
+    for run in range(runs):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            marker = os.path.join(temp_dir, 'first_paint')
+            start = time.time()
+            subprocess.run(command + ['--startup-probe', marker], check=True, timeout=120)
+            with open(marker) as file:
+                timings.append(float(file.read()) - start)
+        print(f"Run {run + 1}: {timings[-1]:.3f}s{' (cold)' if run == 0 else ''}")
+
+    warm = sorted(timings[1:] or timings)
+    median = warm[len(warm) // 2]
+    print(f"Median warm start {median:.3f}s, best {warm[0]:.3f}s, cold {timings[0]:.3f}s "
+          f"({'within' if median < target else 'over'} the {target:.1f}s target)")
+    return timings
+
 # Main Execution
 if __name__ == "__main__":
-    init_db()
+    multiprocessing.freeze_support()  # Required for the process pool in the packaged exe
+
+    parser = argparse.ArgumentParser(description='Badminton matchup generator')
+    parser.add_argument('--benchmark-search', action='store_true',
+                        help='benchmark the optimized pairing search and exit')
+    parser.add_argument('--benchmark-constraints', action='store_true',
+                        help='time the constrained pairing search for 150 attendees and 30 constraints and exit')
+    parser.add_argument('--benchmark-analytics', type=int, nargs='?', const=20000, metavar='ROUNDS',
+                        help='time the session analytics queries over ROUNDS synthetic rounds (default 20k) and exit')
+    parser.add_argument('--fit-skills', action='store_true',
+                        help='refit individual skill ratings from the match history and exit')
+    parser.add_argument('--benchmark-skills', action='store_true',
+                        help='time the skill fit on a synthetic 5k player / 500k match league and exit')
+    parser.add_argument('--simulate', type=int, metavar='SEASONS',
+                        help='simulate SEASONS synthetic seasons seeded from the players table and exit')
+    parser.add_argument('--k-new', type=float, default=40, help='K-factor for new players in --simulate')
+    parser.add_argument('--k-established', type=float, default=20,
+                        help='K-factor for established players in --simulate')
+    parser.add_argument('--replay-session', type=int, metavar='ID',
+                        help='regenerate a historical round from its seed and compare it with the stored one')
+    parser.add_argument('--league', help='league to open (created if it does not exist yet)')
+    parser.add_argument('--list-leagues', action='store_true', help='list the available leagues and exit')
+    parser.add_argument('--find-player', metavar='NAME', help='look a player up in every league and exit')
+    parser.add_argument('--export-changes', metavar='FILE',
+                        help='write the changes since the last export to a changeset file and exit')
+    parser.add_argument('--since', type=int, default=None,
+                        help='watermark for --export-changes (0 exports everything)')
+    parser.add_argument('--import-changes', metavar='FILE', help='merge a changeset file and exit')
+    parser.add_argument('--import-matches', metavar='FILE',
+                        help='import dated results from a CSV or JSONL file, re-rate them and exit')
+    parser.add_argument('--benchmark-import', type=int, nargs='?', const=1000000, metavar='MATCHES',
+                        help='time a synthetic match import (default 1M matches) in a scratch database and exit')
+    parser.add_argument('--benchmark-storage', type=int, nargs='?', const=200000, metavar='MATCHES',
+                        help='compare DB size and query times of a synthetic league (default 200k matches) '
+                             'before and after the storage upgrade and exit')
+    parser.add_argument('--benchmark-tournament', type=int, nargs='?', const=256, metavar='ENTRANTS',
+                        help='play a synthetic Swiss tournament of ENTRANTS (default 256) in a scratch database, '
+                             'timing each round, and exit')
+    parser.add_argument('--backup', action='store_true', help='back up the league database and exit')
+    parser.add_argument('--restore', metavar='FILE', help='restore the league database from a backup and exit')
+    parser.add_argument('--benchmark-startup', type=int, nargs='?', const=5, metavar='RUNS',
+                        help='time process start to first paint over RUNS launches (default 5) and exit')
+    parser.add_argument('--startup-probe', metavar='FILE', help=argparse.SUPPRESS)
+    parser.add_argument('--benchmark-chart', type=int, nargs='?', const=5000, metavar='MATCHES',
+                        help='time drawing the rating chart of a player with MATCHES matches (default 5000) and exit')
+    parser.add_argument('--close-season', metavar='NAME', help='archive the sessions before --season-end and exit')
+    parser.add_argument('--season-end', metavar='YYYY-MM-DD', default=datetime.now().strftime('%Y-%m-%d'),
+                        help='first day after the season closed with --close-season (default: today)')
+    args = parser.parse_args()
+
+    if args.benchmark_startup:
+        benchmark_startup(args.benchmark_startup)
+        sys.exit()
+
+    if args.benchmark_chart:
+        benchmark_rating_chart(args.benchmark_chart)
+        sys.exit()
+
+    if args.benchmark_analytics:
+        benchmark_analytics(args.benchmark_analytics)
+        sys.exit()
+
+    if args.benchmark_import:
+        benchmark_match_import(args.benchmark_import)
+        sys.exit()
+
+    if args.benchmark_storage:
+        benchmark_storage(args.benchmark_storage)
+        sys.exit()
+
+    if args.benchmark_tournament:
+        benchmark_tournament(args.benchmark_tournament)
+        sys.exit()
+
+    if args.list_leagues:
+        for league in list_leagues():
+            print(league, '*' if league == last_used_league() else '')
+        sys.exit()
+
+    if args.find_player:
+        for league, name, elo, matches, last_played in find_player_across_leagues(args.find_player):
+            print(f"{league}: {name} Elo {int(elo)}, {matches} matches, last played {last_played or 'never'}")
+        sys.exit()
+
+    try:
+        set_league(args.league or last_used_league())
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.backup:
+        print(f"Backed up to {backup_database('manual')}")
+        sys.exit()
+
+    if args.restore:
+        restore_backup(args.restore)
+        print(f"Restored {args.restore}")
+        sys.exit()
+
+    if args.close_season:
+        start = time.perf_counter()
+        num_matches = close_season(args.close_season, args.season_end)
+        print(f"Archived {num_matches} matches in {time.perf_counter() - start:.2f}s")
+        sys.exit()
+
+    if args.export_changes:
+        counts = export_changeset(args.export_changes, args.since)
+        print(f"Exported {counts['players']} players, {counts['sessions']} sessions, {counts['matches']} matches")
+        sys.exit()
+
+    if args.import_changes:
+        start = time.perf_counter()
+        summary = import_changeset(args.import_changes)
+        print(', '.join(f'{key}: {value}' for key, value in summary.items()))
+        print(f"Merged in {time.perf_counter() - start:.2f}s")
+        sys.exit()
+
+    if args.import_matches:
+        start = time.perf_counter()
+        summary = import_match_history(args.import_matches)
+        for error in summary.pop('errors'):
+            print(error)
+        print(', '.join(f'{key}: {value}' for key, value in summary.items()))
+        print(f"Imported in {time.perf_counter() - start:.1f}s")
+        sys.exit()
+
+    if args.benchmark_search:
+        benchmark_pairing_search()
+        sys.exit()
+
+    if args.benchmark_constraints:
+        benchmark_constraint_solver()
+        sys.exit()
+
+    if args.benchmark_skills:
+        benchmark_skill_fit()
+        sys.exit()
+
+    if args.fit_skills:
+        start = time.perf_counter()
+        num_matches = fit_skill_ratings()
+        print(f"Skill ratings fitted from {num_matches} matches in {time.perf_counter() - start:.2f}s")
+        sys.exit()
+
+    if args.simulate:
+        start = time.perf_counter()
+        summary = simulate_seasons(args.simulate, k_new=args.k_new, k_established=args.k_established)
+        print_simulation_report(summary)
+        print(f"Simulated in {time.perf_counter() - start:.1f}s")
+        sys.exit()
+
+    if args.replay_session is not None:
+        replay = replay_session(args.replay_session)
+        for field_number, match in enumerate(replay['matches'], start=1):
+            print(f"Field {field_number}: {match}")
+        print("Bench:", replay['bench'])
+        print("Identical to the stored round" if replay['identical'] else "Differs from the stored round:")
+        if not replay['identical']:
+            for field_number, match in enumerate(replay['stored'], start=1):
+                print(f"Field {field_number}: {match}")
+        sys.exit()
+
     app = QApplication(sys.argv)
+    if args.startup_probe:
+        first_paint_probe = FirstPaintProbe(args.startup_probe)
+        app.installEventFilter(first_paint_probe)
     window = MainWindow()
     window.show()
     window.close()
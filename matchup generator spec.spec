@@ -1,5 +1,8 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+# One-dir build: the exe starts straight from its folder instead of unpacking a
+# one-file bundle to a temp dir on every launch. Ship the whole
+# dist/Matchup Generator folder. Check with: "Matchup Generator.exe" --benchmark-startup
 
 a = Analysis(
     ['Matchup Generator.py'],
@@ -11,13 +14,35 @@ a = Analysis(
         'csv',
         'random',
         'datetime',
+        'multiprocessing',
+        'concurrent.futures',
+        'numpy',
         'PyQt5.QtWidgets',
         'PyQt5.QtCore',
         'PyQt5.QtGui'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Only QtCore, QtGui and QtWidgets are used
+    excludes=['tkinter',
+        'PyQt5.QtNetwork',
+        'PyQt5.QtQml',
+        'PyQt5.QtQuick',
+        'PyQt5.QtQuickWidgets',
+        'PyQt5.QtWebEngineCore',
+        'PyQt5.QtWebEngineWidgets',
+        'PyQt5.QtWebChannel',
+        'PyQt5.QtMultimedia',
+        'PyQt5.QtSql',
+        'PyQt5.QtBluetooth',
+        'PyQt5.QtPositioning',
+        'PyQt5.QtSensors',
+        'PyQt5.QtSerialPort',
+        'PyQt5.QtDesigner',
+        'PyQt5.QtHelp',
+        'PyQt5.QtOpenGL',
+        'PyQt5.QtXmlPatterns',
+        'PyQt5.QtTest'],
     noarchive=False,
     optimize=0,
 )
@@ -26,16 +51,13 @@ pyz = PYZ(a.pure)
 exe = EXE( 
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='Matchup Generator',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,  # Decompressing the Qt DLLs on every launch costs more than the disk space saved
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -43,3 +65,13 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='Matchup Generator',
+)
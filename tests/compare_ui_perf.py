@@ -0,0 +1,62 @@
+"""Compare two UI performance results files, e.g. the parent commit's against this one's.
+
+    python tests/compare_ui_perf.py tests/perf_results/<before>.json tests/perf_results/<after>.json
+
+Prints every metric both runs measured with its change, and exits with 1 when a time got slower by more than
+--threshold (default 25%).
+"""
+import argparse
+import json
+import sys
+
+MIN_MS = 5  # Below this, timer noise swamps any change
+
+
+def load_results(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare(before, after, threshold):
+    """Return the lines of the report and the metrics that regressed."""
+    lines = [f"{'metric':<52} {before['commit']:>12} {after['commit']:>12} {'change':>8}"]
+    regressions = []
+    for name in sorted(before['results'].keys() & after['results'].keys()):
+        old, new = before['results'][name], after['results'][name]
+        unit = new['unit']
+        if old['value']:
+            change = f"{(new['value'] - old['value']) / old['value']:+.0%}"
+        else:
+            change = 'new' if new['value'] else '='
+        flag = ''
+        if unit == 'ms' and max(old['value'], new['value']) >= MIN_MS and new['value'] > old['value'] * (1 + threshold):
+            regressions.append(name)
+            flag = '  SLOWER'
+        lines.append(f"{name:<52} {old['value']:>9.1f} {unit:<3}"
+                     f"{new['value']:>8.1f} {unit:<3} {change:>8}{flag}")
+    for label, results, other in (('before', before, after), ('after', after, before)):
+        missing = sorted(results['results'].keys() - other['results'].keys())
+        if missing:
+            lines.append(f"only measured {label}: {', '.join(missing)}")
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare two UI performance results files.')
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown as a fraction (default 0.25)')
+    args = parser.parse_args(argv)
+    before, after = load_results(args.before), load_results(args.after)
+    if before.get('platform') != after.get('platform'):
+        print(f"Warning: runs are from different machines ({before.get('platform')} vs {after.get('platform')})")
+    lines, regressions = compare(before, after, args.threshold)
+    print('\n'.join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) more than {args.threshold:.0%} slower")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
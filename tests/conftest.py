@@ -0,0 +1,339 @@
+"""Fixtures for the headless UI performance tests.
+
+The app runs on Qt's offscreen platform against generated leagues of increasing size. Every test records
+its measurements with the `perf` fixture; at the end of the run they are written to one JSON file per
+commit (see compare_ui_perf.py to compare two runs).
+
+Environment:
+    UI_PERF_SIZES         comma separated league sizes to run (default: small,medium; see LEAGUE_SIZES)
+    UI_PERF_OUTPUT        results file (default: tests/perf_results/<commit>.json)
+    UI_PERF_BUDGET_SCALE  multiplies every time budget, for slow machines (default: 1)
+"""
+import importlib.util
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import pytest
+from PyQt5.QtCore import QT_VERSION_STR, QTimer, Qt
+from PyQt5.QtWidgets import QApplication, QMessageBox, QTableWidget
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (players, matches). Every 16 matches make a session, one a day
+LEAGUE_SIZES = {
+    'small': (100, 2000),
+    'medium': (1000, 20000),
+    'large': (5000, 100000),
+}
+STALL_MS = 50  # An event loop gap this long is a visible stall
+
+
+def selected_sizes():
+    return [size.strip() for size in os.environ.get('UI_PERF_SIZES', 'small,medium').split(',') if size.strip()]
+
+
+def budget_scale():
+    return float(os.environ.get('UI_PERF_BUDGET_SCALE', '1'))
+
+
+@pytest.fixture(scope='session')
+def mg():
+    """The app module. Its file name has a space, so it is loaded from its path."""
+    spec = importlib.util.spec_from_file_location('matchup_generator', os.path.join(ROOT, 'Matchup Generator.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['matchup_generator'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    app = QApplication.instance() or QApplication([])
+    # Qt loads its platform plugin, fonts and styles for the first window shown; keep that out of the first test
+    warm_up = QTableWidget(10, 10)
+    warm_up.show()
+    app.processEvents()
+    warm_up.close()
+    warm_up.deleteLater()
+    app.processEvents()
+    return app
+
+
+@pytest.fixture(autouse=True)
+def messages(monkeypatch):
+    """Message boxes are recorded instead of shown: a modal box would block the run."""
+    shown = []
+    for kind in ('information', 'warning', 'critical'):
+        monkeypatch.setattr(QMessageBox, kind,
+                            staticmethod(lambda parent, title, text, *args, kind=kind: shown.append((kind, title, text))))
+    monkeypatch.setattr(QMessageBox, 'question', staticmethod(lambda *args: QMessageBox.Yes))
+    return shown
+
+
+def build_league(mg, path, num_players, num_matches, seed=1):
+    """A league with num_players players (5% removed) and num_matches rated matches, 80% of them doubles."""
+    rng = random.Random(seed)
+    mg.DATABASE = path
+    mg.init_db()
+    conn = sqlite3.connect(path)
+    start = mg.to_epoch(datetime(2022, 1, 1, 19))
+    num_sessions = max(1, num_matches // 16)
+    players = [(f'Player {i:05d}', rng.gauss(1500, 200), 0, start + num_sessions * 86400,
+                1 if rng.random() > 0.05 else 0, 'MF'[i % 2]) for i in range(num_players)]
+    conn.executemany('''
+        INSERT INTO players (name, elo_rating, matches_played, last_played, active, gender) VALUES (?, ?, ?, ?, ?, ?)
+    ''', players)
+    conn.executemany('INSERT INTO sessions (id, name, match_type, date, num_fields) VALUES (?, ?, ?, ?, ?)',
+                     [(session_id, f'Session {session_id}', 0, start + session_id * 86400, 4)
+                      for session_id in range(1, num_sessions + 1)])
+    matches, played = [], [0] * (num_players + 1)
+    for index in range(num_matches):
+        session_id = index % num_sessions + 1
+        doubles = rng.random() < 0.8
+        a1, a2, b1, b2 = rng.sample(range(1, num_players + 1), 4)
+        if not doubles:
+            a2 = b2 = None
+        score_a = rng.randrange(10, 22)
+        score_b = 21 if score_a < 21 else rng.randrange(10, 20)
+        winners = (a1, a2) if score_a > score_b else (b1, b2)
+        for player_id in (a1, a2, b1, b2):
+            if player_id:
+                played[player_id] += 1
+        matches.append((start + session_id * 86400, session_id, a1, a2, b1, b2, score_a, score_b) + winners +
+                       (0 if doubles else 1, index % 4 + 1))
+    conn.executemany('''
+        INSERT INTO matches (date, session_id, player_a1_id, player_a2_id, player_b1_id, player_b2_id, score_a,
+                             score_b, winner1_id, winner2_id, match_type, field_number, rated)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+    ''', matches)
+    conn.executemany('UPDATE players SET matches_played = ? WHERE id = ?',
+                     [(count, player_id) for player_id, count in enumerate(played) if player_id])
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture(scope='session')
+def league_files(mg, tmp_path_factory):
+    """Size -> pristine generated league, built once per run."""
+    files = {}
+
+    def get(size):
+        if size not in files:
+            num_players, num_matches = LEAGUE_SIZES[size]
+            path = str(tmp_path_factory.mktemp(f'league-{size}') / 'league.db')
+            build_league(mg, path, num_players, num_matches)
+            files[size] = path
+        return files[size]
+    return get
+
+
+@pytest.fixture(params=selected_sizes())
+def league(request, mg, qapp, league_files, tmp_path, monkeypatch):
+    """A fresh copy of a generated league, opened as the app's database. Yields the size name."""
+    size = request.param
+    if size not in LEAGUE_SIZES:
+        pytest.fail(f'Unknown league size {size}; choose from {", ".join(LEAGUE_SIZES)}')
+    path = str(tmp_path / 'league.db')
+    source = sqlite3.connect(league_files(size))
+    target = sqlite3.connect(path)
+    source.backup(target)
+    source.close()
+    target.close()
+    monkeypatch.setattr(mg, 'DATABASE', path)
+    monkeypatch.chdir(tmp_path)  # Backups and archives land next to the copy
+    yield size
+    for widget in QApplication.topLevelWidgets():
+        widget.close()
+        widget.deleteLater()
+    qapp.processEvents()
+
+
+@pytest.fixture
+def main_window(mg, qapp, monkeypatch):
+    """The real main window, without the modal matchup dialog it opens on start."""
+    monkeypatch.setattr(mg.MainWindow, 'open_create_matchup', lambda self: None)
+    window = mg.MainWindow()
+    window.backup_timer.stop()
+    return window
+
+
+def rss_bytes():
+    """Resident set size of this process, or None where it can't be read without extra packages."""
+    if sys.platform.startswith('linux'):
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(counters), counters.cb)
+        return counters.WorkingSetSize
+    return None
+
+
+class MemorySampler:
+    """Peak RSS above the starting point while the block runs, sampled every few milliseconds."""
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.peak_mib = None
+
+    def __enter__(self):
+        self.start = rss_bytes()
+        self.peak = self.start
+        self.running = self.start is not None
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        if self.running:
+            self.thread.start()
+        return self
+
+    def sample(self):
+        while self.running:
+            self.peak = max(self.peak, rss_bytes())
+            time.sleep(self.interval)
+
+    def __exit__(self, *exc):
+        if self.start is None:
+            return
+        self.running = False
+        self.thread.join()
+        self.peak = max(self.peak, rss_bytes())
+        self.peak_mib = (self.peak - self.start) / 2 ** 20
+
+
+class StallMonitor:
+    """Longest gaps between event loop iterations while the given actions run, one event loop pass apart.
+
+    A precise 1 ms timer ticks whenever the loop gets a turn, so a gap between ticks is time the UI could
+    not repaint or take input.
+    """
+
+    def __init__(self, qapp):
+        self.qapp = qapp
+        self.gaps = []
+
+    def run(self, actions, settle_ms=100):
+        ticks = []
+        timer = QTimer()
+        timer.setTimerType(Qt.PreciseTimer)
+        timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+        timer.start(1)
+        pending = list(actions)
+        done_at = None
+        started = time.perf_counter()
+        while True:
+            self.qapp.processEvents()
+            if pending:
+                pending.pop(0)()
+                ticks.append(time.perf_counter())
+                continue
+            done_at = done_at or time.perf_counter()
+            if time.perf_counter() - done_at > settle_ms / 1000:
+                break
+        timer.stop()
+        ticks = [started] + ticks
+        self.gaps = [(later - earlier) * 1000 for earlier, later in zip(ticks, ticks[1:])]
+        return self
+
+    @property
+    def max_ms(self):
+        return max(self.gaps, default=0.0)
+
+    @property
+    def stalls(self):
+        return sum(gap >= STALL_MS for gap in self.gaps)
+
+
+class PerfRecorder:
+    def __init__(self):
+        self.results = {}
+
+    def record(self, name, value, unit):
+        self.results[name] = {'value': round(value, 3), 'unit': unit}
+
+    def check(self, name, value, budget):
+        """Record a time in ms and fail when it is over budget (scaled by UI_PERF_BUDGET_SCALE)."""
+        self.record(name, value, 'ms')
+        assert value <= budget * budget_scale(), f'{name}: {value:.0f} ms, budget {budget * budget_scale():.0f} ms'
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+@pytest.fixture(scope='session')
+def perf_results():
+    recorder = PerfRecorder()
+    yield recorder
+    if not recorder.results:
+        return
+    commit = git_commit()
+    path = os.environ.get('UI_PERF_OUTPUT') or os.path.join(ROOT, 'tests', 'perf_results', f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump({'commit': commit, 'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                   'python': platform.python_version(), 'qt': QT_VERSION_STR, 'platform': platform.platform(),
+                   'sizes': {size: dict(zip(('players', 'matches'), LEAGUE_SIZES[size])) for size in selected_sizes()},
+                   'results': dict(sorted(recorder.results.items()))}, file, indent=1)
+    print(f'\nUI performance results written to {path}')
+
+
+@pytest.fixture
+def perf(perf_results, league):
+    """Records measurements under '<metric>[<league size>]'."""
+
+    class Recorder:
+        size = league
+
+        def record(self, metric, value, unit):
+            perf_results.record(f'{metric}[{league}]', value, unit)
+
+        def check(self, metric, value, budgets):
+            perf_results.check(f'{metric}[{league}]', value, budgets[league])
+    return Recorder()
+
+
+@pytest.fixture
+def memory():
+    return MemorySampler
+
+
+@pytest.fixture
+def stall_monitor(qapp):
+    return StallMonitor(qapp)
+
+
+def wait_until(qapp, condition, timeout=120):
+    """Run the event loop until condition() holds; fails after timeout seconds."""
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, 'Timed out waiting for the UI'
+        qapp.processEvents()
+
+
+@pytest.fixture
+def wait(qapp):
+    return lambda condition, timeout=120: wait_until(qapp, condition, timeout)
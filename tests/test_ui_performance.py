@@ -0,0 +1,149 @@
+"""Headless UI performance: how long the main windows take to open and fill, and how long the UI freezes
+while players are dragged in and scores are submitted, against leagues of increasing size.
+
+Budgets are in ms per league size and only catch gross regressions; compare the recorded results of two
+commits with compare_ui_perf.py to see smaller changes.
+"""
+import time
+
+from PyQt5.QtCore import QItemSelectionModel, QMimeData, QPointF, Qt
+from PyQt5.QtGui import QDropEvent
+from PyQt5.QtWidgets import QTableWidgetItem
+
+# Roughly five times what each size took on a slow single core machine
+BUDGETS = {
+    'ScheduleSessionDialog.construct_ms': {'small': 250, 'medium': 250, 'large': 250},
+    'ScheduleSessionDialog.populate_ms': {'small': 250, 'medium': 500, 'large': 1000},
+    'ManagePlayersDialog.construct_ms': {'small': 250, 'medium': 500, 'large': 1000},
+    'ManagePlayersDialog.load_players_ms': {'small': 250, 'medium': 500, 'large': 1000},
+    'LeaderboardWindow.construct_ms': {'small': 250, 'medium': 500, 'large': 2000},
+    'LeaderboardWindow.load_ms': {'small': 250, 'medium': 500, 'large': 2000},
+    'MatchHistoryWindow.construct_ms': {'small': 1000, 'medium': 5000, 'large': 20000},
+    'MatchHistoryWindow.load_ms': {'small': 500, 'medium': 2500, 'large': 10000},
+    'drag_and_drop.max_stall_ms': {'small': 250, 'medium': 250, 'large': 250},
+    'submit_scores.max_stall_ms': {'small': 500, 'medium': 1000, 'large': 3000},
+}
+DROPS = 5  # Drops of PLAYERS_PER_DROP players each, then the last drop is taken back out
+PLAYERS_PER_DROP = 8
+
+
+def count_active_players(mg):
+    conn = mg.connect_db()
+    count = conn.execute('SELECT COUNT(*) FROM players WHERE active = 1').fetchone()[0]
+    conn.close()
+    return count
+
+
+def record_memory(perf, metric, sampler):
+    if sampler.peak_mib is not None:
+        perf.record(metric, sampler.peak_mib, 'MiB')
+
+
+def open_schedule_dialog(mg, main_window, wait):
+    dialog = mg.ScheduleSessionDialog(main_window)
+    num_players = count_active_players(mg)
+    wait(lambda: dialog.roster.available_model.rowCount() == num_players)  # The roster loads on the first pass
+    return dialog
+
+
+def test_schedule_session_dialog(mg, main_window, perf, memory, wait):
+    num_players = count_active_players(mg)
+    with memory() as sampler:
+        start = time.perf_counter()
+        dialog = mg.ScheduleSessionDialog(main_window)
+        constructed = time.perf_counter()
+        wait(lambda: dialog.roster.available_model.rowCount() == num_players)
+        populated = time.perf_counter()
+    perf.check('ScheduleSessionDialog.construct_ms', (constructed - start) * 1000, BUDGETS['ScheduleSessionDialog.construct_ms'])
+    perf.check('ScheduleSessionDialog.populate_ms', (populated - constructed) * 1000, BUDGETS['ScheduleSessionDialog.populate_ms'])
+    record_memory(perf, 'ScheduleSessionDialog.peak_rss_mib', sampler)
+
+
+def test_manage_players_dialog(mg, main_window, perf, memory):
+    with memory() as sampler:
+        start = time.perf_counter()
+        dialog = mg.ManagePlayersDialog(main_window)
+        constructed = time.perf_counter()
+    assert dialog.table.rowCount() == count_active_players(mg)
+    start_load = time.perf_counter()
+    dialog.load_players()
+    loaded = time.perf_counter()
+    perf.check('ManagePlayersDialog.construct_ms', (constructed - start) * 1000, BUDGETS['ManagePlayersDialog.construct_ms'])
+    perf.check('ManagePlayersDialog.load_players_ms', (loaded - start_load) * 1000, BUDGETS['ManagePlayersDialog.load_players_ms'])
+    record_memory(perf, 'ManagePlayersDialog.peak_rss_mib', sampler)
+
+
+def test_leaderboard_window(mg, perf, memory):
+    with memory() as sampler:
+        start = time.perf_counter()
+        window = mg.LeaderboardWindow()
+        constructed = time.perf_counter()
+    assert window.table.rowCount() == count_active_players(mg)
+    start_load = time.perf_counter()
+    window.load_leaderboard()
+    loaded = time.perf_counter()
+    perf.check('LeaderboardWindow.construct_ms', (constructed - start) * 1000, BUDGETS['LeaderboardWindow.construct_ms'])
+    perf.check('LeaderboardWindow.load_ms', (loaded - start_load) * 1000, BUDGETS['LeaderboardWindow.load_ms'])
+    record_memory(perf, 'LeaderboardWindow.peak_rss_mib', sampler)
+
+
+def test_match_history_window(mg, perf, memory):
+    with memory() as sampler:
+        start = time.perf_counter()
+        window = mg.MatchHistoryWindow()
+        constructed = time.perf_counter()
+    assert window.table.rowCount() == len(mg.get_match_history())
+    start_load = time.perf_counter()
+    window.load_match_history()
+    loaded = time.perf_counter()
+    perf.check('MatchHistoryWindow.construct_ms', (constructed - start) * 1000, BUDGETS['MatchHistoryWindow.construct_ms'])
+    perf.check('MatchHistoryWindow.load_ms', (loaded - start_load) * 1000, BUDGETS['MatchHistoryWindow.load_ms'])
+    record_memory(perf, 'MatchHistoryWindow.peak_rss_mib', sampler)
+
+
+def drop_players(dialog, rows):
+    """Select the available players at `rows` and drop them on the assigned list, as a drag from the list would."""
+    model = dialog.available_list.model()
+    selection = dialog.available_list.selectionModel()
+    selection.clearSelection()
+    for row in rows:
+        selection.select(model.index(row, 0), QItemSelectionModel.Select)
+    # Qt only routes drop events while a real drag is in progress, so hand the event to the list's handler
+    dialog.assigned_list.dropEvent(QDropEvent(QPointF(10, 10), Qt.CopyAction, QMimeData(), Qt.LeftButton,
+                                              Qt.NoModifier))
+
+
+def take_back_last_drop(dialog):
+    selection = dialog.assigned_list.selectionModel()
+    selection.clearSelection()
+    for row in range(PLAYERS_PER_DROP):
+        selection.select(dialog.roster.assigned_model.index(row), QItemSelectionModel.Select)
+    dialog.assigned_list.remove_selected_players()
+
+
+def test_drag_and_drop_stalls(mg, main_window, perf, stall_monitor, wait):
+    dialog = open_schedule_dialog(mg, main_window, wait)
+    dialog.show()
+    actions = [lambda: drop_players(dialog, range(PLAYERS_PER_DROP)) for _ in range(DROPS)]
+    actions.append(lambda: take_back_last_drop(dialog))
+    stall_monitor.run(actions, settle_ms=300)  # Past the search box's debounce
+    assert dialog.roster.assigned_model.rowCount() == (DROPS - 1) * PLAYERS_PER_DROP
+    perf.check('drag_and_drop.max_stall_ms', stall_monitor.max_ms, BUDGETS['drag_and_drop.max_stall_ms'])
+    perf.record('drag_and_drop.stalls', stall_monitor.stalls, 'count')
+
+
+def test_submit_scores_stalls(mg, main_window, perf, stall_monitor, wait, messages):
+    dialog = open_schedule_dialog(mg, main_window, wait)
+    dialog.show()
+    dialog.roster.assign(list(dialog.roster.available_model.names)[:16])
+    start = time.perf_counter()
+    dialog.create_matchup()
+    perf.record('create_matchup_ms', (time.perf_counter() - start) * 1000, 'ms')
+    assert dialog.matchups_table.rowCount() == 4
+    for row in range(dialog.matchups_table.rowCount()):
+        dialog.matchups_table.setItem(row, 3, QTableWidgetItem('21'))
+        dialog.matchups_table.setItem(row, 4, QTableWidgetItem(str(10 + row)))
+    stall_monitor.run([dialog.submit_scores_button.click])
+    assert ('information', 'Success', 'Scores submitted and records updated successfully.') in messages
+    perf.check('submit_scores.max_stall_ms', stall_monitor.max_ms, BUDGETS['submit_scores.max_stall_ms'])
+    perf.record('submit_scores.stalls', stall_monitor.stalls, 'count')